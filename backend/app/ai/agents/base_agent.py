@@ -1,46 +1,284 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 from langchain.llms import OpenAI
-from langchain.chat_models import ChatAnthropic
+from langchain.chat_models import ChatAnthropic, ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
+from pydantic import BaseModel
+import asyncio
 import logging
+import time
 
+from app.ai.hedging import provider_health
+from app.ai.json_stream import document_closed
+from app.ai.knowledge import knowledge_base
+from app.ai.prompts import PromptTemplate
+from app.ai.structured import (
+    StructuredOutputError,
+    parse_output,
+    record_outcome,
+    schema_instructions,
+)
+from app.ai.tokens import count_message_tokens, count_tokens, fit_max_tokens
 from app.core.config import settings
+from app.core.metrics import (
+    LLM_ERRORS,
+    LLM_FAILOVERS,
+    LLM_HEDGES,
+    LLM_PROMPT_TOKENS,
+    LLM_REQUEST_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS,
+    PROMPT_TOKENS_SAVED,
+)
+
+if TYPE_CHECKING:
+    from app.ai.cache import ResponseCache, SemanticKey
+    from app.ai.registry import SharedLLMClients
 
 logger = logging.getLogger(__name__)
 
+# OpenAI chat models that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = (
+    "gpt-3.5-turbo-1106",
+    "gpt-3.5-turbo-0125",
+    "gpt-4-1106",
+    "gpt-4-0125",
+    "gpt-4-turbo",
+    "gpt-4o",
+)
+
+
+def _consume_exception(task: "asyncio.Task[Any]") -> None:
+    # Abandoned hedge attempts may fail after we stop waiting for them
+    if not task.cancelled():
+        task.exception()
+
+
+class _HedgedRequest:
+    """Attempts of one hedged request (see BaseAgent._generate_hedged)."""
+    
+    def __init__(
+        self,
+        agent: "BaseAgent",
+        messages: List[Any],
+        max_tokens: Optional[int],
+        json_mode: bool,
+    ):
+        self.agent = agent
+        self.name = type(agent).__name__
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.json_mode = json_mode
+        self.loop = asyncio.get_running_loop()
+        self.candidates = agent._candidates()
+        self.running: Dict["asyncio.Task[str]", Tuple[str, "asyncio.Future[None]"]] = {}
+        # The attempt that streamed first; the others were cancelled
+        self.committed: Optional["asyncio.Task[str]"] = None
+        self.hedges: set = set()
+        self.hedge_at: Optional[float] = None
+        self.last_error: Optional[Exception] = None
+    
+    async def run(self) -> str:
+        try:
+            while self.running or self.candidates:
+                if not self.running:
+                    self._launch()
+                if not await self._wait():
+                    self._hedge()
+                    continue
+                winner = self._reap()
+                if winner is not None:
+                    return winner.result()
+                self._commit()
+        finally:
+            for task in self.running:
+                task.cancel()
+        raise self.last_error or RuntimeError(f"{self.name}: no LLM available")
+    
+    # Scheduling
+    
+    def _launch(self) -> None:
+        """Start the next candidate, arming the hedge timer if it runs alone."""
+        model, llm = self.candidates.pop(0)
+        first_token: "asyncio.Future[None]" = self.loop.create_future()
+        task = asyncio.create_task(self.agent._attempt(
+            model,
+            llm,
+            self.messages,
+            self.agent._call_kwargs(llm, self.max_tokens, self.json_mode),
+            first_token,
+        ))
+        task.add_done_callback(_consume_exception)
+        self.running[task] = (model, first_token)
+        self.hedge_at = None
+        if self.agent.hedging and self.candidates and len(self.running) == 1:
+            self.hedge_at = self.loop.time() + provider_health(model).hedge_delay()
+    
+    def _hedge(self) -> None:
+        backup = self.candidates[0][0]
+        logger.info(f"{self.name}: hedging slow request with {backup}")
+        LLM_HEDGES.labels(self.name, backup, "fired").inc()
+        self.hedges.add(backup)
+        self._launch()
+    
+    async def _wait(self) -> Set[Any]:
+        """Wait for a result, a first token or the hedge timer (empty set)."""
+        waiting: Set[Any] = set(self.running)
+        timeout = None
+        if self.committed is None:
+            waiting.update(first for _, first in self.running.values())
+            if self.hedge_at is not None:
+                timeout = max(0.0, self.hedge_at - self.loop.time())
+        done, _ = await asyncio.wait(
+            waiting,
+            timeout=timeout,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        return done
+    
+    # Result handling
+    
+    def _reap(self) -> Optional["asyncio.Task[str]"]:
+        """Remove finished attempts; return the first that succeeded."""
+        for task in [t for t in self.running if t.done()]:
+            model, _ = self.running.pop(task)
+            if task is self.committed:
+                self.committed = None
+            error = task.exception()
+            if error is None:
+                if model in self.hedges:
+                    LLM_HEDGES.labels(self.name, model, "won").inc()
+                self.agent._record_streamed_usage(model, self.messages, task.result())
+                return task
+            self.last_error = error  # type: ignore[assignment]
+            LLM_FAILOVERS.labels(self.name, model).inc()
+            logger.warning(
+                f"{self.name}: {model} failed ({type(error).__name__}), "
+                f"failing over"
+            )
+        return None
+    
+    def _commit(self) -> None:
+        """Keep the first attempt that streamed a token; cancel the others."""
+        if self.committed is not None:
+            return
+        self.committed = next(
+            (t for t, (_, first) in self.running.items() if first.done()),
+            None,
+        )
+        if self.committed is not None:
+            self.hedge_at = None
+            for task in [t for t in self.running if t is not self.committed]:
+                task.cancel()
+                del self.running[task]
+
+
 class BaseAgent(ABC):
-    """Base class for all AI agents."""
+    """Base class for all AI agents.
+    
+    With ``fallback_models``, the agent runs in multi-provider mode: the
+    primary ``model`` is tried first, a backup is fired if it has not
+    produced a first token within its tracked p95 (hedging), and errors
+    fail over to the next model, skipping providers currently marked
+    unhealthy.
+    """
+    
+    # Opt in to the shared LLM response cache
+    cache_responses: bool = False
+    
+    # Ground prompts in the destination knowledge base (see _retrieve_context)
+    use_knowledge: bool = False
+    
+    # Pydantic model the agent's answers are parsed into
+    output_model: Optional[Type[BaseModel]] = None
     
     def __init__(
         self,
         model: str = "gpt-4",
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        clients: Optional["SharedLLMClients"] = None,
+        cache: Optional["ResponseCache"] = None,
+        fallback_models: Sequence[str] = (),
+        hedging: bool = settings.LLM_HEDGING_ENABLED,
     ):
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.clients = clients
+        self.cache = cache
+        self.fallback_models = tuple(fallback_models)
+        self.hedging = hedging
         self._setup_llm()
     
     def _setup_llm(self):
-        """Initialize the LLM based on configuration."""
-        if "gpt" in self.model.lower():
-            self.llm = OpenAI(
+        """Initialize the primary LLM and any fallbacks.
+        
+        A fallback that cannot be built (e.g. missing API key) is skipped
+        with a warning; the primary must build.
+        """
+        self.llm = self._build_llm(self.model)
+        self.llms: List[Tuple[str, Any]] = [(self.model, self.llm)]
+        for model in self.fallback_models:
+            try:
+                self.llms.append((model, self._build_llm(model)))
+            except Exception as e:
+                logger.warning(f"Skipping fallback model {model}: {str(e)}")
+    
+    def _build_llm(self, model: str) -> Any:
+        """Build the LangChain LLM for ``model``.
+        
+        GPT models use the chat completions API, except ``*-instruct``
+        models, which only exist on the legacy completions API. When
+        shared clients are provided, the LLM reuses their pooled keep-alive
+        connections instead of opening its own.
+        """
+        name = model.lower()
+        if "gpt" in name and "instruct" in name:
+            extra: Dict[str, Any] = {}
+            if self.clients is not None:
+                extra["async_client"] = self.clients.openai.completions
+            return OpenAI(
                 api_key=settings.OPENAI_API_KEY,
-                model=self.model,
+                model=model,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
+                **extra,
             )
-        elif "claude" in self.model.lower():
-            self.llm = ChatAnthropic(
-                api_key=settings.ANTHROPIC_API_KEY,
-                model=self.model,
+        elif "gpt" in name:
+            extra = {}
+            if self.clients is not None:
+                extra["async_client"] = self.clients.openai.chat.completions
+            return ChatOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                model=model,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
+                **extra,
             )
+        elif "claude" in model.lower():
+            llm = ChatAnthropic(
+                anthropic_api_key=settings.ANTHROPIC_API_KEY,
+                model=model,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+            )
+            if self.clients is not None:
+                llm.async_client = self.clients.anthropic
+            return llm
         else:
-            raise ValueError(f"Unsupported model: {self.model}")
+            raise ValueError(f"Unsupported model: {model}")
     
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -52,28 +290,384 @@ class BaseAgent(ABC):
         """Execute the agent's main task."""
         pass
     
+    def _render(self, template: PromptTemplate, **values: Any) -> str:
+        """Render a compiled prompt, counting the tokens compilation saved."""
+        PROMPT_TOKENS_SAVED.labels(type(self).__name__, template.name).inc(
+            template.saved_tokens
+        )
+        return template.render(**values)
+    
+    def _size_request(
+        self,
+        system_prompt: str,
+        user_message: str,
+        max_tokens: Optional[int],
+    ) -> int:
+        """Count the prompt and fit ``max_tokens`` to every model's window."""
+        prompt_tokens = count_message_tokens([system_prompt, user_message], self.model)
+        LLM_PROMPT_TOKENS.labels(type(self).__name__).observe(prompt_tokens)
+        return fit_max_tokens(
+            prompt_tokens,
+            max_tokens or self.max_tokens,
+            [model for model, _ in self.llms],
+        )
+    
+    async def _retrieve_context(self, destination: str, topics: Sequence[str]) -> str:
+        """Knowledge base notes to put in the prompt.
+        
+        Retrieved for ``destination`` and ranked against ``topics``, within
+        the KNOWLEDGE_CONTEXT_TOKENS budget. Empty when the agent does not
+        use the knowledge base, the destination is not covered, or
+        retrieval fails.
+        """
+        if not self.use_knowledge or not knowledge_base.loaded:
+            return ""
+        try:
+            return await knowledge_base.context(
+                destination, topics, agent=type(self).__name__
+            )
+        except Exception as e:
+            logger.warning(f"Knowledge retrieval failed: {str(e)}")
+            return ""
+    
     async def _generate_response(
         self,
         user_message: str,
         system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        cache: bool = True,
+        semantic_key: Optional["SemanticKey"] = None,
     ) -> str:
-        """Generate a response from the LLM."""
+        """Generate a response from the LLM.
+        
+        ``max_tokens`` overrides the agent default for this call only, and
+        is lowered if the prompt leaves less room in the context window.
+        ``json_mode`` requests provider-enforced JSON output where the
+        provider supports it.
+        
+        ``cache=False`` bypasses the response cache. ``semantic_key`` (the
+        request's structured fields and its free text) lets the semantic
+        tier match similar requests. Answers cut off before their JSON
+        document closes are never stored.
+        """
         try:
             if system_prompt is None:
                 system_prompt = self.get_system_prompt()
             
+            use_cache = cache and self.cache is not None and self.cache_responses
+            if use_cache:
+                cached = await self.cache.get(
+                    type(self).__name__,
+                    system_prompt,
+                    user_message,
+                    self.model,
+                    self.temperature,
+                    semantic_key,
+                )
+                if cached is not None:
+                    return cached
+            
+            max_tokens = self._size_request(system_prompt, user_message, max_tokens)
             messages = [
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_message),
             ]
             
-            response = await self.llm.agenerate([messages])
-            return response.generations[0][0].text
+            if len(self.llms) > 1:
+                text = await self._generate_hedged(messages, max_tokens, json_mode)
+            else:
+                text = await self._generate_single(messages, max_tokens, json_mode)
+            
+            if use_cache and document_closed(text):
+                await self.cache.set(
+                    type(self).__name__,
+                    system_prompt,
+                    user_message,
+                    self.model,
+                    self.temperature,
+                    text,
+                    semantic_key,
+                )
+            return text
         
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
     
+    def _call_kwargs(
+        self,
+        llm: Any,
+        max_tokens: Optional[int],
+        json_mode: bool,
+    ) -> Dict[str, Any]:
+        """Per-call arguments for ``llm``.
+        
+        Anthropic's completions API calls the output limit
+        ``max_tokens_to_sample``; only OpenAI's accept ``max_tokens``.
+        """
+        kwargs: Dict[str, Any] = {}
+        if max_tokens is not None:
+            if isinstance(llm, ChatAnthropic):
+                kwargs["max_tokens_to_sample"] = max_tokens
+            else:
+                kwargs["max_tokens"] = max_tokens
+        if json_mode and self._supports_json_mode(llm):
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs
+    
+    async def _generate_single(
+        self,
+        messages: List[Any],
+        max_tokens: Optional[int],
+        json_mode: bool,
+    ) -> str:
+        """One non-streaming call to the primary model."""
+        agent = type(self).__name__
+        kwargs = self._call_kwargs(self.llm, max_tokens, json_mode)
+        start = time.perf_counter()
+        try:
+            response = await self.llm.agenerate([messages], **kwargs)
+        except Exception as e:
+            LLM_ERRORS.labels(agent, self.model, type(e).__name__).inc()
+            raise
+        LLM_REQUEST_DURATION.labels(agent, self.model).observe(
+            time.perf_counter() - start
+        )
+        self._record_usage(response.llm_output)
+        return response.generations[0][0].text
+    
+    def _candidates(self) -> List[Tuple[str, Any]]:
+        """Configured models in order, unhealthy providers last."""
+        healthy = [c for c in self.llms if provider_health(c[0]).healthy]
+        return healthy + [c for c in self.llms if c not in healthy]
+    
+    async def _attempt(
+        self,
+        model: str,
+        llm: Any,
+        messages: List[Any],
+        kwargs: Dict[str, Any],
+        first_token: "asyncio.Future[None]",
+    ) -> str:
+        """Stream one model's answer, signalling its first token."""
+        agent = type(self).__name__
+        health = provider_health(model)
+        parts: List[str] = []
+        start = time.perf_counter()
+        try:
+            async for chunk in llm.astream(messages, **kwargs):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    if not parts:
+                        elapsed = time.perf_counter() - start
+                        health.record_first_token(elapsed)
+                        LLM_TIME_TO_FIRST_TOKEN.labels(agent, model).observe(elapsed)
+                        if not first_token.done():
+                            first_token.set_result(None)
+                    parts.append(text)
+        except asyncio.CancelledError:
+            if not parts:
+                # Lost the hedge before starting: still a (lower-bound)
+                # latency sample, so the threshold tracks slow periods
+                health.record_first_token(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            health.record_failure()
+            LLM_ERRORS.labels(agent, model, type(e).__name__).inc()
+            raise
+        health.record_success()
+        LLM_REQUEST_DURATION.labels(agent, model).observe(
+            time.perf_counter() - start
+        )
+        return "".join(parts)
+    
+    async def _generate_hedged(
+        self,
+        messages: List[Any],
+        max_tokens: Optional[int],
+        json_mode: bool,
+    ) -> str:
+        """
+        Race the configured models for the first token.
+        
+        The primary starts alone. If it has no first token after its
+        adaptive hedge delay, the next model is fired as a backup; whichever
+        streams first is kept and the other is cancelled. Errors fail over
+        to the next untried model.
+        """
+        return await _HedgedRequest(self, messages, max_tokens, json_mode).run()
+    
+    def _record_usage(
+        self,
+        llm_output: Optional[Dict[str, Any]],
+        model: Optional[str] = None,
+    ) -> None:
+        """Count prompt/completion tokens reported by the provider."""
+        usage = (llm_output or {}).get("token_usage") or {}
+        agent = type(self).__name__
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens:
+                LLM_TOKENS.labels(agent, model or self.model, kind).inc(tokens)
+    
+    def _record_streamed_usage(
+        self,
+        model: str,
+        messages: List[Any],
+        text: str,
+    ) -> None:
+        """Count the tokens of a streamed answer, which reports no usage.
+        
+        Counted locally with the model's tokenizer (see app.ai.tokens).
+        """
+        prompt = [message.content for message in messages]
+        self._record_usage({"token_usage": {
+            "prompt_tokens": count_message_tokens(prompt, model),
+            "completion_tokens": count_tokens(text, model),
+        }}, model)
+    
+    def _supports_json_mode(self, llm: Any = None) -> bool:
+        """Whether the LLM accepts OpenAI's JSON response format."""
+        llm = llm or self.llm
+        if getattr(llm, "_llm_type", "") != "openai-chat":
+            return False
+        return llm.model_name.lower().startswith(JSON_MODE_MODELS)
+    
+    async def _generate_structured(
+        self,
+        user_message: str,
+        output_model: Optional[Type[BaseModel]] = None,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        semantic_key: Optional["SemanticKey"] = None,
+    ) -> BaseModel:
+        """
+        Generate a response and parse it into ``output_model``.
+        
+        The compact JSON schema is appended to the system prompt, so it is
+        part of the stable, cacheable prefix (and JSON mode is enabled
+        where available). Malformed answers are repaired locally; only if
+        that fails is the model asked once more.
+        """
+        model = output_model or self.output_model
+        if model is None:
+            raise ValueError(f"{type(self).__name__} has no output model")
+        
+        system_prompt = system_prompt or self.get_system_prompt()
+        system_prompt += schema_instructions(model)
+        response = await self._generate_response(
+            user_message,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            json_mode=True,
+            semantic_key=semantic_key,
+        )
+        try:
+            return parse_output(response, model)
+        except StructuredOutputError as e:
+            logger.warning(f"Re-prompting after unparseable output: {str(e)}")
+        
+        return await self._reprompt(user_message, model, system_prompt, max_tokens)
+    
+    async def _reprompt(
+        self,
+        user_message: str,
+        output_model: Type[BaseModel],
+        system_prompt: str,
+        max_tokens: Optional[int] = None,
+    ) -> BaseModel:
+        """Ask once more after an answer that could not be repaired."""
+        retry_message = (
+            user_message
+            + "\n\nYour previous answer was not valid JSON for the schema "
+            "above. Answer again with the JSON object only."
+        )
+        response = await self._generate_response(
+            retry_message,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            json_mode=True,
+        )
+        try:
+            parsed = parse_output(response, output_model)
+        except StructuredOutputError:
+            record_outcome(output_model, "failed")
+            raise
+        record_outcome(output_model, "reprompted")
+        return parsed
+    
+    async def _stream_response(
+        self,
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        cache: bool = True,
+        semantic_key: Optional["SemanticKey"] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM as text chunks.
+        
+        Caching works as in ``_generate_response``.
+        """
+        if system_prompt is None:
+            system_prompt = self.get_system_prompt()
+        
+        use_cache = cache and self.cache is not None and self.cache_responses
+        if use_cache:
+            cached = await self.cache.get(
+                type(self).__name__,
+                system_prompt,
+                user_message,
+                self.model,
+                self.temperature,
+                semantic_key,
+            )
+            if cached is not None:
+                yield cached
+                return
+        
+        max_tokens = self._size_request(system_prompt, user_message, max_tokens)
+        kwargs = self._call_kwargs(self.llm, max_tokens, json_mode=False)
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_message),
+        ]
+        
+        parts: List[str] = []
+        agent = type(self).__name__
+        start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(messages, **kwargs):
+                # Chat models yield message chunks, completion models strings
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    if not parts:
+                        LLM_TIME_TO_FIRST_TOKEN.labels(agent, self.model).observe(
+                            time.perf_counter() - start
+                        )
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            LLM_ERRORS.labels(agent, self.model, type(e).__name__).inc()
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+        LLM_REQUEST_DURATION.labels(agent, self.model).observe(
+            time.perf_counter() - start
+        )
+        
+        text = "".join(parts)
+        if use_cache and document_closed(text):
+            await self.cache.set(
+                type(self).__name__,
+                system_prompt,
+                user_message,
+                self.model,
+                self.temperature,
+                text,
+                semantic_key,
+            )
+    
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """Validate input data for the agent."""
         return True
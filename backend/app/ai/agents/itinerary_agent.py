@@ -1,33 +1,150 @@
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 import asyncio
+import json
 import logging
 
+from pydantic import ValidationError
+
 from app.ai.agents.base_agent import BaseAgent
+from app.ai.json_stream import IncrementalArrayParser
+from app.ai.prompts import PromptTemplate
+from app.ai.routing import optimize_itinerary_routes
+from app.ai.schemas import DayPlan, ItineraryDays, ItineraryOutput, TripSkeleton
+from app.ai.structured import (
+    StructuredOutputError,
+    parse_output,
+    schema_instructions,
+)
+from app.ai.tokens import count_tokens
+from app.core.config import settings
+from app.core.metrics import LLM_CONTINUATIONS, LLM_WASTED_TOKENS
+from app.services.clients import provider_clients
 
 logger = logging.getLogger(__name__)
 
+# Output tokens of one day's JSON plan by pace (packed days have more
+# activities and stops), about 25% above a typical answer
+DAY_OUTPUT_TOKENS = {"relaxed": 320, "moderate": 400, "packed": 500}
+PLAN_OUTPUT_TOKENS = 200  # overview, total and JSON framing
+SKELETON_DAY_TOKENS = 40
+SKELETON_OUTPUT_TOKENS = 150
+
+# Places listed in a continuation prompt so resumed days do not repeat them
+CONTINUATION_MAX_VISITED = 40
+
+
+def estimate_output_tokens(days: int, pace: str = "moderate") -> int:
+    """Output tokens needed for a ``days``-day plan at ``pace``."""
+    per_day = DAY_OUTPUT_TOKENS.get(pace, DAY_OUTPUT_TOKENS["moderate"])
+    return PLAN_OUTPUT_TOKENS + days * per_day
+
+# Everything that is the same for every request lives in the system prompt,
+# so providers can cache it as a prompt prefix
+SYSTEM_PROMPT = PromptTemplate("itinerary_system", """
+    You are an expert travel itinerary planner. Your role is to:
+    
+    1. Create detailed, day-by-day travel itineraries
+    2. Balance activities, rest, and travel time
+    3. List the places visited each day as stops
+    4. Consider user preferences and energy levels
+    5. Include practical tips and local insights
+    
+    Always ensure:
+    - Realistic timing and logistics
+    - Mix of popular and off-the-beaten-path experiences
+    - Flexibility for spontaneous changes
+    - Cultural sensitivity and respect
+    - Accessibility considerations
+    
+    For each day, provide:
+    1. Morning activities (with timing)
+    2. Lunch recommendations
+    3. Afternoon activities
+    4. Evening plans
+    5. Dinner suggestions
+    6. Accommodation notes
+    7. Transportation details
+    8. Estimated daily budget
+    9. Pro tips and local insights
+    10. The places visited, as stops with the minutes spent at each
+        (their order and times are optimized afterwards)
+    
+    Ensure the itinerary is:
+    - Logistically feasible
+    - Culturally respectful
+    - Balanced and enjoyable
+    - Includes buffer time
+    
+    When reference notes are given, draw restaurants, neighbourhoods,
+    transport and tips from them where they apply.
+    
+    Format itineraries as structured JSON with daily breakdowns.
+""")
+
+USER_PROMPT = PromptTemplate("itinerary_user", """
+    Create a detailed {duration}-day itinerary for {destination}.
+    
+    Traveler Profile:
+    - Interests: {interests}
+    - Preferred Pace: {pace}
+    - Special Requirements: {special_requirements}
+""")
+
+SKELETON_PROMPT = PromptTemplate("itinerary_skeleton", """
+    Before the detailed plan, outline all {duration} days. Keep every
+    field to a few words; this is an outline only.
+""")
+
+CHUNK_PROMPT = PromptTemplate("itinerary_chunk", """
+    Only write days {first} to {last} of this {duration}-day trip.
+    Follow this trip skeleton for the accommodation and the theme of
+    each day, and do not repeat highlights assigned to other days:
+    {skeleton}
+""")
+
+ADAPT_PROMPT = PromptTemplate("itinerary_adapt", """
+    Here is a {template_duration}-day itinerary for {destination}, planned
+    for a general visitor at a {pace} pace, as JSON:
+    {itinerary}
+    
+    Adapt its first {duration} days for this traveler:
+    - Interests: {interests}
+    - Special Requirements: {special_requirements}
+    
+    Return only the days that need to change to suit them, each rewritten
+    in full with the same day number. Leave out days that already suit
+    them, and return an empty daily_plans list if all of them do.
+""")
+
+CONTINUE_PROMPT = PromptTemplate("itinerary_continue", """
+    Your previous answer was cut off after day {done}. Write only days
+    {first} to {last} now, in the same JSON format. Places already
+    visited: {visited}
+""")
+
+
 class ItineraryAgent(BaseAgent):
     """Agent specialized in creating personalized travel itineraries."""
     
+    cache_responses = True
+    use_knowledge = True
+    output_model = ItineraryOutput
+    
+    # Fan-out settings for long trips (see execute_chunked)
+    chunked_generation: bool = settings.ITINERARY_CHUNKED_GENERATION
+    chunk_days: int = settings.ITINERARY_CHUNK_DAYS
+    chunk_concurrency: int = settings.ITINERARY_CHUNK_CONCURRENCY
+    
+    # Reorder each day's stops after generation (see _optimize_routes)
+    route_optimization: bool = settings.ITINERARY_ROUTE_OPTIMIZATION
+    
+    # Output budget per request and continuation of cut-off answers
+    # (see _generate_days)
+    max_output_tokens: int = settings.ITINERARY_MAX_OUTPUT_TOKENS
+    max_continuations: int = settings.ITINERARY_MAX_CONTINUATIONS
+    
     def get_system_prompt(self) -> str:
-        return """
-        You are an expert travel itinerary planner. Your role is to:
-        
-        1. Create detailed, day-by-day travel itineraries
-        2. Balance activities, rest, and travel time
-        3. Optimize routes and timing
-        4. Consider user preferences and energy levels
-        5. Include practical tips and local insights
-        
-        Always ensure:
-        - Realistic timing and logistics
-        - Mix of popular and off-the-beaten-path experiences
-        - Flexibility for spontaneous changes
-        - Cultural sensitivity and respect
-        - Accessibility considerations
-        
-        Format itineraries as structured JSON with daily breakdowns.
-        """
+        return self._render(SYSTEM_PROMPT)
     
     async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -42,56 +159,474 @@ class ItineraryAgent(BaseAgent):
                 - special_requirements: List[str]
         
         Returns:
-            Dict containing the complete itinerary
+            Dict containing the parsed itinerary (daily_plans, overview,
+            total_estimated_cost). Trips longer than ``chunk_days`` are
+            generated in parallel chunks (see ``execute_chunked``).
         """
         if not self.validate_input(input_data):
             raise ValueError("Invalid input data")
         
+        if self.chunked_generation and input_data["duration"] > self.chunk_days:
+            return await self.execute_chunked(input_data)
+        
         destination = input_data.get("destination")
         duration = input_data.get("duration")
-        interests = input_data.get("interests", [])
+        context = await self._knowledge_context(input_data)
+        user_message = self._build_user_message(input_data, context)
+        
+        days, document = await self._generate_days(
+            user_message,
+            ItineraryOutput,
+            1,
+            duration,
+            input_data.get("pace", "moderate"),
+            semantic_key=self._semantic_key(input_data),
+        )
+        daily_plans = await self._optimize_routes(days, input_data)
+        
+        results = {
+            "destination": destination,
+            "duration": duration,
+            "daily_plans": daily_plans,
+            "overview": document.get("overview", ""),
+            "total_estimated_cost": self._total_cost(
+                daily_plans, document.get("total_estimated_cost")
+            ),
+            "generated_at": asyncio.get_event_loop().time(),
+        }
+        
+        return self.sanitize_output(results)
+    
+    async def personalize(
+        self,
+        template: Dict[str, Any],
+        input_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Adapt a precomputed itinerary instead of generating one.
+        
+        The template (an itinerary at the same pace, at least as long as
+        the trip) provides the first ``duration`` days. Without interests or
+        special requirements it is served as-is, with no LLM call; otherwise
+        one call rewrites only the days that do not suit the traveler.
+        
+        Returns:
+            Dict with the same keys as ``execute``
+        """
+        if not self.validate_input(input_data):
+            raise ValueError("Invalid input data")
+        
+        duration = input_data["duration"]
         pace = input_data.get("pace", "moderate")
-        special_requirements = input_data.get("special_requirements", [])
-        
-        user_message = f"""
-        Create a detailed {duration}-day itinerary for {destination}.
-        
-        Traveler Profile:
-        - Interests: {', '.join(interests)}
-        - Preferred Pace: {pace}
-        - Special Requirements: {', '.join(special_requirements)}
-        
-        For each day, provide:
-        1. Morning activities (with timing)
-        2. Lunch recommendations
-        3. Afternoon activities
-        4. Evening plans
-        5. Dinner suggestions
-        6. Accommodation notes
-        7. Transportation details
-        8. Estimated daily budget
-        9. Pro tips and local insights
-        
-        Ensure the itinerary is:
-        - Logistically feasible
-        - Culturally respectful
-        - Balanced and enjoyable
-        - Includes buffer time
-        
-        Format as JSON with clear day-by-day structure.
+        interests = input_data.get("interests") or []
+        special_requirements = input_data.get("special_requirements") or []
+        daily_plans = template["daily_plans"][:duration]
+        if len(daily_plans) < duration:
+            raise ValueError("Template is shorter than the trip")
+        
+        changed: List[Dict[str, Any]] = []
+        if interests or special_requirements:
+            user_message = self._render(
+                ADAPT_PROMPT,
+                template_duration=template["duration"],
+                destination=input_data["destination"],
+                pace=pace,
+                itinerary=json.dumps(
+                    {"daily_plans": daily_plans}, separators=(",", ":")
+                ),
+                duration=duration,
+                interests=", ".join(interests),
+                special_requirements=", ".join(special_requirements),
+            )
+            context = await self._knowledge_context(input_data)
+            if context:
+                user_message += "\n\n" + context
+            changed, _ = await self._generate_days(
+                user_message, ItineraryDays, 1, duration, pace
+            )
+            changed = await self._optimize_routes(changed, input_data)
+            by_day = {day["day"]: day for day in changed}
+            daily_plans = [by_day.get(day["day"], day) for day in daily_plans]
+        
+        declared = None
+        if not changed and duration == template["duration"]:
+            declared = template["total_estimated_cost"]
+        results = {
+            "destination": input_data["destination"],
+            "duration": duration,
+            "daily_plans": daily_plans,
+            "overview": template.get("overview", ""),
+            "total_estimated_cost": self._total_cost(daily_plans, declared),
+            "days_adapted": len(changed),
+            "generated_at": asyncio.get_event_loop().time(),
+        }
+        
+        return self.sanitize_output(results)
+    
+    async def _knowledge_context(self, input_data: Dict[str, Any]) -> str:
+        """Knowledge base notes matching the traveler's interests and needs."""
+        return await self._retrieve_context(
+            input_data["destination"],
+            [
+                *input_data.get("interests", []),
+                *input_data.get("special_requirements", []),
+                "getting around",
+            ],
+        )
+    
+    def _build_user_message(self, input_data: Dict[str, Any], context: str = "") -> str:
+        """Build the itinerary request prompt from validated input.
+        
+        ``context`` is retrieved reference material appended to the prompt.
         """
+        user_message = self._render(
+            USER_PROMPT,
+            destination=input_data.get("destination"),
+            duration=input_data.get("duration"),
+            interests=", ".join(input_data.get("interests", [])),
+            pace=input_data.get("pace", "moderate"),
+            special_requirements=", ".join(input_data.get("special_requirements", [])),
+        )
+        if context:
+            user_message += "\n\n" + context
+        return user_message
+    
+    @staticmethod
+    def _semantic_key(input_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Semantic cache key: trip length and pace, then the free text."""
+        text = "\n".join([
+            str(input_data["destination"]),
+            ", ".join(input_data.get("interests", [])),
+            ", ".join(input_data.get("special_requirements", [])),
+        ])
+        return f"{input_data['duration']}|{input_data.get('pace', 'moderate')}", text
+    
+    async def execute_chunked(
+        self,
+        input_data: Dict[str, Any],
+        chunk_days: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate a long itinerary as concurrent day-range chunks.
         
-        response = await self._generate_response(user_message)
+        A short skeleton call first fixes the accommodation base and the
+        theme of every day, so chunks generated in parallel stay consistent
+        and do not repeat activities. Chunks then run under a semaphore and
+        are merged in day order.
+        
+        Returns:
+            Dict with destination, duration, daily_plans, overview,
+            total_estimated_cost and the skeleton used
+        """
+        if not self.validate_input(input_data):
+            raise ValueError("Invalid input data")
+        
+        chunk_days = chunk_days or self.chunk_days
+        semaphore = asyncio.Semaphore(concurrency or self.chunk_concurrency)
+        destination = input_data.get("destination")
+        duration = input_data["duration"]
+        pace = input_data.get("pace", "moderate")
+        base_message = self._build_user_message(
+            input_data, await self._knowledge_context(input_data)
+        )
+        
+        skeleton = await self._generate_skeleton(base_message, duration)
+        skeleton_json = json.dumps(skeleton, separators=(",", ":"))
+        
+        async def generate_chunk(first: int, last: int) -> List[Dict[str, Any]]:
+            user_message = base_message + "\n\n" + self._render(
+                CHUNK_PROMPT,
+                first=first,
+                last=last,
+                duration=duration,
+                skeleton=skeleton_json,
+            )
+            async with semaphore:
+                days, _ = await self._generate_days(
+                    user_message, ItineraryDays, first, last, pace
+                )
+            return days
+        
+        ranges = [
+            (first, min(first + chunk_days - 1, duration))
+            for first in range(1, duration + 1, chunk_days)
+        ]
+        chunks = await asyncio.gather(
+            *(generate_chunk(first, last) for first, last in ranges)
+        )
+        
+        daily_plans = await self._optimize_routes(
+            sorted(
+                (day for chunk in chunks for day in chunk),
+                key=lambda day: day["day"],
+            ),
+            input_data,
+        )
         
         results = {
             "destination": destination,
             "duration": duration,
-            "itinerary": response,
+            "daily_plans": daily_plans,
+            "overview": str(skeleton.get("overview", "")),
+            "total_estimated_cost": self._total_cost(daily_plans),
+            "skeleton": skeleton,
             "generated_at": asyncio.get_event_loop().time(),
         }
         
         return self.sanitize_output(results)
     
+    async def _generate_skeleton(
+        self,
+        base_message: str,
+        duration: int,
+    ) -> Dict[str, Any]:
+        """Ask for a compact outline of the whole trip."""
+        user_message = base_message + "\n\n" + self._render(
+            SKELETON_PROMPT, duration=duration
+        )
+        try:
+            skeleton = await self._generate_structured(
+                user_message,
+                output_model=TripSkeleton,
+                max_tokens=SKELETON_OUTPUT_TOKENS + duration * SKELETON_DAY_TOKENS,
+            )
+        except StructuredOutputError:
+            logger.warning("Could not parse itinerary skeleton; continuing without")
+            return {}
+        return skeleton.model_dump()
+    
+    def _output_budget(self, days: int, pace: str) -> int:
+        """``max_tokens`` for ``days`` more days, capped per answer."""
+        return min(estimate_output_tokens(days, pace), self.max_output_tokens)
+    
+    async def _generate_days(
+        self,
+        user_message: str,
+        output_model: Type[ItineraryDays],
+        first: int,
+        last: int,
+        pace: str,
+        semantic_key: Optional[Tuple[str, str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Generate days ``first`` to ``last``, continuing cut-off answers.
+        
+        ``max_tokens`` is sized for the days still missing. When an answer
+        stops on length (its JSON document never closes), its complete days
+        are kept and the model is asked for the remaining days only, up to
+        ``max_continuations`` times, instead of starting over. An answer cut
+        off after its last day needs no continuation. Continuations
+        bypass the response cache; ``semantic_key`` applies to the first
+        call only.
+        
+        Returns:
+            The day plans, and the last answer's other fields (without a
+            total cost that only covers the continued days)
+        """
+        system_prompt = self.get_system_prompt() + schema_instructions(output_model)
+        days: List[Dict[str, Any]] = []
+        message = user_message
+        
+        for attempt in range(self.max_continuations + 1):
+            done = days[-1]["day"] if days else first - 1
+            max_tokens = self._output_budget(last - done, pace)
+            response = await self._generate_response(
+                message,
+                system_prompt=system_prompt,
+                max_tokens=max_tokens,
+                json_mode=True,
+                cache=not attempt,
+                semantic_key=None if attempt else semantic_key,
+            )
+            parser = IncrementalArrayParser("daily_plans")
+            items = parser.feed(response)
+            
+            if parser.closed:
+                try:
+                    document = parse_output(response, output_model)
+                except StructuredOutputError as e:
+                    logger.warning(f"Re-prompting after unparseable output: {str(e)}")
+                    document = await self._reprompt(
+                        message, output_model, system_prompt, max_tokens
+                    )
+                days += self._new_days(
+                    [day.model_dump() for day in document.daily_plans], done, last
+                )
+                extra = document.model_dump(exclude={"daily_plans"})
+                if attempt:
+                    extra.pop("total_estimated_cost", None)
+                return days, extra
+            
+            added = self._new_days(items, done, last)
+            days += added
+            if days and days[-1]["day"] == last:
+                # Cut off after the last day, in the overview or total: all
+                # days are in and the caller sums the total from them
+                self._record_cutoff(parser, continued=False)
+                return days, {}
+            if not added or attempt == self.max_continuations:
+                self._record_cutoff(parser, continued=False)
+                break
+            message = self._continuation_message(user_message, parser, days, last)
+        
+        if not days:
+            raise StructuredOutputError("Itinerary answer cut off before its first day")
+        logger.warning(
+            f"Itinerary cut off after day {days[-1]['day']} of {last}; "
+            f"returning the days generated"
+        )
+        return days, {}
+    
+    @staticmethod
+    def _new_days(
+        items: List[Dict[str, Any]],
+        done: int,
+        last: int,
+    ) -> List[Dict[str, Any]]:
+        """Valid day plans numbered after ``done`` up to ``last``, in order."""
+        days = []
+        for item in items:
+            try:
+                day = DayPlan.model_validate(item)
+            except ValidationError:
+                logger.warning("Skipping invalid day plan")
+                continue
+            if done < day.day <= last:
+                days.append(day.model_dump())
+                done = day.day
+        return days
+    
+    def _record_cutoff(self, parser: IncrementalArrayParser, continued: bool) -> None:
+        """Count the discarded partial day and, if continuing, the new call."""
+        agent = type(self).__name__
+        LLM_WASTED_TOKENS.labels(agent).inc(
+            count_tokens(parser.text[parser.item_end:], self.model)
+        )
+        if continued:
+            LLM_CONTINUATIONS.labels(agent).inc()
+    
+    def _continuation_message(
+        self,
+        user_message: str,
+        parser: IncrementalArrayParser,
+        days: List[Dict[str, Any]],
+        last: int,
+    ) -> str:
+        """Request for the days after the last complete one."""
+        self._record_cutoff(parser, continued=True)
+        visited = list(dict.fromkeys(
+            stop["name"] for day in days for stop in day["stops"]
+        ))[-CONTINUATION_MAX_VISITED:]
+        done = days[-1]["day"]
+        logger.info(f"Itinerary cut off after day {done}; continuing to day {last}")
+        return user_message + "\n\n" + self._render(
+            CONTINUE_PROMPT,
+            done=done,
+            first=done + 1,
+            last=last,
+            visited=", ".join(visited) or "none",
+        )
+    
+    async def _optimize_routes(
+        self,
+        daily_plans: List[Dict[str, Any]],
+        input_data: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """
+        Order and time each day's stops and rebalance overloaded days.
+        
+        Skipped without a Google Maps key; failures keep the model's plan.
+        """
+        maps = provider_clients.maps
+        if not self.route_optimization or not maps.configured:
+            return daily_plans
+        try:
+            return await optimize_itinerary_routes(
+                daily_plans,
+                input_data["destination"],
+                input_data.get("pace", "moderate"),
+                maps,
+            )
+        except Exception as e:
+            logger.warning(f"Route optimization failed: {str(e)}")
+            return daily_plans
+    
+    @staticmethod
+    def _total_cost(
+        daily_plans: List[Dict[str, Any]],
+        declared: Optional[float] = None,
+    ) -> float:
+        """Total trip cost, summed from the days if the model omitted it."""
+        if declared is not None:
+            return float(declared)
+        return float(sum(day["estimated_cost"] for day in daily_plans))
+    
+    async def stream(
+        self,
+        input_data: Dict[str, Any],
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate an itinerary incrementally.
+        
+        Yields ("day", plan) for each daily plan as soon as the model closes
+        its JSON object, then a single ("summary", data) event carrying the
+        overview and total estimated cost.
+        """
+        if not self.validate_input(input_data):
+            raise ValueError("Invalid input data")
+        
+        user_message = self._build_user_message(
+            input_data, await self._knowledge_context(input_data)
+        )
+        system_prompt = self.get_system_prompt() + schema_instructions(ItineraryOutput)
+        duration = input_data["duration"]
+        pace = input_data.get("pace", "moderate")
+        semantic_key = self._semantic_key(input_data)
+        days: List[Dict[str, Any]] = []
+        message = user_message
+        overview, declared = "", None
+        
+        for attempt in range(self.max_continuations + 1):
+            done = days[-1]["day"] if days else 0
+            parser = IncrementalArrayParser("daily_plans")
+            added = 0
+            async for chunk in self._stream_response(
+                message,
+                system_prompt=system_prompt,
+                max_tokens=self._output_budget(duration - done, pace),
+                cache=not attempt,
+                semantic_key=None if attempt else semantic_key,
+            ):
+                for day in self._new_days(
+                    parser.feed(chunk), days[-1]["day"] if days else 0, duration
+                ):
+                    days.append(day)
+                    added += 1
+                    yield "day", day
+            
+            if parser.closed:
+                try:
+                    document = parse_output(parser.text, ItineraryOutput)
+                    overview = document.overview
+                    declared = None if attempt else document.total_estimated_cost
+                except StructuredOutputError:
+                    pass
+                break
+            if days and days[-1]["day"] == duration:
+                # Cut off after the last day: the total is summed instead
+                self._record_cutoff(parser, continued=False)
+                break
+            if not added or attempt == self.max_continuations:
+                self._record_cutoff(parser, continued=False)
+                break
+            message = self._continuation_message(user_message, parser, days, duration)
+        
+        yield "summary", {
+            "overview": overview,
+            "total_estimated_cost": self._total_cost(days, declared),
+        }
+    
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """Validate itinerary input data."""
         required_fields = ["destination", "duration"]
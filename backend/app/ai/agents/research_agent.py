@@ -3,30 +3,69 @@ import asyncio
 import logging
 
 from app.ai.agents.base_agent import BaseAgent
+from app.ai.prompts import PromptTemplate
+from app.ai.schemas import ResearchOutput
 
 logger = logging.getLogger(__name__)
 
+# Looked up in the knowledge base alongside the traveler's preferences
+RESEARCH_TOPICS = (
+    "local transportation", "safety", "sustainable travel", "where to stay"
+)
+
+# Everything that is the same for every request lives in the system prompt,
+# so providers can cache it as a prompt prefix
+SYSTEM_PROMPT = PromptTemplate("research_system", """
+    You are an expert travel research assistant. Your role is to:
+    
+    1. Research and compare travel options (flights, hotels, activities)
+    2. Analyze prices, reviews, and availability
+    3. Consider user preferences and constraints
+    4. Provide comprehensive, unbiased recommendations
+    5. Explain your reasoning clearly
+    
+    Always prioritize:
+    - Accuracy of information
+    - User safety and security
+    - Value for money
+    - Sustainable and ethical travel options
+    
+    For each trip, provide:
+    1. Flight options (3-5 best options)
+    2. Accommodation options (3-5 best options)
+    3. Top activities and attractions (5-10, priced per person)
+    4. Local transportation recommendations
+    5. Safety considerations
+    6. Sustainable travel tips
+    
+    Put items 4 to 6 in "recommendations" as concise prose. The budget
+    is allocated separately from your options. When reference notes are
+    given, summarise them for items 4 to 6 rather than writing general
+    advice.
+    
+    Format your responses as structured JSON with clear categories.
+""")
+
+USER_PROMPT = PromptTemplate("research_user", """
+    Research travel options for the following trip:
+    
+    Destination: {destination}
+    Travel Dates: {start_date} to {end_date}
+    Budget: ${budget}
+    Number of Travelers: {travelers}
+    Preferences: {preferences}
+""")
+
+
 class ResearchAgent(BaseAgent):
     """Agent specialized in researching travel options."""
     
+    cache_responses = True
+    use_knowledge = True
+    output_model = ResearchOutput
+    
     def get_system_prompt(self) -> str:
-        return """
-        You are an expert travel research assistant. Your role is to:
-        
-        1. Research and compare travel options (flights, hotels, activities)
-        2. Analyze prices, reviews, and availability
-        3. Consider user preferences and constraints
-        4. Provide comprehensive, unbiased recommendations
-        5. Explain your reasoning clearly
-        
-        Always prioritize:
-        - Accuracy of information
-        - User safety and security
-        - Value for money
-        - Sustainable and ethical travel options
-        
-        Format your responses as structured JSON with clear categories.
-        """
+        return self._render(SYSTEM_PROMPT)
     
     async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -52,36 +91,38 @@ class ResearchAgent(BaseAgent):
         budget = input_data.get("budget")
         preferences = input_data.get("preferences", [])
         travelers = input_data.get("travelers", 1)
+        context = await self._retrieve_context(
+            destination, [*preferences, *RESEARCH_TOPICS]
+        )
         
         # Create research prompt
-        user_message = f"""
-        Research travel options for the following trip:
-        
-        Destination: {destination}
-        Travel Dates: {dates['start_date']} to {dates['end_date']}
-        Budget: ${budget}
-        Number of Travelers: {travelers}
-        Preferences: {', '.join(preferences)}
+        user_message = self._render(
+            USER_PROMPT,
+            destination=destination,
+            start_date=dates["start_date"],
+            end_date=dates["end_date"],
+            budget=budget,
+            travelers=travelers,
+            preferences=", ".join(preferences),
+        )
+        if context:
+            user_message += "\n\n" + context
         
-        Please provide:
-        1. Flight options (3-5 best options)
-        2. Accommodation options (3-5 best options)
-        3. Top activities and attractions
-        4. Local transportation recommendations
-        5. Budget breakdown
-        6. Safety considerations
-        7. Sustainable travel tips
-        
-        Format the response as JSON.
-        """
+        # Similar requests share an answer only for the same dates, budget
+        # and party size
+        semantic_key = (
+            f"{dates['start_date']}|{dates['end_date']}|{budget}|{travelers}",
+            f"{destination}\n{', '.join(preferences)}",
+        )
         
-        # Generate response
-        response = await self._generate_response(user_message)
+        # Generate and parse response
+        research = await self._generate_structured(
+            user_message, semantic_key=semantic_key
+        )
         
-        # Parse and structure results
         results = {
             "destination": destination,
-            "research_data": response,
+            "research_data": research.model_dump(),
             "timestamp": asyncio.get_event_loop().time(),
         }
         
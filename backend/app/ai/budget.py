@@ -0,0 +1,208 @@
+"""
+Budget agent: picks the best flight, hotel and activities under a budget.
+
+Deterministic and LLM-free. Options are scored with NumPy, every
+flight/hotel pair is bounded at once, and the activities for each
+promising pair are chosen with a branch-and-bound 0/1 knapsack.
+"""
+from typing import List, Optional, Sequence, Tuple
+import heapq
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.ai.schemas import ActivityOption, FlightOption, HotelOption
+
+# Relative weight of each part of a bundle's score; each activity adds
+# between 0.5 and 1 (preference matches count double)
+_FLIGHT_WEIGHT = 2.0
+_HOTEL_WEIGHT = 3.0
+
+
+class BudgetBreakdown(BaseModel):
+    flights: float
+    accommodation: float
+    activities: float
+
+
+class BudgetBundle(BaseModel):
+    """One flight, one hotel and a set of activities, priced for the group."""
+    flight: Optional[FlightOption] = None
+    hotel: Optional[HotelOption] = None
+    activities: List[ActivityOption] = []
+    total: float
+    breakdown: BudgetBreakdown
+    score: float
+
+
+def _spread(values: np.ndarray) -> np.ndarray:
+    """Min-max scale to [0, 1]; constant inputs map to 0."""
+    if values.size == 0:
+        return values
+    span = values.max() - values.min()
+    return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+
+def score_flights(flights: Sequence[FlightOption]) -> np.ndarray:
+    """Cheaper and more direct is better, in [0, 1]."""
+    prices = np.array([f.price for f in flights], dtype=float)
+    stops = np.array([f.stops for f in flights], dtype=float)
+    return 1.0 - 0.6 * _spread(prices) - 0.4 * stops / max(stops.max(initial=0), 1)
+
+
+def score_hotels(hotels: Sequence[HotelOption]) -> np.ndarray:
+    """Better rated and cheaper is better, in [0, 1]."""
+    ratings = np.array([h.rating for h in hotels], dtype=float)
+    prices = np.array([h.price_per_night for h in hotels], dtype=float)
+    return 0.7 * np.clip(ratings / 5.0, 0, 1) + 0.3 * (1.0 - _spread(prices))
+
+
+def score_activities(
+    activities: Sequence[ActivityOption],
+    preferences: Sequence[str] = (),
+) -> np.ndarray:
+    """0.5 per activity, 1.0 when it matches one of the traveler's preferences."""
+    keywords = [p.lower() for p in preferences if p]
+    return np.array(
+        [
+            1.0 if any(k in f"{a.name} {a.category}".lower() for k in keywords) else 0.5
+            for a in activities
+        ],
+        dtype=float,
+    )
+
+
+class _Knapsack:
+    """
+    0/1 knapsack over activities by branch and bound.
+
+    Items are sorted by value density once; the fractional relaxation of the
+    remaining items bounds each branch.
+    """
+
+    def __init__(self, values: np.ndarray, costs: np.ndarray):
+        density = values / np.maximum(costs, 1e-9)
+        self.order = np.argsort(-density, kind="stable")
+        self.values = values[self.order]
+        self.costs = costs[self.order]
+        self.cum_values = np.concatenate(([0.0], np.cumsum(self.values)))
+        self.cum_costs = np.concatenate(([0.0], np.cumsum(self.costs)))
+
+    def upper_bounds(self, capacities: np.ndarray) -> np.ndarray:
+        """Fractional-relaxation bound for many capacities at once."""
+        n = len(self.values)
+        if n == 0:
+            return np.where(capacities >= 0, 0.0, -np.inf)
+        # Whole items that fit, then a fraction of the next one
+        k = np.searchsorted(self.cum_costs, capacities, side="right") - 1
+        k = np.clip(k, 0, n)
+        bound = self.cum_values[k]
+        partial = k < n
+        nxt = np.minimum(k, n - 1)
+        room = capacities - self.cum_costs[k]
+        bound = bound + np.where(
+            partial, self.values[nxt] * room / np.maximum(self.costs[nxt], 1e-9), 0.0
+        )
+        return np.where(capacities >= 0, bound, -np.inf)
+
+    def _bound(self, i: int, value: float, room: float) -> float:
+        for k in range(i, len(self.values)):
+            if self.costs[k] <= room:
+                room -= self.costs[k]
+                value += self.values[k]
+            else:
+                return value + self.values[k] * room / self.costs[k]
+        return value
+
+    def solve(self, capacity: float) -> Tuple[float, List[int]]:
+        """Best value and the chosen item indices (in the caller's order)."""
+        best_value = 0.0
+        best: List[int] = []
+        chosen: List[int] = []
+
+        def branch(i: int, value: float, room: float) -> None:
+            nonlocal best_value, best
+            if value > best_value:
+                best_value, best = value, list(chosen)
+            if i == len(self.values) or self._bound(i, value, room) <= best_value:
+                return
+            if self.costs[i] <= room:
+                chosen.append(i)
+                branch(i + 1, value + self.values[i], room - self.costs[i])
+                chosen.pop()
+            branch(i + 1, value, room)
+
+        branch(0, 0.0, capacity)
+        return best_value, sorted(int(self.order[i]) for i in best)
+
+
+def optimize_budget(
+    flights: Sequence[FlightOption],
+    hotels: Sequence[HotelOption],
+    activities: Sequence[ActivityOption],
+    budget: float,
+    travelers: int,
+    nights: int,
+    preferences: Sequence[str] = (),
+    top_k: int = 3,
+) -> List[BudgetBundle]:
+    """
+    The ``top_k`` best-scoring bundles (one per flight/hotel pair) whose
+    total for ``travelers`` over ``nights`` fits ``budget``, best first.
+
+    Flight and activity prices are per person, hotels per night. Missing
+    flights or hotels are left out of the bundles. Returns an empty list
+    when not even the cheapest pair fits.
+    """
+    nights = max(nights, 1)
+    flight_costs = np.array([f.price * travelers for f in flights], dtype=float)
+    hotel_costs = np.array([h.price_per_night * nights for h in hotels], dtype=float)
+    flight_scores = _FLIGHT_WEIGHT * score_flights(flights)
+    hotel_scores = _HOTEL_WEIGHT * score_hotels(hotels)
+    # A missing leg is a free, neutral placeholder
+    if not flights:
+        flight_costs, flight_scores = np.zeros(1), np.zeros(1)
+    if not hotels:
+        hotel_costs, hotel_scores = np.zeros(1), np.zeros(1)
+
+    activity_values = score_activities(activities, preferences)
+    activity_costs = np.array([a.price * travelers for a in activities], dtype=float)
+    knapsack = _Knapsack(activity_values, activity_costs)
+
+    # Every flight/hotel pair at once: cost, score and an optimistic bound
+    pair_costs = flight_costs[:, None] + hotel_costs[None, :]
+    pair_scores = flight_scores[:, None] + hotel_scores[None, :]
+    remaining = budget - pair_costs
+    bounds = pair_scores + knapsack.upper_bounds(remaining)
+
+    best: List[Tuple[float, int, int, List[int], float]] = []
+    for flat in np.argsort(-bounds, axis=None):
+        i, j = np.unravel_index(flat, bounds.shape)
+        if not np.isfinite(bounds[i, j]):
+            break
+        if len(best) == top_k and bounds[i, j] <= best[0][0]:
+            break  # no remaining pair can beat the current top-k
+        value, picked = knapsack.solve(float(remaining[i, j]))
+        score = float(pair_scores[i, j] + value)
+        entry = (score, int(i), int(j), picked, float(pair_costs[i, j]))
+        if len(best) < top_k:
+            heapq.heappush(best, entry)
+        elif entry[0] > best[0][0]:
+            heapq.heapreplace(best, entry)
+
+    bundles = []
+    for score, i, j, picked, pair_cost in sorted(best, key=lambda e: -e[0]):
+        activity_total = float(activity_costs[picked].sum()) if picked else 0.0
+        bundles.append(BudgetBundle(
+            flight=flights[i] if flights else None,
+            hotel=hotels[j] if hotels else None,
+            activities=[activities[k] for k in picked],
+            total=round(pair_cost + activity_total, 2),
+            breakdown=BudgetBreakdown(
+                flights=round(float(flight_costs[i]), 2),
+                accommodation=round(float(hotel_costs[j]), 2),
+                activities=round(activity_total, 2),
+            ),
+            score=round(score, 4),
+        ))
+    return bundles
@@ -0,0 +1,308 @@
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
+import asyncio
+import hashlib
+import logging
+import time
+
+from app.ai.embeddings import encode, load_encoder
+from app.core.config import settings
+from app.core.metrics import LLM_CACHE_REQUESTS
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# (facts, text): structured request fields that must match exactly, and the
+# free text compared by embedding
+SemanticKey = Tuple[str, str]
+
+
+def make_cache_key(
+    system_prompt: str,
+    user_message: str,
+    model: str,
+    temperature: float,
+) -> str:
+    """Stable digest of everything that determines an LLM completion."""
+    digest = hashlib.sha256()
+    for part in (model, repr(float(temperature)), system_prompt, user_message):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TTLCache(Generic[V]):
+    """Size-bounded LRU mapping whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[V]:
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over request text embeddings.
+
+    Entries are partitioned by (system prompt, request facts, model,
+    temperature), so a hit is only possible between requests to the same
+    agent configuration with the same dates, budget, party size, etc.; only
+    the free text (destination, interests) is matched by similarity.
+    Requires the optional ``sentence-transformers`` and ``faiss-cpu``
+    packages; the tier disables itself if they cannot be imported or the
+    model cannot be loaded.
+    """
+
+    def __init__(
+        self,
+        model_name: str = settings.LLM_SEMANTIC_CACHE_MODEL,
+        threshold: float = settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = settings.LLM_SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = settings.LLM_CACHE_TTL_SECONDS,
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.available = True
+        self._encoder: Any = None
+        self._indexes: Dict[str, Any] = {}
+        # id -> (partition, expires_at, value), in insertion order
+        self._entries: "OrderedDict[int, Tuple[str, float, str]]" = OrderedDict()
+        self._next_id = 0
+
+    def _load(self) -> bool:
+        if self._encoder is not None or not self.available:
+            return self.available
+        try:
+            import faiss  # noqa: F401
+            self._encoder = load_encoder(self.model_name)
+        except ImportError:
+            logger.warning(
+                "Semantic LLM cache disabled: sentence-transformers/faiss "
+                "not installed"
+            )
+            self.available = False
+            return False
+        except Exception as e:
+            # e.g. the model download failed; answer without this tier
+            logger.warning(
+                f"Semantic LLM cache disabled: cannot load {self.model_name}: "
+                f"{str(e)}"
+            )
+            self.available = False
+            return False
+        return True
+
+    def _index(self, partition: str):
+        import faiss
+
+        index = self._indexes.get(partition)
+        if index is None:
+            dim = self._encoder.get_sentence_embedding_dimension()
+            index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._indexes[partition] = index
+        return index
+
+    async def _embed(self, text: str):
+        # Encoding is CPU-bound; keep it off the event loop.
+        return await asyncio.to_thread(encode, self._encoder, [text])
+
+    async def get(self, partition: str, text: str) -> Optional[str]:
+        if not self._load() or partition not in self._indexes:
+            return None
+        vector = await self._embed(text)
+        index = self._indexes.get(partition)
+        if index is None or index.ntotal == 0:
+            return None
+        scores, ids = index.search(vector, 1)
+        entry_id = int(ids[0][0])
+        if entry_id < 0 or scores[0][0] < self.threshold:
+            return None
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            self._remove([entry_id])
+            return None
+        return entry[2]
+
+    async def set(self, partition: str, text: str, value: str) -> None:
+        if not self._load():
+            return
+        import numpy as np
+
+        vector = await self._embed(text)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index(partition).add_with_ids(
+            vector, np.array([entry_id], dtype="int64")
+        )
+        self._entries[entry_id] = (partition, time.monotonic() + self.ttl, value)
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            self._remove(list(islice(self._entries, overflow)))
+
+    def _remove(self, entry_ids: List[int]) -> None:
+        import numpy as np
+
+        by_partition: Dict[str, List[int]] = {}
+        for entry_id in entry_ids:
+            entry = self._entries.pop(entry_id, None)
+            if entry is not None:
+                by_partition.setdefault(entry[0], []).append(entry_id)
+        for partition, ids in by_partition.items():
+            self._indexes[partition].remove_ids(np.array(ids, dtype="int64"))
+
+    def clear(self) -> None:
+        self._indexes.clear()
+        self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM completions.
+
+    The exact tier is an in-process LRU backed by Redis, keyed by a digest of
+    (system prompt, user message, model, temperature). The optional semantic
+    tier matches near-identical requests for the same agent setup; it is
+    only consulted for calls that pass a ``semantic_key``.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.LLM_CACHE_TTL_SECONDS,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        use_redis: bool = settings.LLM_CACHE_REDIS_ENABLED,
+        semantic: Optional[SemanticCache] = None,
+        namespace: str = "llm:v1",
+    ):
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.namespace = namespace
+        self.local: TTLCache[str] = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.semantic = semantic
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    @staticmethod
+    def _record(agent: str, tier: str, outcome: str) -> None:
+        LLM_CACHE_REQUESTS.labels(agent=agent, tier=tier, outcome=outcome).inc()
+
+    async def get(
+        self,
+        agent: str,
+        system_prompt: str,
+        user_message: str,
+        model: str,
+        temperature: float,
+        semantic_key: Optional[SemanticKey] = None,
+    ) -> Optional[str]:
+        """Return a cached completion or None."""
+        key = make_cache_key(system_prompt, user_message, model, temperature)
+
+        value = self.local.get(key)
+        if value is not None:
+            self._record(agent, "memory", "hit")
+            return value
+        self._record(agent, "memory", "miss")
+
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"LLM cache Redis lookup failed: {str(e)}")
+                raw = None
+            if raw is not None:
+                value = raw.decode("utf-8")
+                self.local.set(key, value)
+                self._record(agent, "redis", "hit")
+                return value
+            self._record(agent, "redis", "miss")
+
+        if self.semantic is not None and semantic_key is not None:
+            facts, text = semantic_key
+            partition = make_cache_key(system_prompt, facts, model, temperature)
+            try:
+                value = await self.semantic.get(partition, text)
+            except Exception as e:
+                logger.warning(f"LLM cache semantic lookup failed: {str(e)}")
+                return None
+            self._record(agent, "semantic", "hit" if value is not None else "miss")
+            return value
+
+        return None
+
+    async def set(
+        self,
+        agent: str,
+        system_prompt: str,
+        user_message: str,
+        model: str,
+        temperature: float,
+        value: str,
+        semantic_key: Optional[SemanticKey] = None,
+    ) -> None:
+        """Store a completion in every enabled tier."""
+        key = make_cache_key(system_prompt, user_message, model, temperature)
+        self.local.set(key, value)
+
+        if self.use_redis:
+            try:
+                await get_redis().set(self._redis_key(key), value, ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache Redis write failed: {str(e)}")
+
+        if self.semantic is not None and semantic_key is not None:
+            facts, text = semantic_key
+            partition = make_cache_key(system_prompt, facts, model, temperature)
+            try:
+                await self.semantic.set(partition, text, value)
+            except Exception as e:
+                logger.warning(f"LLM cache semantic write failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop the in-process tiers (Redis entries expire on their own)."""
+        self.local.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    """Create the response cache described by the settings, if enabled."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    semantic = SemanticCache() if settings.LLM_SEMANTIC_CACHE_ENABLED else None
+    return ResponseCache(semantic=semantic)
@@ -0,0 +1,402 @@
+"""
+Destination recommendations from a FAISS index built offline.
+
+``python -m app.ai.destinations data/destinations.jsonl`` embeds the
+catalogue and writes a new generation of the index under
+DESTINATION_INDEX_PATH:
+
+    trained.index          IVF coarse quantizer, reused across builds
+    <generation>/
+        populated.index    IVF header and centroids
+        lists.ivfdata      inverted lists, memory-mapped
+        embeddings.npy     one row per destination, memory-mapped
+        destinations.jsonl
+        meta.json
+    current -> <generation>
+
+Workers load ``current`` at startup; both memory-mapped files are shared
+through the page cache, so N workers do not hold N copies. Rebuilds only
+encode destinations whose text changed since the previous generation and
+keep the quantizer until the catalogue has doubled.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.ai.cache import TTLCache
+from app.ai.embeddings import encode, load_encoder
+from app.ai.index_store import CURRENT, new_generation, publish
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TRAINED = "trained.index"
+
+
+class Destination(BaseModel):
+    id: str
+    name: str
+    country: str = ""
+    category: str = ""
+    description: str = ""
+    tags: List[str] = []
+    popularity: float = 0.0
+
+
+class DestinationMatch(Destination):
+    score: Optional[float] = None  # cosine similarity to the profile
+
+
+def _document(destination: Destination) -> str:
+    """Text embedded for a destination."""
+    parts = [
+        destination.name,
+        destination.category,
+        ", ".join(destination.tags),
+        destination.description,
+    ]
+    return ". ".join(part for part in parts if part)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _nlist(count: int) -> int:
+    """Inverted lists for ``count`` vectors (~4 sqrt(n), 39+ points each)."""
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def profile_text(interests: Sequence[str], travel_style: str = "") -> str:
+    text = f"Interests: {', '.join(interests)}."
+    if travel_style:
+        text += f" Travel style: {travel_style}."
+    return text
+
+
+def read_catalogue(path: Path) -> List[Destination]:
+    """Destinations from a JSON-lines file, one object per line."""
+    destinations = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            destination = Destination.model_validate_json(line)
+            if destination.id in seen:
+                raise ValueError(f"{path}:{number}: duplicate id {destination.id!r}")
+            seen.add(destination.id)
+            destinations.append(destination)
+    if not destinations:
+        raise ValueError(f"{path} contains no destinations")
+    return destinations
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _previous_embeddings(root: Path, model_name: str) -> Dict[str, np.ndarray]:
+    """Embeddings of the current generation by document digest."""
+    generation = root / CURRENT
+    if _read_json(generation / "meta.json").get("model") != model_name:
+        return {}
+    try:
+        embeddings = np.load(generation / "embeddings.npy", mmap_mode="r")
+        with open(generation / "destinations.jsonl", encoding="utf-8") as f:
+            digests = [json.loads(line)["digest"] for line in f if line.strip()]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Previous destination index unusable: {str(e)}")
+        return {}
+    return {digest: embeddings[row] for row, digest in enumerate(digests)}
+
+
+def _quantizer(root: Path, embeddings: np.ndarray, model_name: str, retrain: bool):
+    """Trained, empty IVF index: the saved one unless it no longer fits."""
+    import faiss
+
+    count, dim = embeddings.shape
+    info = _read_json(root / "trained.json")
+    if (
+        not retrain
+        and (root / _TRAINED).exists()
+        and info.get("model") == model_name
+        and info.get("dim") == dim
+        and count <= 2 * info.get("count", 0)
+    ):
+        return faiss.read_index(str(root / _TRAINED))
+
+    nlist = _nlist(count)
+    index = faiss.IndexIVFFlat(
+        faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(embeddings)
+    faiss.write_index(index, str(root / _TRAINED))
+    (root / "trained.json").write_text(
+        json.dumps({"model": model_name, "dim": dim, "count": count, "nlist": nlist})
+    )
+    logger.info(f"Trained destination quantizer: {nlist} lists on {count} vectors")
+    return index
+
+
+def write_generation(
+    root: Path,
+    destinations: Sequence[Destination],
+    embeddings: np.ndarray,
+    model_name: str,
+    retrain: bool = False,
+    keep: int = 2,
+) -> Path:
+    """
+    Write ``embeddings`` (row i for ``destinations[i]``) as a new index
+    generation, point ``current`` at it and drop all but the ``keep``
+    newest generations.
+    """
+    import faiss
+
+    root.mkdir(parents=True, exist_ok=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    index = _quantizer(root, embeddings, model_name, retrain)
+    index.add_with_ids(embeddings, np.arange(len(embeddings), dtype="int64"))
+
+    generation = new_generation(root)
+    # Move the inverted lists to a file that readers memory-map
+    lists = faiss.OnDiskInvertedLists(
+        index.nlist, index.code_size, str(generation / "lists.ivfdata")
+    )
+    sources = faiss.InvertedListsPtrVector()
+    sources.push_back(index.invlists)
+    lists.merge_from(sources.data(), sources.size())
+    index.replace_invlists(lists)
+    faiss.write_index(index, str(generation / "populated.index"))
+
+    np.save(generation / "embeddings.npy", embeddings)
+    with open(generation / "destinations.jsonl", "w", encoding="utf-8") as f:
+        for destination in destinations:
+            record = destination.model_dump()
+            record["digest"] = _digest(_document(destination))
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    (generation / "meta.json").write_text(json.dumps({
+        "model": model_name,
+        "dim": int(embeddings.shape[1]),
+        "count": len(destinations),
+        "nlist": int(index.nlist),
+    }))
+    publish(root, generation, keep)
+    return generation
+
+
+def build(
+    catalogue: Path,
+    root: Path,
+    model_name: str = settings.DESTINATION_EMBEDDING_MODEL,
+    retrain: bool = False,
+    keep: int = 2,
+) -> Tuple[Path, int]:
+    """
+    Build a new generation from ``catalogue``, reusing the embeddings of
+    unchanged destinations. Returns the generation and how many
+    destinations were encoded.
+    """
+    destinations = read_catalogue(catalogue)
+    documents = [_document(destination) for destination in destinations]
+    previous = _previous_embeddings(root, model_name)
+    stale = [i for i, doc in enumerate(documents) if _digest(doc) not in previous]
+
+    fresh: Dict[int, np.ndarray] = {}
+    if stale:
+        vectors = encode(load_encoder(model_name), [documents[i] for i in stale])
+        fresh = dict(zip(stale, vectors))
+    embeddings = np.stack([
+        fresh[i] if i in fresh else previous[_digest(doc)]
+        for i, doc in enumerate(documents)
+    ])
+    generation = write_generation(
+        root, destinations, embeddings, model_name, retrain, keep
+    )
+    return generation, len(stale)
+
+
+class DestinationIndex:
+    """Read side of the index, loaded once per worker."""
+
+    def __init__(
+        self,
+        path: str = settings.DESTINATION_INDEX_PATH,
+        nprobe: int = settings.DESTINATION_INDEX_NPROBE,
+    ):
+        self.path = Path(path)
+        self.nprobe = nprobe
+        self.model_name = settings.DESTINATION_EMBEDDING_MODEL
+        self.index: Any = None
+        self.embeddings: Optional[np.ndarray] = None
+        self.destinations: List[Destination] = []
+        self._by_name: Dict[str, int] = {}
+        self._by_popularity: List[int] = []
+        # Profile text -> query vector, so repeat queries skip the encoder
+        self._queries: TTLCache[np.ndarray] = TTLCache(1024, 3600)
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def load(self) -> bool:
+        """Map the current generation; False if there is none."""
+        generation = self.path / CURRENT
+        if not (generation / "populated.index").exists():
+            logger.warning(
+                f"No destination index at {generation}; recommendations disabled"
+            )
+            return False
+        try:
+            import faiss
+        except ImportError:
+            logger.warning("Destination recommendations disabled: faiss not installed")
+            return False
+
+        index = faiss.read_index(
+            str(generation / "populated.index"),
+            faiss.IO_FLAG_ONDISK_SAME_DIR | faiss.IO_FLAG_READ_ONLY,
+        )
+        index.nprobe = self.nprobe
+        embeddings = np.load(generation / "embeddings.npy", mmap_mode="r")
+        with open(generation / "destinations.jsonl", encoding="utf-8") as f:
+            destinations = [
+                Destination.model_validate_json(line) for line in f if line.strip()
+            ]
+
+        by_popularity = sorted(
+            range(len(destinations)), key=lambda row: -destinations[row].popularity
+        )
+        by_name: Dict[str, int] = {}
+        for row in by_popularity:
+            name = destinations[row].name.lower()
+            # "Paris" matches "Paris, France"; the most popular one wins
+            for key in (name, name.split(",")[0].strip()):
+                by_name.setdefault(key, row)
+
+        meta = _read_json(generation / "meta.json")
+        self.model_name = meta.get("model", self.model_name)
+        self.index, self.embeddings, self.destinations = index, embeddings, destinations
+        self._by_name, self._by_popularity = by_name, by_popularity
+        self._queries.clear()
+        logger.info(
+            f"Loaded {len(destinations)} destinations from {generation.resolve()}"
+        )
+        return True
+
+    def _matches(self, category: Optional[str]):
+        wanted = (category or "").lower()
+        return lambda row: wanted in self.destinations[row].category.lower()
+
+    def popular(self, limit: int, category: Optional[str] = None) -> List[Destination]:
+        matches = self._matches(category)
+        rows = (row for row in self._by_popularity if matches(row))
+        return [self.destinations[row] for _, row in zip(range(limit), rows)]
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        exclude: Sequence[int] = (),
+        category: Optional[str] = None,
+    ) -> List[DestinationMatch]:
+        """Nearest destinations to a unit-length ``query`` vector."""
+        # Over-fetch for the rows the filters will drop
+        k = min(len(self.destinations), (limit + len(exclude)) * (4 if category else 1))
+        scores, ids = self.index.search(query.reshape(1, -1).astype("float32"), k)
+        matches = self._matches(category)
+        skip = set(exclude)
+        results = []
+        for score, row in zip(scores[0], ids[0]):
+            if row < 0 or row in skip or not matches(row):
+                continue
+            results.append(DestinationMatch(
+                **self.destinations[row].model_dump(), score=round(float(score), 4)
+            ))
+            if len(results) == limit:
+                break
+        return results
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vector = self._queries.get(text)
+        if vector is None:
+            encoder = await asyncio.to_thread(load_encoder, self.model_name)
+            vector = (await asyncio.to_thread(encode, encoder, [text]))[0]
+            self._queries.set(text, vector)
+        return vector
+
+    async def recommend(
+        self,
+        interests: Sequence[str],
+        preferred_destinations: Sequence[str] = (),
+        travel_style: str = "",
+        limit: int = 10,
+        category: Optional[str] = None,
+    ) -> List[DestinationMatch]:
+        """
+        Destinations closest to a profile: the embedding of its interests
+        plus the mean embedding of the catalogued destinations it prefers
+        (which are left out of the results). Without either, the most
+        popular destinations, unscored.
+        """
+        rows = (
+            self._by_name.get(name.strip().lower()) for name in preferred_destinations
+        )
+        liked = [row for row in rows if row is not None]
+        parts = []
+        if interests:
+            parts.append(await self._embed(profile_text(interests, travel_style)))
+        if liked:
+            parts.append(np.asarray(self.embeddings[liked]).mean(axis=0))
+        if not parts:
+            return [
+                DestinationMatch(**destination.model_dump())
+                for destination in self.popular(limit, category)
+            ]
+        query = np.sum(parts, axis=0)
+        query /= max(float(np.linalg.norm(query)), 1e-9)
+        return self.search(query, limit, exclude=liked, category=category)
+
+
+destination_index = DestinationIndex()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build the destination recommendation index "
+            "from a JSON-lines catalogue."
+        )
+    )
+    parser.add_argument("catalogue", type=Path)
+    parser.add_argument(
+        "--out", type=Path, default=Path(settings.DESTINATION_INDEX_PATH)
+    )
+    parser.add_argument("--model", default=settings.DESTINATION_EMBEDDING_MODEL)
+    parser.add_argument(
+        "--retrain", action="store_true", help="retrain the IVF quantizer"
+    )
+    parser.add_argument("--keep", type=int, default=2, help="generations kept on disk")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generation, encoded = build(
+        args.catalogue, args.out, args.model, args.retrain, args.keep
+    )
+    print(f"{generation}: {encoded} destinations encoded")
+
+
+if __name__ == "__main__":
+    main()
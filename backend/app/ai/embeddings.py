@@ -0,0 +1,41 @@
+"""
+Shared sentence-transformers encoders.
+
+Each model is loaded once per process and reused by every component that
+embeds text (semantic LLM cache, destination recommendations).
+"""
+from typing import Any, Dict, Sequence
+import threading
+
+import numpy as np
+
+_encoders: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def load_encoder(model_name: str) -> Any:
+    """
+    The ``SentenceTransformer`` for ``model_name``, loaded on first use.
+
+    Raises ImportError when sentence-transformers is not installed.
+    """
+    encoder = _encoders.get(model_name)
+    if encoder is None:
+        with _lock:
+            encoder = _encoders.get(model_name)
+            if encoder is None:
+                from sentence_transformers import SentenceTransformer
+
+                encoder = _encoders[model_name] = SentenceTransformer(model_name)
+    return encoder
+
+
+def encode(encoder: Any, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+    """Unit-length float32 embeddings, one row per text (CPU-bound)."""
+    vectors = encoder.encode(
+        list(texts),
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+    )
+    return np.ascontiguousarray(vectors, dtype="float32")
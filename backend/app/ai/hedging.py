@@ -0,0 +1,84 @@
+from collections import deque
+from typing import Deque, Dict
+import logging
+import math
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """
+    Rolling first-token latency and failure state for one model.
+
+    The hedge delay is the configured percentile (p95 by default) of recent
+    time-to-first-token samples, so a backup request is only fired for the
+    slowest few percent of calls. After ``failure_threshold`` consecutive
+    errors the model is marked unhealthy for ``cooldown`` seconds and is
+    tried only after healthy alternatives.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        window: int = settings.LLM_HEDGE_WINDOW,
+        percentile: float = settings.LLM_HEDGE_PERCENTILE,
+        default_delay: float = settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+        min_delay: float = settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+        min_samples: int = settings.LLM_HEDGE_MIN_SAMPLES,
+        failure_threshold: int = settings.LLM_PROVIDER_FAILURE_THRESHOLD,
+        cooldown: float = settings.LLM_PROVIDER_COOLDOWN_SECONDS,
+    ):
+        self.model = model
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self._unhealthy_until
+
+    def record_first_token(self, seconds: float) -> None:
+        """Record a time-to-first-token sample (or a lower bound of one)."""
+        self._samples.append(seconds)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._unhealthy_until = 0.0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.healthy:
+                logger.warning(
+                    f"{self.model} marked unhealthy after "
+                    f"{self.consecutive_failures} consecutive failures"
+                )
+            self._unhealthy_until = time.monotonic() + self.cooldown
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a first token before firing a backup."""
+        if len(self._samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return max(self.min_delay, ordered[index])
+
+
+_providers: Dict[str, ProviderHealth] = {}
+
+
+def provider_health(model: str) -> ProviderHealth:
+    """Process-wide health tracker for ``model``, shared by all agents."""
+    health = _providers.get(model)
+    if health is None:
+        health = _providers[model] = ProviderHealth(model)
+    return health
@@ -0,0 +1,35 @@
+"""
+Generations of an on-disk index, switched atomically.
+
+Each build writes a fresh timestamped directory under the index root and
+then repoints the ``current`` symlink at it, so readers opening
+``current`` see either the previous build or the new one, never a mix.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import os
+import shutil
+
+CURRENT = "current"
+
+
+def new_generation(root: Path) -> Path:
+    """Create and return an empty generation directory."""
+    root.mkdir(parents=True, exist_ok=True)
+    generation = root / datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    generation.mkdir()
+    return generation
+
+
+def publish(root: Path, generation: Path, keep: int = 2) -> None:
+    """Point ``current`` at ``generation`` and drop all but ``keep`` generations."""
+    link = root / f"{CURRENT}.tmp"
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    link.symlink_to(generation.name)
+    os.replace(link, root / CURRENT)
+
+    generations = sorted(p for p in root.iterdir() if p.is_dir() and not p.is_symlink())
+    for old in generations[:-max(keep, 1)]:
+        # Workers still mapping an old generation keep their open files
+        shutil.rmtree(old, ignore_errors=True)
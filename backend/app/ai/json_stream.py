@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalArrayParser:
+    """
+    Incremental JSON scanner for streamed LLM output.
+
+    Text is fed in arbitrary chunks; every object that is a direct element
+    of an array stored under ``array_key`` is decoded and returned as soon
+    as its closing brace arrives. Anything outside JSON structures (prose,
+    markdown code fences) is ignored.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._chunks: List[str] = []
+        # Each frame: (container char, key it was stored under)
+        self._stack: List[Tuple[str, Optional[str]]] = []
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        self._item: Optional[List[str]] = None
+        self._item_depth = 0
+        self._length = 0
+        self._closed = False
+        # Offset just past the last completed array item
+        self.item_end = 0
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the outermost JSON container has been closed.
+
+        False after a complete stream means the answer was cut off.
+        """
+        return self._closed
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the array items completed by it."""
+        self._chunks.append(chunk)
+        completed: List[Dict[str, Any]] = []
+
+        for offset, char in enumerate(chunk, self._length + 1):
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                self._scan_string(char)
+            elif char in "{[":
+                self._open(char)
+            elif char in "}]":
+                item = self._close(offset) if self._stack else None
+                if item is not None:
+                    completed.append(item)
+            else:
+                self._scan_separator(char)
+
+        self._length += len(chunk)
+        return completed
+
+    def _scan_separator(self, char: str) -> None:
+        """Track string starts and the key the next value belongs to."""
+        if char == '"':
+            if self._stack:
+                self._in_string = True
+                self._string = []
+        elif char == ":":
+            self._pending_key = self._last_string
+        elif char == ",":
+            self._pending_key = None
+
+    def _scan_string(self, char: str) -> None:
+        """Consume one character inside a string literal."""
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            self._last_string = "".join(self._string)
+            return
+        self._string.append(char)
+
+    def _open(self, char: str) -> None:
+        """Push a container, starting an item if it is one of the array's."""
+        parent = self._stack[-1] if self._stack else None
+        key = self._pending_key if parent and parent[0] == "{" else None
+        if char == "{" and self._item is None and parent == ("[", self.array_key):
+            self._item = [char]
+            self._item_depth = len(self._stack) + 1
+        self._stack.append((char, key))
+        self._closed = False
+        self._pending_key = None
+
+    def _close(self, offset: int) -> Optional[Dict[str, Any]]:
+        """Pop a container; return the array item it completes, if any."""
+        self._stack.pop()
+        self._closed = not self._stack
+        if self._item is None or len(self._stack) >= self._item_depth:
+            return None
+        raw = "".join(self._item)
+        self._item = None
+        self.item_end = offset
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed streamed array item")
+            return None
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Decode the full document once the stream is finished."""
+        text = self.text
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            document = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        return document if isinstance(document, dict) else None
+
+
+def document_closed(text: str) -> bool:
+    """Whether ``text`` holds a JSON document that was closed.
+
+    False for an answer cut off (at ``max_tokens``) before its end.
+    """
+    parser = IncrementalArrayParser("")
+    parser.feed(text)
+    return parser.closed
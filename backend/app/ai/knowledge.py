@@ -0,0 +1,398 @@
+"""
+Destination knowledge base for retrieval-augmented prompts.
+
+``python -m app.ai.knowledge data/knowledge`` chunks the curated Markdown
+documents (one per destination: a ``# Name`` title, then ``## Section``s)
+and indexes them under KNOWLEDGE_PATH:
+
+    <generation>/
+        chunks.index    FAISS inner-product index, rows grouped by destination
+        chunks.jsonl    destination, section, text and token count per row
+        meta.json       embedding model and each destination's row range
+    current -> <generation>
+
+At request time only the destination's rows are searched, and the best
+chunks for the traveler's interests are packed into a hard token budget.
+"""
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.ai.cache import TTLCache
+from app.ai.embeddings import encode, load_encoder
+from app.ai.index_store import CURRENT, new_generation, publish
+from app.ai.tokens import count_tokens
+from app.core.config import settings
+from app.core.metrics import KNOWLEDGE_CONTEXT_TOKENS, KNOWLEDGE_RETRIEVAL_DURATION
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class Chunk(BaseModel):
+    destination: str
+    section: str
+    text: str
+    tokens: int
+
+
+def destination_key(name: str) -> str:
+    """" Tokyo,Japan" -> "tokyo, japan": every part, normalised."""
+    parts = (" ".join(part.split()).lower() for part in name.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+def match_destination(name: str, keys: Collection[str]) -> Optional[str]:
+    """
+    The key in ``keys`` for the place ``name`` designates: the same key,
+    or, when one side is a bare city ("Paris"), the only key for that city.
+    None if there is no such key or several ("Paris" with both "paris,
+    france" and "paris, texas"); "Paris, Texas" never matches "paris, france".
+    """
+    key = destination_key(name)
+    if key in keys:
+        return key
+    city, _, region = key.partition(", ")
+    if region:
+        candidates = [city] if city in keys else []
+    else:
+        candidates = [k for k in keys if k.partition(", ")[0] == city]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _pieces(paragraph: str, max_tokens: int) -> List[str]:
+    """The paragraph, split at sentence ends if it exceeds ``max_tokens``."""
+    if count_tokens(paragraph) <= max_tokens:
+        return [paragraph]
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        candidate = f"{current} {sentence}".strip()
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            candidate = sentence
+        current = candidate
+    return pieces + [current] if current else pieces
+
+
+def _parse_sections(text: str) -> Tuple[str, List[Tuple[str, List[str]]]]:
+    """
+    The document's ``# Destination`` title and its ``## Section``s, each
+    with its paragraphs (text before the first section is "Overview").
+    """
+    destination = ""
+    sections: List[Tuple[str, List[str]]] = []
+    paragraph: List[str] = []
+
+    def end_paragraph() -> None:
+        if paragraph and sections:
+            sections[-1][1].append(" ".join(paragraph))
+        paragraph.clear()
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("# ", "## ")):
+            end_paragraph()
+        if line.startswith("## "):
+            sections.append((line[3:].strip(), []))
+        elif line.startswith("# "):
+            destination = line[2:].strip()
+        elif line:
+            if not sections:
+                sections.append(("Overview", []))
+            paragraph.append(line)
+    end_paragraph()
+    if not destination:
+        raise ValueError("Knowledge document has no '# Destination' title")
+    return destination, sections
+
+
+def _pack(pieces: Sequence[str], max_tokens: int) -> List[str]:
+    """Join consecutive pieces into texts of at most about ``max_tokens``."""
+    texts, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}\n{piece}" if current else piece
+        if current and count_tokens(candidate) > max_tokens:
+            texts.append(current)
+            candidate = piece
+        current = candidate
+    return texts + [current] if current else texts
+
+
+def chunk_document(
+    text: str, max_tokens: int = settings.KNOWLEDGE_CHUNK_TOKENS
+) -> List[Chunk]:
+    """
+    Split one destination document into chunks of whole paragraphs (or
+    sentences, for long ones) of at most about ``max_tokens``, never
+    spanning two sections.
+    """
+    destination, sections = _parse_sections(text)
+    return [
+        Chunk(
+            destination=destination,
+            section=section,
+            text=packed,
+            tokens=count_tokens(packed),
+        )
+        for section, paragraphs in sections
+        for packed in _pack(
+            [p for paragraph in paragraphs for p in _pieces(paragraph, max_tokens)],
+            max_tokens,
+        )
+    ]
+
+
+def _embedded_text(chunk: Chunk) -> str:
+    return f"{chunk.destination}. {chunk.section}. {chunk.text}"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _previous_embeddings(root: Path, model_name: str) -> Dict[str, np.ndarray]:
+    """Embeddings of the current generation by chunk digest."""
+    import faiss
+
+    generation = root / CURRENT
+    try:
+        meta = json.loads((generation / "meta.json").read_text())
+        if meta.get("model") != model_name:
+            return {}
+        index = faiss.read_index(str(generation / "chunks.index"))
+        with open(generation / "chunks.jsonl", encoding="utf-8") as f:
+            digests = [json.loads(line)["digest"] for line in f if line.strip()]
+    except (OSError, ValueError, KeyError, RuntimeError):
+        return {}
+    vectors = index.reconstruct_n(0, index.ntotal)
+    return dict(zip(digests, vectors))
+
+
+def ingest(
+    source: Path,
+    root: Path,
+    model_name: str = settings.KNOWLEDGE_EMBEDDING_MODEL,
+    chunk_tokens: int = settings.KNOWLEDGE_CHUNK_TOKENS,
+    keep: int = 2,
+) -> Tuple[Path, int, int]:
+    """
+    Chunk and index every ``*.md`` file under ``source`` as a new
+    generation, re-encoding only chunks that changed. Returns the
+    generation, the number of chunks and how many were encoded.
+    """
+    import faiss
+
+    chunks: List[Chunk] = []
+    for path in sorted(source.glob("*.md")):
+        try:
+            text = path.read_text(encoding="utf-8")
+            chunks.extend(chunk_document(text, chunk_tokens))
+        except ValueError as e:
+            raise ValueError(f"{path}: {str(e)}") from e
+    if not chunks:
+        raise ValueError(f"No knowledge documents in {source}")
+    # Rows of one destination must be contiguous for range search
+    chunks.sort(key=lambda chunk: destination_key(chunk.destination))
+
+    texts = [_embedded_text(chunk) for chunk in chunks]
+    digests = [_digest(text) for text in texts]
+    previous = _previous_embeddings(root, model_name)
+    stale = [i for i, digest in enumerate(digests) if digest not in previous]
+    fresh: Dict[int, np.ndarray] = {}
+    if stale:
+        vectors = encode(load_encoder(model_name), [texts[i] for i in stale])
+        fresh = dict(zip(stale, vectors))
+    embeddings = np.stack([
+        fresh[i] if i in fresh else previous[digest] for i, digest in enumerate(digests)
+    ]).astype("float32")
+
+    ranges: Dict[str, List[int]] = {}
+    for row, chunk in enumerate(chunks):
+        key = destination_key(chunk.destination)
+        ranges.setdefault(key, [row, row])[1] = row + 1
+
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings)
+    generation = new_generation(root)
+    faiss.write_index(index, str(generation / "chunks.index"))
+    with open(generation / "chunks.jsonl", "w", encoding="utf-8") as f:
+        for chunk, digest in zip(chunks, digests):
+            row = {**chunk.model_dump(), "digest": digest}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    (generation / "meta.json").write_text(json.dumps({
+        "model": model_name,
+        "chunk_tokens": chunk_tokens,
+        "destinations": ranges,
+    }))
+    publish(root, generation, keep)
+    return generation, len(chunks), len(stale)
+
+
+class KnowledgeBase:
+    """Read side of the knowledge index, loaded once per worker."""
+
+    def __init__(
+        self,
+        path: str = settings.KNOWLEDGE_PATH,
+        top_k: int = settings.KNOWLEDGE_TOP_K,
+        context_tokens: int = settings.KNOWLEDGE_CONTEXT_TOKENS,
+    ):
+        self.path = Path(path)
+        self.top_k = top_k
+        self.context_tokens = context_tokens
+        self.model_name = settings.KNOWLEDGE_EMBEDDING_MODEL
+        self.index: Any = None
+        self.chunks: List[Chunk] = []
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._queries: TTLCache[np.ndarray] = TTLCache(1024, 3600)
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def _rows(self, destination: str) -> Optional[Tuple[int, int]]:
+        key = match_destination(destination, self._ranges)
+        return self._ranges[key] if key is not None else None
+
+    def covers(self, destination: str) -> bool:
+        return self._rows(destination) is not None
+
+    def load(self) -> bool:
+        """Load the current generation; False if there is none."""
+        generation = self.path / CURRENT
+        if not (generation / "chunks.index").exists():
+            logger.warning(
+                f"No knowledge index at {generation}; prompts are not grounded"
+            )
+            return False
+        try:
+            import faiss
+        except ImportError:
+            logger.warning("Knowledge retrieval disabled: faiss not installed")
+            return False
+
+        index = faiss.read_index(str(generation / "chunks.index"))
+        with open(generation / "chunks.jsonl", encoding="utf-8") as f:
+            chunks = [Chunk.model_validate_json(line) for line in f if line.strip()]
+        meta = json.loads((generation / "meta.json").read_text())
+
+        self.model_name = meta.get("model", self.model_name)
+        self.index, self.chunks = index, chunks
+        self._ranges = {key: (lo, hi) for key, (lo, hi) in meta["destinations"].items()}
+        self._queries.clear()
+        logger.info(
+            f"Loaded {len(chunks)} knowledge chunks "
+            f"for {len(self._ranges)} destinations"
+        )
+        return True
+
+    def retrieve(
+        self, destination: str, query: np.ndarray, k: int
+    ) -> List[Tuple[float, int]]:
+        """The ``k`` best (score, row) of ``destination``'s chunks for ``query``."""
+        import faiss
+
+        bounds = self._rows(destination)
+        if bounds is None:
+            return []
+        lo, hi = bounds
+        selector = faiss.IDSelectorRange(lo, hi)
+        params = faiss.SearchParameters()
+        params.sel = selector
+        scores, ids = self.index.search(
+            query.reshape(1, -1).astype("float32"), min(k, hi - lo), params=params
+        )
+        return [(float(s), int(row)) for s, row in zip(scores[0], ids[0]) if row >= 0]
+
+    def pack(
+        self, destination: str, matches: Sequence[Tuple[float, int]], budget: int
+    ) -> str:
+        """
+        Best-scoring chunks that fit ``budget`` tokens, header included,
+        in document order. Empty if none fits.
+        """
+        header = (
+            f"Reference notes for {destination}. Base your answer on them where "
+            f"they apply instead of general knowledge:"
+        )
+        remaining = budget - count_tokens(header) - 1
+        picked: List[Tuple[int, str]] = []
+        for _, row in sorted(matches, reverse=True):
+            chunk = self.chunks[row]
+            line = f"- {chunk.section}: {chunk.text}"
+            tokens = count_tokens(line) + 1  # newline
+            if tokens <= remaining:
+                picked.append((row, line))
+                remaining -= tokens
+        if not picked:
+            return ""
+        return "\n".join([header, *(line for _, line in sorted(picked))])
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vector = self._queries.get(text)
+        if vector is None:
+            encoder = await asyncio.to_thread(load_encoder, self.model_name)
+            vector = (await asyncio.to_thread(encode, encoder, [text]))[0]
+            self._queries.set(text, vector)
+        return vector
+
+    async def context(
+        self,
+        destination: str,
+        topics: Sequence[str],
+        agent: str = "",
+        budget: Optional[int] = None,
+    ) -> str:
+        """
+        Prompt-ready notes on ``destination`` relevant to ``topics``, at
+        most ``budget`` (default KNOWLEDGE_CONTEXT_TOKENS) tokens. Empty
+        when the destination is not covered.
+        """
+        if not self.loaded or not self.covers(destination):
+            return ""
+        start = time.perf_counter()
+        query = await self._embed(f"{destination}: {', '.join(topics)}")
+        matches = self.retrieve(destination, query, self.top_k)
+        text = self.pack(destination, matches, budget or self.context_tokens)
+        KNOWLEDGE_RETRIEVAL_DURATION.observe(time.perf_counter() - start)
+        KNOWLEDGE_CONTEXT_TOKENS.labels(agent).observe(
+            count_tokens(text) if text else 0
+        )
+        return text
+
+
+knowledge_base = KnowledgeBase()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Chunk and index the destination knowledge documents (*.md)."
+    )
+    parser.add_argument("source", type=Path, help="directory of Markdown documents")
+    parser.add_argument("--out", type=Path, default=Path(settings.KNOWLEDGE_PATH))
+    parser.add_argument("--model", default=settings.KNOWLEDGE_EMBEDDING_MODEL)
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=settings.KNOWLEDGE_CHUNK_TOKENS
+    )
+    parser.add_argument("--keep", type=int, default=2, help="generations kept on disk")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generation, chunks, encoded = ingest(
+        args.source, args.out, args.model, args.chunk_tokens, args.keep
+    )
+    print(f"{generation}: {chunks} chunks, {encoded} encoded")
+
+
+if __name__ == "__main__":
+    main()
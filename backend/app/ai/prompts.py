@@ -0,0 +1,71 @@
+"""
+Prompt templates, compiled once at import.
+
+Prompts are written as indented triple-quoted strings so they read well in
+the agent modules. Compiling dedents them, strips trailing spaces and
+collapses runs of blank lines, so none of that whitespace is sent (and
+billed) on every call, and pre-splits them into literal and field parts.
+
+Agents keep everything that does not change between requests in the system
+prompt and only the request's details in the user message: OpenAI caches
+identical prompt prefixes automatically, so a stable system prompt is what
+makes its cache hit. Anthropic only caches blocks marked with
+``cache_control``, which the legacy completions API used here cannot send,
+so Claude prompts are not cached.
+"""
+from functools import cached_property
+from string import Formatter
+from typing import Any, List, Optional, Tuple
+import re
+import textwrap
+
+from app.ai.tokens import count_tokens
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Dedent, strip trailing spaces and keep at most one blank line in a row."""
+    lines = [line.rstrip() for line in textwrap.dedent(text).splitlines()]
+    return _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip()
+
+
+class PromptTemplate:
+    """
+    A prompt with ``{field}`` placeholders (``{{``/``}}`` for literal
+    braces). Format specs and conversions are not supported.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.raw = text
+        self.text = normalize_whitespace(text)
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(self.text):
+            if spec or conversion:
+                raise ValueError(f"Prompt {name}: unsupported format in {{{field}}}")
+            if field is not None and not field.isidentifier():
+                raise ValueError(f"Prompt {name}: invalid field {{{field}}}")
+            self._parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self._parts if field)
+
+    def render(self, **values: Any) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            names = ", ".join(sorted(missing))
+            raise KeyError(f"Prompt {self.name} is missing {names}")
+        return "".join(
+            literal + (str(values[field]) if field else "")
+            for literal, field in self._parts
+        )
+
+    @cached_property
+    def tokens(self) -> int:
+        """Tokens of the compiled template's fixed text."""
+        return count_tokens("".join(literal for literal, _ in self._parts))
+
+    @cached_property
+    def saved_tokens(self) -> int:
+        """Tokens removed from every rendering by normalization."""
+        raw = "".join(literal for literal, _, _, _ in Formatter().parse(self.raw))
+        return max(count_tokens(raw) - self.tokens, 0)
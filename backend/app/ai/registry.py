@@ -0,0 +1,159 @@
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Type, TypeVar
+import logging
+
+import httpx
+
+from app.ai.agents.base_agent import BaseAgent
+from app.ai.cache import ResponseCache, build_response_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+AgentT = TypeVar("AgentT", bound=BaseAgent)
+AgentKey = Tuple[Type[BaseAgent], str, float, Tuple[str, ...]]
+AgentSpec = Tuple[Type[BaseAgent], str, float, Sequence[str]]
+
+
+class SharedLLMClients:
+    """Keep-alive HTTP clients shared by every agent in the process."""
+
+    def __init__(
+        self,
+        max_connections: int = settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        timeout: float = settings.LLM_REQUEST_TIMEOUT,
+    ):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._timeout = timeout
+        self._openai_http: Optional[httpx.AsyncClient] = None
+        self._anthropic_http: Optional[httpx.AsyncClient] = None
+        self._openai = None
+        self._anthropic = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+
+    @property
+    def openai(self):
+        """Async OpenAI SDK client bound to a pooled HTTP client."""
+        if self._openai is None:
+            import openai
+
+            self._openai_http = self._http_client()
+            self._openai = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=self._openai_http,
+            )
+        return self._openai
+
+    @property
+    def anthropic(self):
+        """Async Anthropic SDK client bound to a pooled HTTP client."""
+        if self._anthropic is None:
+            import anthropic
+
+            self._anthropic_http = self._http_client()
+            self._anthropic = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                http_client=self._anthropic_http,
+            )
+        return self._anthropic
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pools."""
+        for client in (self._openai_http, self._anthropic_http):
+            if client is not None:
+                await client.aclose()
+        self._openai_http = self._anthropic_http = None
+        self._openai = self._anthropic = None
+
+
+class AgentRegistry:
+    """
+    Process-wide cache of configured agents.
+
+    Agents are stateless between calls, so one instance per
+    (agent class, model, temperature, fallback models) is shared by every
+    request.
+    """
+
+    def __init__(
+        self,
+        clients: Optional[SharedLLMClients] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.clients = clients or SharedLLMClients()
+        self.cache = cache
+        self._agents: Dict[AgentKey, BaseAgent] = {}
+
+    def register(
+        self,
+        agent_cls: Type[AgentT],
+        model: str,
+        temperature: float,
+        fallback_models: Sequence[str] = (),
+    ) -> AgentT:
+        """Build the agent for this configuration if it does not exist yet."""
+        key = (agent_cls, model, temperature, tuple(fallback_models))
+        agent = self._agents.get(key)
+        if agent is None:
+            agent = agent_cls(
+                model=model,
+                temperature=temperature,
+                clients=self.clients,
+                cache=self.cache,
+                fallback_models=fallback_models,
+            )
+            self._agents[key] = agent
+            logger.info(
+                f"Registered {agent_cls.__name__} (model={model}, "
+                f"temperature={temperature}, fallbacks={list(fallback_models)})"
+            )
+        return agent  # type: ignore[return-value]
+
+    def get(
+        self,
+        agent_cls: Type[AgentT],
+        model: str,
+        temperature: float,
+        fallback_models: Sequence[str] = (),
+    ) -> AgentT:
+        """Return the shared agent, building it lazily if startup missed it."""
+        agent = self._agents.get(
+            (agent_cls, model, temperature, tuple(fallback_models))
+        )
+        if agent is None:
+            return self.register(agent_cls, model, temperature, fallback_models)
+        return agent  # type: ignore[return-value]
+
+    def startup(self, specs: Iterable[AgentSpec]) -> None:
+        """
+        Pre-build every configured agent.
+
+        A misconfigured agent (e.g. missing API key) is logged rather than
+        failing the worker; it will be retried on first use.
+        """
+        for agent_cls, model, temperature, fallback_models in specs:
+            try:
+                self.register(agent_cls, model, temperature, fallback_models)
+            except Exception as e:
+                logger.warning(
+                    f"Could not initialize {agent_cls.__name__} "
+                    f"({model}): {str(e)}"
+                )
+
+    async def close(self) -> None:
+        """Drop all agents and close the shared HTTP clients."""
+        self._agents.clear()
+        if self.cache is not None:
+            self.cache.clear()
+        await self.clients.aclose()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+agent_registry = AgentRegistry(cache=build_response_cache())
@@ -0,0 +1,358 @@
+"""
+Route optimization for itinerary days.
+
+Every stop and hotel of the trip is geocoded once and measured in a single
+haversine distance matrix. Each day is ordered with nearest-neighbour plus
+2-opt, and stops are moved off days that overflow the pace's time window
+(such stops are marked with the day they were planned for).
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import asyncio
+import logging
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.maps import Coordinates, GoogleMapsClient
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class PaceWindow(NamedTuple):
+    start: int  # minutes after midnight
+    end: int
+    max_stops: int
+
+    @property
+    def minutes(self) -> int:
+        return self.end - self.start
+
+
+PACE_WINDOWS: Dict[str, PaceWindow] = {
+    "relaxed": PaceWindow(10 * 60, 18 * 60, 4),
+    "moderate": PaceWindow(9 * 60, 19 * 60, 6),
+    "packed": PaceWindow(8 * 60, 21 * 60, 8),
+}
+
+
+def haversine_matrix(coords: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between all (lat, lng) rows, in degrees."""
+    lat = np.radians(coords[:, 0])
+    lng = np.radians(coords[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def solve_tour(dist: np.ndarray) -> List[int]:
+    """
+    Visiting order of nodes 1..n-1 on a round trip from node 0:
+    nearest neighbour, then 2-opt until no reversal shortens the tour.
+    """
+    n = len(dist)
+    if n <= 3:
+        return list(range(1, n))
+
+    tour = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[0] = False
+    while unvisited.any():
+        nxt = int(np.where(unvisited, dist[tour[-1]], np.inf).argmin())
+        tour.append(nxt)
+        unvisited[nxt] = False
+    tour.append(0)
+    path = np.array(tour)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            # Gain of reversing path[i..j], for every j at once
+            a, b = path[i - 1], path[i]
+            c, d = path[i + 1:n], path[i + 2:n + 1]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            j = int(delta.argmin())
+            if delta[j] < -1e-9:
+                j += i + 1
+                path[i:j + 1] = path[i:j + 1][::-1].copy()
+                improved = True
+    return path[1:-1].tolist()
+
+
+class DayRouter:
+    """
+    Orders and balances stops given a trip-wide distance matrix.
+
+    ``depots[d]`` is the node of day ``d``'s hotel, or None to start and
+    end anywhere (an open path).
+    """
+
+    def __init__(
+        self,
+        dist: np.ndarray,
+        durations: np.ndarray,
+        window: PaceWindow,
+        speed_kmh: float = settings.ITINERARY_TRAVEL_SPEED_KMH,
+    ):
+        # An extra node at distance 0 from everything stands in for a
+        # missing hotel, turning round trips into open paths
+        self.dist = np.pad(dist, ((0, 1), (0, 1)))
+        self.free_depot = len(dist)
+        self.durations = np.append(durations, 0.0)
+        self.window = window
+        self.minutes_per_km = 60.0 / speed_kmh
+
+    def _depot(self, depot: Optional[int]) -> int:
+        return self.free_depot if depot is None else depot
+
+    def route(self, depot: Optional[int], stops: Sequence[int]) -> List[int]:
+        nodes = [self._depot(depot), *stops]
+        order = solve_tour(self.dist[np.ix_(nodes, nodes)])
+        return [nodes[k] for k in order]
+
+    def _path(self, depot: Optional[int], route: Sequence[int]) -> np.ndarray:
+        home = self._depot(depot)
+        return np.array([home, *route, home])
+
+    def minutes(self, depot: Optional[int], route: Sequence[int]) -> float:
+        """Time spent at stops plus travel, leaving and returning to the hotel."""
+        path = self._path(depot, route)
+        travel = self.dist[path[:-1], path[1:]].sum() * self.minutes_per_km
+        return float(self.durations[list(route)].sum() + travel)
+
+    def overloaded(self, depot: Optional[int], route: Sequence[int]) -> bool:
+        return (
+            len(route) > self.window.max_stops
+            or self.minutes(depot, route) > self.window.minutes
+        )
+
+    def _insertion_minutes(
+        self, depot: Optional[int], route: Sequence[int], stop: int
+    ) -> float:
+        """Extra minutes to fit ``stop`` at the cheapest place in ``route``."""
+        path = self._path(depot, route)
+        a, b = path[:-1], path[1:]
+        detour = self.dist[a, stop] + self.dist[stop, b] - self.dist[a, b]
+        return float(self.durations[stop] + detour.min() * self.minutes_per_km)
+
+    def _removal_minutes(
+        self, depot: Optional[int], route: Sequence[int]
+    ) -> np.ndarray:
+        """Minutes saved by dropping each stop of ``route``."""
+        path = self._path(depot, route)
+        prev, here, nxt = path[:-2], path[1:-1], path[2:]
+        detour = self.dist[prev, here] + self.dist[here, nxt] - self.dist[prev, nxt]
+        return self.durations[here] + detour * self.minutes_per_km
+
+    def plan(
+        self,
+        days: Sequence[Sequence[int]],
+        depots: Sequence[Optional[int]],
+    ) -> List[List[int]]:
+        """
+        Order every day, then move stops off overloaded days (costliest
+        detours first) to the day that absorbs them most cheaply without
+        overflowing, as long as moves are possible.
+        """
+        routes = [self.route(depot, stops) for depot, stops in zip(depots, days)]
+        loads = [self.minutes(depot, route) for depot, route in zip(depots, routes)]
+        for _ in range(sum(len(day) for day in days)):
+            if not self._move_one(routes, loads, depots):
+                break
+        return routes
+
+    def _move_one(
+        self,
+        routes: List[List[int]],
+        loads: List[float],
+        depots: Sequence[Optional[int]],
+    ) -> bool:
+        """Move one stop off the first overloaded day that can shed one."""
+        for d, route in enumerate(routes):
+            if not self.overloaded(depots[d], route):
+                continue
+            for k in np.argsort(-self._removal_minutes(depots[d], route)):
+                stop = route[int(k)]
+                target = self._cheapest_target(routes, loads, depots, d, stop)
+                if target is None:
+                    continue
+                routes[d] = self.route(depots[d], [s for s in route if s != stop])
+                routes[target] = self.route(depots[target], [*routes[target], stop])
+                for changed in (d, target):
+                    loads[changed] = self.minutes(depots[changed], routes[changed])
+                return True
+        return False
+
+    def _cheapest_target(
+        self,
+        routes: List[List[int]],
+        loads: List[float],
+        depots: Sequence[Optional[int]],
+        source: int,
+        stop: int,
+    ) -> Optional[int]:
+        """The other day that fits ``stop`` in the fewest extra minutes."""
+        best, best_cost = None, np.inf
+        for t, target in enumerate(routes):
+            if t == source or len(target) >= self.window.max_stops:
+                continue
+            cost = self._insertion_minutes(depots[t], target, stop)
+            if loads[t] + cost <= self.window.minutes and cost < best_cost:
+                best, best_cost = t, cost
+        return best
+
+    def start_times(self, depot: Optional[int], route: Sequence[int]) -> List[int]:
+        """Arrival time at each stop, in minutes after midnight."""
+        clock = float(self.window.start)
+        times = []
+        previous = self._depot(depot)
+        for stop in route:
+            clock += self.dist[previous, stop] * self.minutes_per_km
+            times.append(int(round(clock)))
+            clock += self.durations[stop]
+            previous = stop
+        return times
+
+
+def _clock(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+class _TripNodes:
+    """
+    Distance-matrix nodes of a trip: one per located stop occurrence,
+    then one per distinct located hotel.
+    """
+
+    def __init__(
+        self,
+        daily_plans: List[Dict[str, Any]],
+        located: Dict[str, Optional[Coordinates]],
+    ):
+        self.coords: List[Coordinates] = []
+        self.durations: List[float] = []
+        self.stops: Dict[int, Dict[str, Any]] = {}
+        # Index in ``daily_plans`` of the day each stop node came from
+        self.origin: Dict[int, int] = {}
+        self.days: List[List[int]] = []
+        self.unrouted: List[List[Dict[str, Any]]] = []
+        self.depots: List[Optional[int]] = []
+        for index, day in enumerate(daily_plans):
+            self._add_day(index, day, located)
+        hotels: Dict[str, int] = {}
+        for day in daily_plans:
+            self.depots.append(self._hotel(day, located, hotels))
+
+    def _add_day(
+        self,
+        index: int,
+        day: Dict[str, Any],
+        located: Dict[str, Optional[Coordinates]],
+    ) -> None:
+        nodes, skipped = [], []
+        for stop in day.get("stops", []):
+            point = located.get(stop["name"])
+            if point is None:
+                skipped.append({**stop, "start_time": None})
+                continue
+            node = len(self.coords)
+            self.stops[node] = stop
+            self.origin[node] = index
+            nodes.append(node)
+            self.coords.append(point)
+            self.durations.append(float(stop.get("duration_minutes") or 0))
+        self.days.append(nodes)
+        self.unrouted.append(skipped)
+
+    def _hotel(
+        self,
+        day: Dict[str, Any],
+        located: Dict[str, Optional[Coordinates]],
+        hotels: Dict[str, int],
+    ) -> Optional[int]:
+        name = day.get("accommodation", "")
+        point = located.get(name)
+        if point is None:
+            return None
+        if name not in hotels:
+            hotels[name] = len(self.coords)
+            self.coords.append(point)
+            self.durations.append(0.0)
+        return hotels[name]
+
+
+async def _geocode_places(
+    daily_plans: List[Dict[str, Any]],
+    destination: str,
+    maps: GoogleMapsClient,
+) -> Dict[str, Optional[Coordinates]]:
+    """Coordinates of every hotel and stop name, None where not found."""
+    names = sorted({
+        name
+        for day in daily_plans
+        for name in [
+            day.get("accommodation", ""),
+            *(stop["name"] for stop in day.get("stops", [])),
+        ]
+        if name
+    })
+
+    async def locate(name: str) -> Optional[Coordinates]:
+        try:
+            return await maps.geocode(f"{name}, {destination}")
+        except Exception as e:
+            logger.warning(f"Could not geocode {name}: {str(e)}")
+            return None
+
+    return dict(zip(names, await asyncio.gather(*(locate(name) for name in names))))
+
+
+async def optimize_itinerary_routes(
+    daily_plans: List[Dict[str, Any]],
+    destination: str,
+    pace: str,
+    maps: GoogleMapsClient,
+    speed_kmh: float = settings.ITINERARY_TRAVEL_SPEED_KMH,
+) -> List[Dict[str, Any]]:
+    """
+    Reorder and rebalance the ``stops`` of each day and set their
+    ``start_time``. Stops that cannot be geocoded stay on their day, after
+    the routed ones and without a time.
+
+    A stop moved to another day keeps the day the model planned it for in
+    ``moved_from_day``: that day's text still describes it, and the new
+    day's text does not.
+    """
+    if not any(day.get("stops") for day in daily_plans):
+        return daily_plans
+    trip = _TripNodes(
+        daily_plans, await _geocode_places(daily_plans, destination, maps)
+    )
+    if not trip.stops:
+        return daily_plans
+
+    router = DayRouter(
+        haversine_matrix(np.array(trip.coords, dtype=float)),
+        np.array(trip.durations),
+        PACE_WINDOWS.get(pace, PACE_WINDOWS["moderate"]),
+        speed_kmh=speed_kmh,
+    )
+    routes = router.plan(trip.days, trip.depots)
+
+    optimized = []
+    for index, (day, route) in enumerate(zip(daily_plans, routes)):
+        times = router.start_times(trip.depots[index], route)
+        stops = []
+        for node, minute in zip(route, times):
+            stop = {**trip.stops[node], "start_time": _clock(minute)}
+            if trip.origin[node] != index:
+                stop["moved_from_day"] = daily_plans[trip.origin[node]]["day"]
+            stops.append(stop)
+        optimized.append({**day, "stops": stops + trip.unrouted[index]})
+    return optimized
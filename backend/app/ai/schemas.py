@@ -0,0 +1,83 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class FlightOption(BaseModel):
+    airline: str
+    departure_time: str
+    arrival_time: str
+    duration: str
+    price: float
+    stops: int
+
+
+class HotelOption(BaseModel):
+    name: str
+    rating: float
+    price_per_night: float
+    location: str
+    amenities: List[str]
+
+
+class ActivityOption(BaseModel):
+    name: str
+    price: float  # per person
+    category: str = ""
+
+
+class Stop(BaseModel):
+    name: str
+    duration_minutes: int = 90
+    start_time: Optional[str] = None  # "HH:MM", set by route optimization
+    moved_from_day: Optional[int] = None  # set when rebalanced onto another day
+
+
+class DayPlan(BaseModel):
+    day: int
+    morning: str
+    lunch: str
+    afternoon: str
+    evening: str
+    dinner: str
+    accommodation: str
+    estimated_cost: float
+    tips: str
+    stops: List[Stop] = []
+
+
+class ResearchOutput(BaseModel):
+    """Structured answer expected from the research agent."""
+    flights: List[FlightOption]
+    hotels: List[HotelOption]
+    activities: List[ActivityOption] = []
+    recommendations: str = ""
+
+
+class ItineraryDays(BaseModel):
+    """A run of daily plans (one chunk of a long itinerary)."""
+    daily_plans: List[DayPlan]
+
+
+class ItineraryOutput(ItineraryDays):
+    """Structured answer expected from the itinerary agent.
+
+    ``daily_plans`` comes first so days can be streamed as they close, and
+    the trailing fields are optional so a truncated answer still yields the
+    completed days.
+    """
+    overview: str = ""
+    total_estimated_cost: Optional[float] = None
+
+
+class SkeletonDay(BaseModel):
+    day: int
+    area: str = ""
+    theme: str = ""
+    highlights: List[str] = []
+
+
+class TripSkeleton(BaseModel):
+    """Short outline shared by all chunks of a fan-out generation."""
+    accommodation: str = ""
+    overview: str = ""
+    days: List[SkeletonDay] = []
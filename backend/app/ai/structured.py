@@ -0,0 +1,206 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+import json
+import logging
+import re
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.metrics import LLM_PARSE_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+
+# Schema keys that cost prompt tokens without helping the model
+_DROPPED_KEYS = {"title", "description", "default", "examples"}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM answer cannot be turned into the expected model."""
+
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if ref is not None:
+            return _inline_refs(defs[ref.rsplit("/", 1)[-1]], defs)
+        return {
+            key: _inline_refs(value, defs)
+            for key, value in node.items()
+            if key not in _DROPPED_KEYS and key != "$defs"
+        }
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+
+@lru_cache(maxsize=None)
+def _compact_schema_json(model: Type[BaseModel]) -> str:
+    schema = model.model_json_schema()
+    compact = _inline_refs(schema, schema.get("$defs", {}))
+    return json.dumps(compact, separators=(",", ":"))
+
+
+def compact_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON schema for ``model`` with refs inlined and titles removed."""
+    return json.loads(_compact_schema_json(model))
+
+
+@lru_cache(maxsize=None)
+def schema_instructions(model: Type[BaseModel]) -> str:
+    """Prompt suffix asking for a single JSON object matching ``model``."""
+    return (
+        "\n\nRespond with a single JSON object and nothing else. "
+        "It must match this JSON schema, with properties in this order:\n"
+        f"{_compact_schema_json(model)}\n"
+    )
+
+
+def repair_json(text: str, drop_incomplete: bool = False) -> str:
+    """
+    Fix common faults in model-produced JSON without another LLM call.
+
+    Handles markdown code fences, prose around the document, trailing
+    commas and truncation (unterminated strings and open containers are
+    closed). With ``drop_incomplete``, a truncated document is cut back to
+    the last fully closed element before closing, which drops a partial
+    trailing array item instead of keeping it half-filled.
+    """
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+
+    scan = _DocumentScan(text[min(starts):])
+    if scan.complete:
+        return "".join(scan.out)
+    return _close_truncated(scan, drop_incomplete)
+
+
+class _DocumentScan:
+    """
+    Copy of a JSON document without trailing commas, up to the point where
+    its outermost container closes (or the text ends).
+    """
+
+    def __init__(self, text: str):
+        self.out: List[str] = []
+        # Closing brackets of the open containers
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        # (output length, open containers) right after each closed element
+        self.checkpoint: Optional[Tuple[int, List[str]]] = None
+        self.complete = False
+        for char in text:
+            if self.in_string:
+                self._string_char(char)
+            elif char in "}]":
+                if not self._close():
+                    break
+            else:
+                self._char(char)
+
+    def _string_char(self, char: str) -> None:
+        self.out.append(char)
+        if self.escape:
+            self.escape = False
+        elif char == "\\":
+            self.escape = True
+        elif char == '"':
+            self.in_string = False
+
+    def _char(self, char: str) -> None:
+        if char == '"':
+            self.in_string = True
+        elif char in "{[":
+            self.stack.append("}" if char == "{" else "]")
+        self.out.append(char)
+
+    def _close(self) -> bool:
+        """Close the innermost container; False once the document has ended."""
+        # Trailing comma before a closing bracket
+        while self.out and self.out[-1] in " \t\r\n,":
+            self.out.pop()
+        if not self.stack:
+            return False
+        self.out.append(self.stack.pop())
+        if not self.stack:
+            self.complete = True
+            return False
+        self.checkpoint = (len(self.out), list(self.stack))
+        return True
+
+
+def _close_truncated(scan: _DocumentScan, drop_incomplete: bool) -> str:
+    """Close a document that was cut off before its end."""
+    out, stack = scan.out, scan.stack
+    if drop_incomplete and scan.checkpoint is not None:
+        length, stack = scan.checkpoint
+        del out[length:]
+    elif scan.in_string:
+        if scan.escape:
+            out.pop()
+        out.append('"')
+
+    repaired = "".join(out).rstrip()
+    if stack and stack[-1] == "}":
+        # Object key without a value
+        repaired = re.sub(r'([{,])\s*"[^"]*"\s*:?\s*$', r"\1", repaired)
+    repaired = repaired.rstrip().rstrip(",")
+    return repaired + "".join(reversed(stack))
+
+
+def _validate(data: Any, model: Type[M]) -> Optional[M]:
+    try:
+        return model.model_validate(data)
+    except ValidationError:
+        return None
+
+
+def parse_output(text: str, model: Type[M]) -> M:
+    """
+    Parse an LLM answer into ``model``, repairing it locally if needed.
+
+    Raises:
+        StructuredOutputError: if neither the raw text nor any local repair
+            validates against the schema
+    """
+    schema = model.__name__
+    try:
+        parsed = _validate(json.loads(text), model)
+    except json.JSONDecodeError:
+        parsed = None
+    if parsed is not None:
+        LLM_PARSE_OUTCOMES.labels(schema=schema, outcome="valid").inc()
+        return parsed
+
+    last_error = "no JSON document found"
+    for drop_incomplete in (False, True):
+        candidate = repair_json(text, drop_incomplete=drop_incomplete)
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            last_error = str(e)
+            continue
+        try:
+            parsed = model.model_validate(data)
+        except ValidationError as e:
+            last_error = str(e)
+            continue
+        LLM_PARSE_OUTCOMES.labels(schema=schema, outcome="repaired").inc()
+        return parsed
+
+    LLM_PARSE_OUTCOMES.labels(schema=schema, outcome="unrepairable").inc()
+    raise StructuredOutputError(f"Invalid {schema} output: {last_error}")
+
+
+def record_outcome(model: Type[BaseModel], outcome: str) -> None:
+    """Count a parse outcome decided outside ``parse_output``."""
+    LLM_PARSE_OUTCOMES.labels(schema=model.__name__, outcome=outcome).inc()
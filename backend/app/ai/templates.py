@@ -0,0 +1,384 @@
+"""
+Precomputed itineraries for popular destination x duration x pace
+combinations.
+
+``python -m app.ai.templates data/destinations.jsonl --top 20`` generates
+them with ItineraryAgent, a bounded number at a time, and writes a new
+generation under ITINERARY_TEMPLATES_PATH:
+
+    <generation>/
+        templates.jsonl
+        meta.json
+    current -> <generation>
+
+The generation name is the store version. With ``--redis`` the generation
+is also published to Redis as ``itinerary_templates:<version>:<id>`` keys
+plus an index, and the ``itinerary_templates:version`` pointer is switched
+last, so API workers without the files can serve it
+(ITINERARY_TEMPLATES_BACKEND=redis). Templates of the previous generation
+are reused unless ``--refresh`` is given.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+
+from pydantic import BaseModel
+
+from app.ai.cache import TTLCache
+from app.ai.destinations import read_catalogue
+from app.ai.index_store import CURRENT, new_generation, publish
+from app.ai.knowledge import destination_key, match_destination
+from app.ai.schemas import DayPlan
+from app.core.config import settings
+from app.core.redis import close_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+PACES = ("relaxed", "moderate", "packed")
+
+_REDIS_PREFIX = "itinerary_templates"
+# Keys of a replaced Redis version stay readable this long
+_REDIS_RETIRE_SECONDS = 3600
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def template_id(destination: str, duration: int, pace: str) -> str:
+    """"Paris, France", 5, "moderate" -> "paris-france-5d-moderate"."""
+    slug = _SLUG_RE.sub("-", destination_key(destination)).strip("-")
+    return f"{slug}-{duration}d-{pace}"
+
+
+class TemplateSummary(BaseModel):
+    id: str
+    destination: str
+    duration: int
+    pace: str
+    overview: str = ""
+
+
+class ItineraryTemplate(TemplateSummary):
+    daily_plans: List[DayPlan]
+    total_estimated_cost: float
+    generated_at: str
+
+    def summary(self) -> TemplateSummary:
+        return TemplateSummary.model_validate(self.model_dump(exclude={"daily_plans"}))
+
+
+def read_templates(path: Path) -> Dict[str, ItineraryTemplate]:
+    """Templates of a generation directory by id; empty if it has none."""
+    try:
+        with open(path / "templates.jsonl", encoding="utf-8") as f:
+            templates = [
+                ItineraryTemplate.model_validate_json(line)
+                for line in f
+                if line.strip()
+            ]
+    except OSError:
+        return {}
+    return {template.id: template for template in templates}
+
+
+async def precompute(
+    catalogue: Path,
+    root: Path,
+    agent: Any,
+    top: int = 20,
+    durations: Sequence[int] = settings.ITINERARY_TEMPLATE_DURATIONS,
+    paces: Sequence[str] = PACES,
+    concurrency: int = settings.ITINERARY_TEMPLATE_CONCURRENCY,
+    refresh: bool = False,
+    keep: int = 2,
+) -> Tuple[Path, Dict[str, ItineraryTemplate], int]:
+    """
+    Generate templates for the ``top`` most popular destinations and
+    publish them as a new generation.
+
+    ``agent`` is an ItineraryAgent; at most ``concurrency`` generations run
+    at once. A combination that fails is left out of the generation.
+
+    Returns:
+        The generation directory, its templates and how many were generated
+    """
+    destinations = sorted(
+        read_catalogue(catalogue), key=lambda d: d.popularity, reverse=True
+    )[:top]
+    previous = {} if refresh else read_templates(root / CURRENT)
+    semaphore = asyncio.Semaphore(concurrency)
+    generated = 0
+
+    async def build(
+        destination: str, duration: int, pace: str
+    ) -> Optional[ItineraryTemplate]:
+        nonlocal generated
+        key = template_id(destination, duration, pace)
+        if key in previous:
+            return previous[key]
+        async with semaphore:
+            try:
+                results = await agent.execute({
+                    "destination": destination,
+                    "duration": duration,
+                    "pace": pace,
+                    "interests": [],
+                    "special_requirements": [],
+                })
+            except Exception as e:
+                logger.warning(f"Template {key} failed: {str(e)}")
+                return None
+        if len(results["daily_plans"]) < duration:
+            logger.warning(f"Template {key} is incomplete; leaving it out")
+            return None
+        generated += 1
+        logger.info(f"Generated template {key}")
+        return ItineraryTemplate(
+            id=key,
+            destination=destination,
+            duration=duration,
+            pace=pace,
+            overview=results["overview"],
+            daily_plans=results["daily_plans"],
+            total_estimated_cost=results["total_estimated_cost"],
+            generated_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    built = await asyncio.gather(*(
+        build(destination.name, duration, pace)
+        for destination in destinations
+        for duration in durations
+        for pace in paces
+    ))
+    templates = {template.id: template for template in built if template is not None}
+
+    generation = new_generation(root)
+    with open(generation / "templates.jsonl", "w", encoding="utf-8") as f:
+        for template in templates.values():
+            f.write(template.model_dump_json() + "\n")
+    (generation / "meta.json").write_text(json.dumps({
+        "version": generation.name,
+        "model": getattr(agent, "model", ""),
+        "templates": len(templates),
+    }))
+    publish(root, generation, keep)
+    return generation, templates, generated
+
+
+async def publish_redis(version: str, templates: Dict[str, ItineraryTemplate]) -> None:
+    """Write a generation to Redis and make it the served version."""
+    redis = get_redis()
+    index = [template.summary().model_dump() for template in templates.values()]
+    async with redis.pipeline(transaction=False) as pipe:
+        for template in templates.values():
+            pipe.set(
+                f"{_REDIS_PREFIX}:{version}:{template.id}", template.model_dump_json()
+            )
+        pipe.set(f"{_REDIS_PREFIX}:{version}:index", json.dumps(index))
+        await pipe.execute()
+
+    previous = await redis.getset(f"{_REDIS_PREFIX}:version", version)
+    if previous is not None and previous.decode() != version:
+        # Workers may still be reading the old version
+        pattern = f"{_REDIS_PREFIX}:{previous.decode()}:*"
+        async for key in redis.scan_iter(match=pattern):
+            await redis.expire(key, _REDIS_RETIRE_SECONDS)
+
+
+class TemplateStore:
+    """
+    Read side of the template store.
+
+    The disk backend loads the current generation into memory at startup.
+    The Redis backend keeps the index in memory, re-reads the version
+    pointer every ITINERARY_TEMPLATES_REFRESH_SECONDS and fetches templates
+    on demand through a small LRU.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.ITINERARY_TEMPLATES_PATH,
+        backend: str = settings.ITINERARY_TEMPLATES_BACKEND,
+        refresh_seconds: float = settings.ITINERARY_TEMPLATES_REFRESH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.backend = backend
+        self.refresh_seconds = refresh_seconds
+        self.version: Optional[str] = None
+        self._templates: Dict[str, ItineraryTemplate] = {}
+        self._summaries: Dict[str, List[TemplateSummary]] = {}
+        self._fetched: TTLCache[ItineraryTemplate] = TTLCache(256, refresh_seconds)
+        self._synced_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def _index(self, summaries: List[TemplateSummary]) -> None:
+        by_destination: Dict[str, List[TemplateSummary]] = {}
+        for summary in summaries:
+            key = destination_key(summary.destination)
+            by_destination.setdefault(key, []).append(summary)
+        self._summaries = by_destination
+
+    def load(self) -> bool:
+        """Load the current disk generation; False if there is none."""
+        if self.backend != "disk":
+            return False
+        generation = self.path / CURRENT
+        templates = read_templates(generation)
+        if not templates:
+            logger.warning(
+                f"No itinerary templates at {generation}; generating every itinerary"
+            )
+            return False
+        self._templates = templates
+        self._index([template.summary() for template in templates.values()])
+        self.version = generation.resolve().name
+        logger.info(f"Loaded {len(templates)} itinerary templates ({self.version})")
+        return True
+
+    async def _sync(self) -> None:
+        """Follow the Redis version pointer (at most every refresh_seconds)."""
+        if self.backend != "redis":
+            return
+        if time.monotonic() - self._synced_at < self.refresh_seconds:
+            return
+        self._synced_at = time.monotonic()
+        try:
+            redis = get_redis()
+            raw = await redis.get(f"{_REDIS_PREFIX}:version")
+            version = raw.decode() if raw is not None else None
+            if version is None or version == self.version:
+                return
+            index = await redis.get(f"{_REDIS_PREFIX}:{version}:index")
+        except Exception as e:
+            logger.warning(f"Itinerary template sync failed: {str(e)}")
+            return
+        if index is None:
+            return
+        self._index(
+            [TemplateSummary.model_validate(item) for item in json.loads(index)]
+        )
+        self._fetched.clear()
+        self.version = version
+
+    async def summaries(
+        self, destination: Optional[str] = None
+    ) -> List[TemplateSummary]:
+        """Available templates, for one destination or all."""
+        await self._sync()
+        if destination is not None:
+            key = match_destination(destination, self._summaries)
+            return list(self._summaries[key]) if key is not None else []
+        return [summary for group in self._summaries.values() for summary in group]
+
+    async def get(self, template_id: str) -> Optional[ItineraryTemplate]:
+        """A template by id, None if the current version has no such id."""
+        await self._sync()
+        if self.backend != "redis":
+            return self._templates.get(template_id)
+        template = self._fetched.get(template_id)
+        if template is None and self.version is not None:
+            try:
+                key = f"{_REDIS_PREFIX}:{self.version}:{template_id}"
+                raw = await get_redis().get(key)
+            except Exception as e:
+                logger.warning(f"Itinerary template lookup failed: {str(e)}")
+                return None
+            if raw is None:
+                return None
+            template = ItineraryTemplate.model_validate_json(raw)
+            self._fetched.set(template_id, template)
+        return template
+
+    async def nearest(
+        self, destination: str, duration: int, pace: str
+    ) -> Optional[ItineraryTemplate]:
+        """
+        The shortest template for ``destination`` at ``pace`` lasting at
+        least ``duration`` days (its first days make the trip), if any.
+        An ambiguous destination ("Paris" with templates for two Parises)
+        has none, so the itinerary is generated.
+        """
+        candidates = [
+            summary for summary in await self.summaries(destination)
+            if summary.pace == pace and summary.duration >= duration
+        ]
+        if not candidates:
+            return None
+        return await self.get(min(candidates, key=lambda s: s.duration).id)
+
+
+template_store = TemplateStore()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Precompute itinerary templates for the most popular destinations."
+    )
+    parser.add_argument(
+        "catalogue", type=Path, help="destinations JSON-lines catalogue"
+    )
+    parser.add_argument(
+        "--top", type=int, default=20, help="most popular destinations covered"
+    )
+    parser.add_argument(
+        "--durations",
+        type=int,
+        nargs="+",
+        default=settings.ITINERARY_TEMPLATE_DURATIONS,
+    )
+    parser.add_argument("--paces", nargs="+", choices=PACES, default=list(PACES))
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.ITINERARY_TEMPLATE_CONCURRENCY
+    )
+    parser.add_argument(
+        "--out", type=Path, default=Path(settings.ITINERARY_TEMPLATES_PATH)
+    )
+    parser.add_argument(
+        "--refresh", action="store_true", help="regenerate existing templates"
+    )
+    parser.add_argument("--redis", action="store_true", help="also publish to Redis")
+    parser.add_argument("--keep", type=int, default=2, help="generations kept on disk")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app.ai.knowledge import knowledge_base
+    from app.ai.registry import agent_registry
+    from app.api.deps import get_itinerary_agent
+
+    if settings.KNOWLEDGE_ENABLED:
+        knowledge_base.load()
+
+    async def run() -> Tuple[Path, Dict[str, ItineraryTemplate], int]:
+        try:
+            generation, templates, generated = await precompute(
+                args.catalogue,
+                args.out,
+                get_itinerary_agent(),
+                args.top,
+                args.durations,
+                args.paces,
+                args.concurrency,
+                args.refresh,
+                args.keep,
+            )
+            if args.redis:
+                await publish_redis(generation.name, templates)
+            return generation, templates, generated
+        finally:
+            await agent_registry.close()
+            await close_redis()
+
+    generation, templates, generated = asyncio.run(run())
+    print(f"{generation}: {len(templates)} templates, {generated} generated")
+
+
+if __name__ == "__main__":
+    main()
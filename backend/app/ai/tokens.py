@@ -0,0 +1,96 @@
+"""
+Token counting for prompt budgets.
+
+Uses the model's tiktoken encoding (cl100k_base for models tiktoken does
+not know, Claude included, which is close enough for budgeting). Without
+tiktoken, or when its encoding files cannot be downloaded, falls back to
+about four characters per token. Requests are
+sized against each model's context window before they are sent.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        name = "cl100k_base"
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # Encodings are downloaded on first use; estimate without them
+        logger.warning(f"No tiktoken encoding for {model}, estimating: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class PromptTooLongError(ValueError):
+    """The prompt leaves no room for an answer in the model's context window."""
+
+
+# Context window by model-name prefix; the longest matching prefix wins
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "claude-2": 100000,
+    "claude-2.1": 200000,
+    "claude-3": 200000,
+    "claude-instant": 100000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat formatting tokens per message, plus the reply primer
+_MESSAGE_OVERHEAD = 4
+_REPLY_OVERHEAD = 3
+
+# Smallest answer worth asking for
+MIN_COMPLETION_TOKENS = 256
+
+
+def context_window(model: str) -> int:
+    name = model.lower()
+    matches = [prefix for prefix in CONTEXT_WINDOWS if name.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def count_message_tokens(messages: Sequence[str], model: str = "gpt-4") -> int:
+    """Prompt tokens of a chat request made of ``messages``."""
+    per_message = sum(
+        count_tokens(text, model) + _MESSAGE_OVERHEAD for text in messages
+    )
+    return per_message + _REPLY_OVERHEAD
+
+
+def fit_max_tokens(prompt_tokens: int, requested: int, models: Sequence[str]) -> int:
+    """
+    ``requested`` output tokens, lowered so prompt plus answer fit the
+    smallest context window among ``models``.
+
+    Raises PromptTooLongError if fewer than MIN_COMPLETION_TOKENS remain.
+    """
+    available = min(context_window(model) for model in models) - prompt_tokens
+    if available < MIN_COMPLETION_TOKENS:
+        raise PromptTooLongError(
+            f"Prompt of {prompt_tokens} tokens leaves {available} for the answer"
+        )
+    return min(requested, available)
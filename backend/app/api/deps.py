@@ -0,0 +1,44 @@
+from typing import List
+
+from app.ai.agents.itinerary_agent import ItineraryAgent
+from app.ai.agents.research_agent import ResearchAgent
+from app.ai.registry import AgentSpec, agent_registry
+from app.core.config import settings
+
+
+def agent_specs() -> List[AgentSpec]:
+    """Agent configurations pre-built at application startup."""
+    return [
+        (
+            ResearchAgent,
+            settings.RESEARCH_AGENT_MODEL,
+            settings.RESEARCH_AGENT_TEMPERATURE,
+            settings.RESEARCH_AGENT_FALLBACK_MODELS,
+        ),
+        (
+            ItineraryAgent,
+            settings.ITINERARY_AGENT_MODEL,
+            settings.ITINERARY_AGENT_TEMPERATURE,
+            settings.ITINERARY_AGENT_FALLBACK_MODELS,
+        ),
+    ]
+
+
+def get_research_agent() -> ResearchAgent:
+    """FastAPI dependency returning the shared research agent."""
+    return agent_registry.get(
+        ResearchAgent,
+        settings.RESEARCH_AGENT_MODEL,
+        settings.RESEARCH_AGENT_TEMPERATURE,
+        settings.RESEARCH_AGENT_FALLBACK_MODELS,
+    )
+
+
+def get_itinerary_agent() -> ItineraryAgent:
+    """FastAPI dependency returning the shared itinerary agent."""
+    return agent_registry.get(
+        ItineraryAgent,
+        settings.ITINERARY_AGENT_MODEL,
+        settings.ITINERARY_AGENT_TEMPERATURE,
+        settings.ITINERARY_AGENT_FALLBACK_MODELS,
+    )
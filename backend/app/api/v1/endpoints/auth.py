@@ -41,7 +41,9 @@ async def register(user_data: UserRegister):
     - **full_name**: User's full name
     """
     # TODO: Check if user exists
-    # TODO: Create user in database
+    # TODO: Create user in database with the hash from
+    #       password_hasher.hash(), which runs bcrypt in the process pool
+    #       so the event loop stays responsive
     
     return {
         "id": 1,
@@ -57,7 +59,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
     Returns access and refresh tokens.
     """
-    # TODO: Verify credentials against database
+    # TODO: Verify credentials against database with
+    #       password_hasher.verify_and_update() and persist the new hash
+    #       it returns when the stored one uses outdated bcrypt settings
     # TODO: Check if MFA is enabled
     
     # Create tokens
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import AsyncIterator, List, Optional, Dict, Any
+import json
 import logging
 
 from app.ai.agents.itinerary_agent import ItineraryAgent
+from app.ai.schemas import DayPlan
+from app.ai.templates import ItineraryTemplate, TemplateSummary, template_store
+from app.api.deps import get_itinerary_agent
+from app.api.v1.endpoints.jobs import JobAccepted, accept_job
+from app.core.config import settings
+from app.core.metrics import ITINERARY_TEMPLATE_REQUESTS
+from app.core.singleflight import SingleFlight, request_key
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Identical concurrent requests share one agent execution
+itinerary_flight = SingleFlight("itinerary")
+
 class ItineraryRequest(BaseModel):
     destination: str = Field(..., description="Destination for the itinerary")
     duration: int = Field(..., ge=1, le=30, description="Trip duration in days")
@@ -35,26 +47,76 @@ class ItineraryRequest(BaseModel):
             }
         }
 
-class DayPlan(BaseModel):
-    day: int
-    morning: str
-    lunch: str
-    afternoon: str
-    evening: str
-    dinner: str
-    accommodation: str
-    estimated_cost: float
-    tips: str
-
 class ItineraryResponse(BaseModel):
     destination: str
     duration: int
     daily_plans: List[DayPlan]
     total_estimated_cost: float
     overview: str
+    template_id: Optional[str] = None  # precomputed itinerary it was adapted from
+
+class TemplateList(BaseModel):
+    version: Optional[str] = None
+    templates: List[TemplateSummary]
+
+async def run_itinerary(
+    request: ItineraryRequest,
+    itinerary_agent: ItineraryAgent,
+) -> ItineraryResponse:
+    """
+    Generate the itinerary for ``request`` (shared with the job worker).
+    
+    Starts from the nearest precomputed template when there is one, so
+    only the days the traveler's interests or requirements change are
+    generated.
+    """
+    agent_input = {
+        "destination": request.destination,
+        "duration": request.duration,
+        "interests": request.interests,
+        "pace": request.pace,
+        "special_requirements": request.special_requirements,
+    }
+    
+    template = None
+    if settings.ITINERARY_TEMPLATES_ENABLED:
+        template = await template_store.nearest(
+            request.destination, request.duration, request.pace
+        )
+    
+    if template is None:
+        outcome = "miss"
+    elif request.interests or request.special_requirements:
+        outcome = "adapted"
+    else:
+        outcome = "served"
+    ITINERARY_TEMPLATE_REQUESTS.labels(outcome).inc()
+    
+    async def generate() -> Dict[str, Any]:
+        if template is None:
+            return await itinerary_agent.execute(agent_input)
+        return await itinerary_agent.personalize(template.model_dump(), agent_input)
+    
+    results = await itinerary_flight.do(request_key(request), generate)
+    
+    daily_plans = [
+        DayPlan.model_validate(day) for day in results["daily_plans"]
+    ]
+    
+    return ItineraryResponse(
+        destination=request.destination,
+        duration=request.duration,
+        daily_plans=daily_plans,
+        total_estimated_cost=results["total_estimated_cost"],
+        overview=results["overview"],
+        template_id=template.id if template is not None else None,
+    )
 
 @router.post("/generate", response_model=ItineraryResponse)
-async def generate_itinerary(request: ItineraryRequest):
+async def generate_itinerary(
+    request: ItineraryRequest,
+    itinerary_agent: ItineraryAgent = Depends(get_itinerary_agent),
+):
     """
     Generate a personalized travel itinerary using AI.
     
@@ -62,46 +124,7 @@ async def generate_itinerary(request: ItineraryRequest):
     user preferences, interests, and travel style.
     """
     try:
-        # Initialize itinerary agent
-        itinerary_agent = ItineraryAgent(model="gpt-4", temperature=0.7)
-        
-        # Prepare input
-        agent_input = {
-            "destination": request.destination,
-            "duration": request.duration,
-            "interests": request.interests,
-            "pace": request.pace,
-            "special_requirements": request.special_requirements,
-        }
-        
-        # Generate itinerary
-        results = await itinerary_agent.execute(agent_input)
-        
-        # TODO: Parse AI response into structured format
-        
-        # Mock response
-        daily_plans = [
-            DayPlan(
-                day=i + 1,
-                morning=f"Day {i + 1} morning activities",
-                lunch="Local restaurant recommendation",
-                afternoon=f"Day {i + 1} afternoon activities",
-                evening="Evening entertainment",
-                dinner="Dinner recommendation",
-                accommodation="Hotel name",
-                estimated_cost=150.0,
-                tips="Local tips and insights",
-            )
-            for i in range(request.duration)
-        ]
-        
-        return ItineraryResponse(
-            destination=request.destination,
-            duration=request.duration,
-            daily_plans=daily_plans,
-            total_estimated_cost=request.duration * 150.0,
-            overview="Comprehensive itinerary overview...",
-        )
+        return await run_itinerary(request, itinerary_agent)
     
     except Exception as e:
         logger.error(f"Error generating itinerary: {str(e)}")
@@ -110,24 +133,87 @@ async def generate_itinerary(request: ItineraryRequest):
             detail=f"Error generating itinerary: {str(e)}"
         )
 
-@router.get("/templates")
-async def get_itinerary_templates():
+@router.post(
+    "/jobs",
+    response_model=JobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_itinerary_job(request: ItineraryRequest):
     """
-    Get pre-built itinerary templates for popular destinations.
+    Queue an itinerary generation on the generation workers.
+    
+    Returns a job ID at once; poll `GET /jobs/{job_id}` or subscribe to
+    `GET /jobs/{job_id}/events` for the `ItineraryResponse`.
     """
-    return {
-        "templates": [
-            {
-                "id": 1,
-                "destination": "Paris",
-                "duration": 5,
-                "theme": "Classic Parisian Experience",
-            },
-            {
-                "id": 2,
-                "destination": "Tokyo",
-                "duration": 7,
-                "theme": "Modern & Traditional Japan",
-            },
-        ]
+    return await accept_job("itinerary", request)
+
+@router.post("/generate/stream")
+async def generate_itinerary_stream(
+    request: ItineraryRequest,
+    itinerary_agent: ItineraryAgent = Depends(get_itinerary_agent),
+):
+    """
+    Generate a personalized travel itinerary as a stream.
+    
+    Returns newline-delimited JSON (application/x-ndjson). Each validated
+    day is sent as soon as the model finishes it:
+    
+    - `{"type": "day", "data": DayPlan}`
+    - `{"type": "summary", "data": {"overview", "total_estimated_cost"}}`
+    - `{"type": "error", "detail": str}` if generation fails mid-stream
+    """
+    agent_input = {
+        "destination": request.destination,
+        "duration": request.duration,
+        "interests": request.interests,
+        "pace": request.pace,
+        "special_requirements": request.special_requirements,
     }
+    
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            async for kind, data in itinerary_agent.stream(agent_input):
+                if kind == "day":
+                    try:
+                        plan = DayPlan.model_validate(data)
+                    except ValidationError:
+                        logger.warning("Skipping invalid streamed day plan")
+                        continue
+                    payload = {"type": "day", "data": plan.model_dump()}
+                else:
+                    payload = {"type": kind, "data": data}
+                yield (json.dumps(payload) + "\n").encode("utf-8")
+        except Exception as e:
+            logger.error(f"Error streaming itinerary: {str(e)}")
+            payload = {"type": "error", "detail": "Error generating itinerary"}
+            yield (json.dumps(payload) + "\n").encode("utf-8")
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/templates", response_model=TemplateList)
+async def get_itinerary_templates(destination: Optional[str] = None):
+    """
+    List the precomputed itineraries for popular destinations.
+    
+    `POST /itinerary/generate` starts from the nearest of these (same
+    destination and pace, at least as many days) instead of generating the
+    whole itinerary.
+    """
+    templates = await template_store.summaries(destination)
+    return TemplateList(
+        version=template_store.version,
+        templates=sorted(templates, key=lambda t: (t.destination, t.duration, t.pace)),
+    )
+
+@router.get("/templates/{template_id}", response_model=ItineraryTemplate)
+async def get_itinerary_template(template_id: str):
+    """
+    Get a precomputed itinerary.
+    """
+    template = await template_store.get(template_id)
+    if template is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Template not found"
+        )
+    return template
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, Optional
+import json
+import logging
+
+from app.core.jobs import get_job, job_events, submit_job
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    deduplicated: bool
+    status_url: str
+    events_url: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # queued, running, completed, failed
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+async def accept_job(kind: str, request: BaseModel) -> JobAccepted:
+    """Queue a job for a job-submission endpoint."""
+    try:
+        job_id, deduplicated = await submit_job(kind, request)
+    except Exception as e:
+        logger.error(f"Error queuing {kind} job: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue unavailable, please retry shortly"
+        )
+    return JobAccepted(
+        job_id=job_id,
+        status="queued",
+        deduplicated=deduplicated,
+        status_url=f"/api/v1/jobs/{job_id}",
+        events_url=f"/api/v1/jobs/{job_id}/events",
+    )
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """
+    Get the status of a background job, with its result once completed.
+    """
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found or expired"
+        )
+    return JobStatus(**job)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Subscribe to a background job as Server-Sent Events.
+
+    Sends a `status` event with the current `JobStatus` at once and on
+    every change, and closes after the `completed` or `failed` one. A
+    comment line is sent every 15 seconds while nothing changes.
+    """
+    if await get_job(job_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found or expired"
+        )
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            async for job in job_events(job_id):
+                if job is None:
+                    yield b": keep-alive\n\n"
+                    continue
+                payload = JobStatus(**job).model_dump_json()
+                yield f"event: status\ndata: {payload}\n\n".encode("utf-8")
+        except Exception as e:
+            logger.error(f"Error streaming job events: {str(e)}")
+            payload = json.dumps({"detail": "Job event stream interrupted"})
+            yield f"event: error\ndata: {payload}\n\n".encode("utf-8")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
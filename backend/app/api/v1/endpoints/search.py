@@ -1,16 +1,43 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import date
+import asyncio
+import json
 import logging
+import time
 
 from app.ai.agents.research_agent import ResearchAgent
+from app.ai.budget import BudgetBundle, optimize_budget
+from app.ai.destinations import DestinationMatch, destination_index
+from app.ai.schemas import ActivityOption, FlightOption, HotelOption, ResearchOutput
+from app.api.deps import get_research_agent
+from app.api.v1.endpoints.jobs import JobAccepted, accept_job
+from app.api.v1.endpoints.users import TravelPreferences
+from app.core.concurrency import KeyedSemaphore
+from app.core.config import settings
+from app.core.rate_limit import charge_rate_limit, client_identity
+from app.core.singleflight import SingleFlight, request_key
+from app.services.clients import fetch_travel_data
+from app.services.date_grid import build_price_grid
+from app.services.schemas import LiveTravelData, PriceGrid, WeatherForecast
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Identical concurrent requests share one agent execution
+search_flight = SingleFlight("search")
+
+# Caps batch searches per user, across all of that user's batches
+batch_slots = KeyedSemaphore(settings.SEARCH_BATCH_USER_CONCURRENCY)
+
 class SearchRequest(BaseModel):
     destination: str = Field(..., description="Destination city or country")
+    origin: Optional[str] = Field(
+        None,
+        description="Departure city (enables live flight offers)"
+    )
     start_date: date = Field(..., description="Travel start date")
     end_date: date = Field(..., description="Travel end date")
     budget: float = Field(..., gt=0, description="Total budget in USD")
@@ -19,11 +46,21 @@ class SearchRequest(BaseModel):
         default=[],
         description="Travel preferences (e.g., 'beach', 'culture', 'adventure')"
     )
+    flexible_days: int = Field(
+        0,
+        ge=0,
+        le=7,
+        description=(
+            "Also price leaving and returning up to this many days "
+            "earlier or later"
+        )
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "destination": "Tokyo, Japan",
+                "origin": "Paris, France",
                 "start_date": "2025-03-15",
                 "end_date": "2025-03-22",
                 "budget": 3000,
@@ -32,30 +69,133 @@ class SearchRequest(BaseModel):
             }
         }
 
-class FlightOption(BaseModel):
-    airline: str
-    departure_time: str
-    arrival_time: str
-    duration: str
-    price: float
-    stops: int
-
-class HotelOption(BaseModel):
-    name: str
-    rating: float
-    price_per_night: float
-    location: str
-    amenities: List[str]
-
 class SearchResponse(BaseModel):
     destination: str
     flights: List[FlightOption]
     hotels: List[HotelOption]
+    activities: List[ActivityOption] = []
     estimated_total: float
+    budget_options: List[BudgetBundle] = []
     recommendations: str
+    weather: List[WeatherForecast] = []
+    date_grid: Optional[PriceGrid] = None
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.SEARCH_BATCH_MAX_ITEMS,
+        description="Searches to run, e.g. one per candidate destination"
+    )
+
+class DestinationRecommendationRequest(BaseModel):
+    preferences: TravelPreferences
+    limit: int = Field(10, ge=1, le=settings.DESTINATION_RECOMMENDATION_MAX)
+    category: Optional[str] = Field(
+        None, description="e.g. \"beach\"; matched within the category"
+    )
+
+class DestinationRecommendations(BaseModel):
+    destinations: List[DestinationMatch]
+
+def _plan_budget(
+    request: SearchRequest,
+    research: ResearchOutput,
+) -> Tuple[float, List[BudgetBundle]]:
+    """
+    Trip total and the best bundles within budget. The total is the top
+    bundle's, or the cheapest flight and hotel when nothing fits.
+    """
+    nights = max((request.end_date - request.start_date).days, 1)
+    bundles = optimize_budget(
+        research.flights,
+        research.hotels,
+        research.activities,
+        budget=request.budget,
+        travelers=request.travelers,
+        nights=nights,
+        preferences=request.preferences or [],
+    )
+    if bundles:
+        return bundles[0].total, bundles
+    flight = min((f.price for f in research.flights), default=0.0)
+    hotel = min((h.price_per_night for h in research.hotels), default=0.0)
+    return flight * request.travelers + hotel * nights, []
+
+async def run_search(
+    request: SearchRequest,
+    research_agent: ResearchAgent,
+) -> SearchResponse:
+    """Research the trip and merge in live offers (shared with the job worker)."""
+    agent_input = {
+        "destination": request.destination,
+        "dates": {
+            "start_date": request.start_date.isoformat(),
+            "end_date": request.end_date.isoformat(),
+        },
+        "budget": request.budget,
+        "travelers": request.travelers,
+        "preferences": request.preferences,
+    }
+    
+    async def research_and_fetch() -> Dict[str, Any]:
+        # Agent research and live provider lookups run side by side
+        results, live = await asyncio.gather(
+            research_agent.execute(agent_input),
+            fetch_travel_data(
+                request.destination,
+                request.start_date,
+                request.end_date,
+                request.travelers,
+                origin=request.origin,
+                flexible_days=request.flexible_days,
+            ),
+        )
+        return {**results, "live_data": live.model_dump(mode="json")}
+    
+    results = await search_flight.do(request_key(request), research_and_fetch)
+    
+    research = ResearchOutput.model_validate(results["research_data"])
+    live = LiveTravelData.model_validate(results["live_data"])
+    
+    # Live offers carry real prices
+    if live.flights or live.hotels:
+        research = research.model_copy(update={
+            "flights": live.flights or research.flights,
+            "hotels": live.hotels or research.hotels,
+        })
+    estimated_total, budget_options = _plan_budget(request, research)
+    
+    date_grid = None
+    if request.flexible_days:
+        date_grid = build_price_grid(
+            request.start_date,
+            request.end_date,
+            request.flexible_days,
+            research.hotels,
+            request.travelers,
+            request.budget,
+            fares=live.date_fares,
+            fallback_fare=min((f.price for f in research.flights), default=None),
+        )
+    
+    return SearchResponse(
+        destination=request.destination,
+        flights=research.flights,
+        hotels=research.hotels,
+        activities=research.activities,
+        estimated_total=estimated_total,
+        budget_options=budget_options,
+        recommendations=research.recommendations,
+        weather=live.weather,
+        date_grid=date_grid,
+    )
 
 @router.post("/travel", response_model=SearchResponse)
-async def search_travel_options(request: SearchRequest):
+async def search_travel_options(
+    request: SearchRequest,
+    research_agent: ResearchAgent = Depends(get_research_agent),
+):
     """
     Search for travel options (flights, hotels, activities).
     
@@ -63,52 +203,7 @@ async def search_travel_options(request: SearchRequest):
     based on user preferences and constraints.
     """
     try:
-        # Initialize research agent
-        research_agent = ResearchAgent(model="gpt-4", temperature=0.3)
-        
-        # Prepare input for agent
-        agent_input = {
-            "destination": request.destination,
-            "dates": {
-                "start_date": request.start_date.isoformat(),
-                "end_date": request.end_date.isoformat(),
-            },
-            "budget": request.budget,
-            "travelers": request.travelers,
-            "preferences": request.preferences,
-        }
-        
-        # Execute research
-        results = await research_agent.execute(agent_input)
-        
-        # TODO: Parse AI response and structure data
-        # TODO: Call actual flight/hotel APIs (Amadeus, etc.)
-        
-        # Mock response for now
-        return SearchResponse(
-            destination=request.destination,
-            flights=[
-                FlightOption(
-                    airline="Air France",
-                    departure_time="2025-03-15T10:00:00",
-                    arrival_time="2025-03-16T05:00:00",
-                    duration="13h",
-                    price=850.0,
-                    stops=1,
-                )
-            ],
-            hotels=[
-                HotelOption(
-                    name="Tokyo Grand Hotel",
-                    rating=4.5,
-                    price_per_night=120.0,
-                    location="Shinjuku",
-                    amenities=["WiFi", "Breakfast", "Gym"],
-                )
-            ],
-            estimated_total=2500.0,
-            recommendations="Based on your preferences, consider...",
-        )
+        return await run_search(request, research_agent)
     
     except Exception as e:
         logger.error(f"Error searching travel options: {str(e)}")
@@ -117,11 +212,133 @@ async def search_travel_options(request: SearchRequest):
             detail=f"Error processing search request: {str(e)}"
         )
 
+async def _run_batch_item(
+    item: SearchRequest,
+    research_agent: ResearchAgent,
+    identity: str,
+    started: float,
+) -> Dict[str, Any]:
+    """One search of a batch as a result or error line, without its index."""
+    async with batch_slots.acquire(identity):
+        item_started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                run_search(item, research_agent),
+                timeout=settings.SEARCH_BATCH_ITEM_TIMEOUT_SECONDS,
+            )
+            payload = {"type": "result", "data": response.model_dump(mode="json")}
+        except asyncio.TimeoutError:
+            payload = {"type": "error", "detail": "Search timed out"}
+        except Exception as e:
+            logger.error(f"Error in batch search for {item.destination}: {str(e)}")
+            payload = {"type": "error", "detail": "Error processing search request"}
+        now = time.perf_counter()
+        payload["duration_ms"] = round((now - item_started) * 1000, 1)
+        payload["elapsed_ms"] = round((now - started) * 1000, 1)
+        return payload
+
+async def _batch_events(
+    groups: List[List[int]],
+    run_group: Callable[[List[int]], Awaitable[Dict[str, Any]]],
+    started: float,
+) -> AsyncIterator[bytes]:
+    """Stream a line per index as its group completes, then the summary."""
+    async def run(group: List[int]) -> Tuple[List[int], Dict[str, Any]]:
+        return group, await run_group(group)
+    
+    tasks = [asyncio.create_task(run(group)) for group in groups]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            group, payload = await next_done
+            for index in group:
+                failed += payload["type"] == "error"
+                line = {"type": payload["type"], "index": index, **payload}
+                yield (json.dumps(line) + "\n").encode("utf-8")
+    finally:
+        # Client went away: stop the searches nobody will read
+        for task in tasks:
+            task.cancel()
+    summary = {
+        "type": "summary",
+        "succeeded": sum(len(group) for group in groups) - failed,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    yield (json.dumps(summary) + "\n").encode("utf-8")
+
+@router.post("/travel/batch")
+async def search_travel_batch(
+    batch: BatchSearchRequest,
+    request: Request,
+    research_agent: ResearchAgent = Depends(get_research_agent),
+):
+    """
+    Run several travel searches concurrently and stream each result.
+    
+    Returns newline-delimited JSON (application/x-ndjson), one line per
+    search in completion order, so a slow destination does not hold back
+    the others:
+    
+    - `{"type": "result", "index": int, "duration_ms": float,
+      "elapsed_ms": float, "data": SearchResponse}`
+    - `{"type": "error", "index": int, "duration_ms": float,
+      "elapsed_ms": float, "detail": str}`
+    - `{"type": "summary", "succeeded": int, "failed": int,
+      "elapsed_ms": float}` last
+    
+    `index` is the position in `searches`, `duration_ms` the time spent
+    searching and `elapsed_ms` the time since the batch started. At most
+    `SEARCH_BATCH_USER_CONCURRENCY` searches per user run at once;
+    identical searches and shared provider lookups run once. Each distinct
+    search counts against the AI rate limit, so a batch the limit cannot
+    cover is refused with a 429 before any search starts.
+    """
+    identity = client_identity(request.scope)
+    started = time.perf_counter()
+    
+    # Repeated searches in the batch run once and answer every index
+    indices: Dict[str, List[int]] = {}
+    for index, item in enumerate(batch.searches):
+        indices.setdefault(request_key(item), []).append(index)
+    # The request itself paid for one search
+    await charge_rate_limit(request, len(indices) - 1)
+    
+    def run_group(group: List[int]) -> Awaitable[Dict[str, Any]]:
+        item = batch.searches[group[0]]
+        return _run_batch_item(item, research_agent, identity, started)
+    
+    return StreamingResponse(
+        _batch_events(list(indices.values()), run_group, started),
+        media_type="application/x-ndjson",
+    )
+
+@router.post(
+    "/jobs",
+    response_model=JobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_search_job(request: SearchRequest):
+    """
+    Queue a travel search on the generation workers.
+    
+    Returns a job ID at once; poll `GET /jobs/{job_id}` or subscribe to
+    `GET /jobs/{job_id}/events` for the `SearchResponse`.
+    """
+    return await accept_job("search", request)
+
 @router.get("/destinations/popular")
 async def get_popular_destinations():
     """
     Get list of popular travel destinations.
     """
+    if destination_index.loaded:
+        return {
+            "destinations": [
+                {"name": destination.name, "category": destination.category}
+                for destination in destination_index.popular(5)
+            ]
+        }
     return {
         "destinations": [
             {"name": "Paris, France", "category": "Culture"},
@@ -131,3 +348,36 @@ async def get_popular_destinations():
             {"name": "Barcelona, Spain", "category": "Beach & Culture"},
         ]
     }
+
+@router.post("/destinations/recommendations", response_model=DestinationRecommendations)
+async def recommend_destinations(request: DestinationRecommendationRequest):
+    """
+    Recommend destinations for a travel preference profile.
+    
+    The profile's interests and preferred destinations are embedded and
+    matched against the destination index; preferred destinations are not
+    recommended back. Without either, the most popular destinations are
+    returned.
+    """
+    if not destination_index.loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Destination recommendations are unavailable"
+        )
+    
+    preferences = request.preferences
+    try:
+        destinations = await destination_index.recommend(
+            preferences.interests,
+            preferences.preferred_destinations,
+            travel_style=preferences.travel_style,
+            limit=request.limit,
+            category=request.category,
+        )
+    except ImportError:
+        logger.error("Destination recommendations need sentence-transformers")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Destination recommendations are unavailable"
+        )
+    return DestinationRecommendations(destinations=destinations)
@@ -4,6 +4,8 @@ from typing import Optional, List
 import logging
 
 from app.api.v1.endpoints.auth import oauth2_scheme, decode_token
+from app.services.token_revocation import revoke_user_tokens
+from app.services.user_cache import UserCache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -27,6 +29,33 @@ class UserUpdate(BaseModel):
     bio: Optional[str] = None
     travel_preferences: Optional[TravelPreferences] = None
 
+# Read through on every request (agents personalise with the preferences);
+# writes below invalidate before responding
+profile_cache: UserCache[UserProfile] = UserCache("profile", UserProfile)
+preferences_cache: UserCache[TravelPreferences] = UserCache(
+    "preferences", TravelPreferences
+)
+
+async def _load_profile(user_id: str) -> Optional[UserProfile]:
+    # TODO: Fetch from database
+    return UserProfile(
+        email=user_id,
+        full_name="User Name",
+        bio="Travel enthusiast",
+        avatar_url=None,
+    )
+
+async def _load_preferences(user_id: str) -> Optional[TravelPreferences]:
+    # TODO: Fetch from database
+    return TravelPreferences(
+        preferred_destinations=["Paris", "Tokyo", "Barcelona"],
+        travel_style="moderate",
+        interests=["culture", "food", "history"],
+        budget_range="medium",
+        dietary_restrictions=[],
+        accessibility_needs=[],
+    )
+
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile(token: str = Depends(oauth2_scheme)):
     """
@@ -34,13 +63,13 @@ async def get_user_profile(token: str = Depends(oauth2_scheme)):
     """
     payload = decode_token(token)
     
-    # TODO: Fetch from database
-    return UserProfile(
-        email=payload.get("sub"),
-        full_name="User Name",
-        bio="Travel enthusiast",
-        avatar_url=None,
-    )
+    profile = await profile_cache.get(payload.get("sub"), _load_profile)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return profile
 
 @router.put("/profile", response_model=UserProfile)
 async def update_user_profile(
@@ -54,6 +83,10 @@ async def update_user_profile(
     
     # TODO: Update in database
     
+    await profile_cache.invalidate(payload.get("sub"))
+    if update.travel_preferences is not None:
+        await preferences_cache.invalidate(payload.get("sub"))
+    
     return UserProfile(
         email=payload.get("sub"),
         full_name=update.full_name or "User Name",
@@ -66,15 +99,15 @@ async def get_travel_preferences(token: str = Depends(oauth2_scheme)):
     """
     Get user's travel preferences.
     """
-    # TODO: Fetch from database
-    return TravelPreferences(
-        preferred_destinations=["Paris", "Tokyo", "Barcelona"],
-        travel_style="moderate",
-        interests=["culture", "food", "history"],
-        budget_range="medium",
-        dietary_restrictions=[],
-        accessibility_needs=[],
-    )
+    payload = decode_token(token)
+    
+    preferences = await preferences_cache.get(payload.get("sub"), _load_preferences)
+    if preferences is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return preferences
 
 @router.put("/preferences", response_model=TravelPreferences)
 async def update_travel_preferences(
@@ -86,7 +119,11 @@ async def update_travel_preferences(
     
     These preferences are used by AI agents to personalize recommendations.
     """
+    payload = decode_token(token)
+    
     # TODO: Save to database
+    
+    await preferences_cache.invalidate(payload.get("sub"))
     return preferences
 
 @router.delete("/account")
@@ -101,6 +138,11 @@ async def delete_user_account(token: str = Depends(oauth2_scheme)):
     # TODO: Mark account for deletion
     # TODO: Schedule data erasure job
     
+    # Reject this account's tokens in every worker
+    await revoke_user_tokens(payload.get("sub"))
+    await profile_cache.invalidate(payload.get("sub"))
+    await preferences_cache.invalidate(payload.get("sub"))
+    
     return {
         "message": "Account deletion request received. "
                    "Your data will be permanently deleted within 48 hours."
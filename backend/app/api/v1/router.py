@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, search, itinerary, users
+from app.api.v1.endpoints import auth, search, itinerary, jobs, users
 
 api_router = APIRouter()
 
@@ -27,3 +27,9 @@ api_router.include_router(
     prefix="/itinerary",
     tags=["Itinerary"]
 )
+
+api_router.include_router(
+    jobs.router,
+    prefix="/jobs",
+    tags=["Jobs"]
+)
@@ -0,0 +1,40 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+import asyncio
+
+
+class _Slot:
+    __slots__ = ("semaphore", "holders")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.holders = 0
+
+
+class KeyedSemaphore:
+    """
+    One semaphore per key (e.g. per user), so each key may run at most
+    ``limit`` operations at once. Semaphores are created on first use and
+    dropped when nobody holds or waits on them.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[str, _Slot] = {}
+
+    @asynccontextmanager
+    async def acquire(self, key: str) -> AsyncIterator[None]:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot(self.limit)
+        slot.holders += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.holders -= 1
+            if slot.holders == 0:
+                del self._slots[key]
+
+    def __len__(self) -> int:
+        return len(self._slots)
@@ -13,6 +13,11 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    JWT_CACHE_MAX_ENTRIES: int = 10000
+    JWT_REVOCATION_REDIS_ENABLED: bool = True  # share revocations between workers
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -27,23 +32,154 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    
+    # Request coalescing
+    SINGLE_FLIGHT_REDIS_ENABLED: bool = False
+    SINGLE_FLIGHT_LOCK_TTL_SECONDS: int = 120
+    SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS: float = 120.0
     
     # AI APIs
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
     HUGGINGFACE_API_KEY: str = ""
     
+    # AI Agents
+    RESEARCH_AGENT_MODEL: str = "gpt-4"
+    RESEARCH_AGENT_TEMPERATURE: float = 0.3
+    ITINERARY_AGENT_MODEL: str = "gpt-4"
+    ITINERARY_AGENT_TEMPERATURE: float = 0.7
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_REQUEST_TIMEOUT: float = 60.0
+    ITINERARY_CHUNKED_GENERATION: bool = True
+    ITINERARY_CHUNK_DAYS: int = 5
+    ITINERARY_CHUNK_CONCURRENCY: int = 4
+    ITINERARY_ROUTE_OPTIMIZATION: bool = True  # needs GOOGLE_MAPS_API_KEY
+    ITINERARY_TRAVEL_SPEED_KMH: float = 12.0  # door-to-door city average
+    ITINERARY_MAX_OUTPUT_TOKENS: int = 4096  # provider cap on one answer
+    ITINERARY_MAX_CONTINUATIONS: int = 5
+    # Backup models tried in order after the primary (e.g. ["claude-3-sonnet-20240229"])
+    RESEARCH_AGENT_FALLBACK_MODELS: List[str] = []
+    ITINERARY_AGENT_FALLBACK_MODELS: List[str] = []
+    LLM_HEDGING_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 3.0
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_WINDOW: int = 200
+    LLM_PROVIDER_FAILURE_THRESHOLD: int = 3
+    LLM_PROVIDER_COOLDOWN_SECONDS: float = 30.0
+    
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_REDIS_ENABLED: bool = True
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False
+    LLM_SEMANTIC_CACHE_MODEL: str = "all-MiniLM-L6-v2"
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Knowledge base (retrieval-augmented prompts,
+    # built with `python -m app.ai.knowledge`)
+    KNOWLEDGE_ENABLED: bool = True
+    KNOWLEDGE_PATH: str = "data/knowledge_index"
+    KNOWLEDGE_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    KNOWLEDGE_CHUNK_TOKENS: int = 200
+    KNOWLEDGE_TOP_K: int = 8
+    KNOWLEDGE_CONTEXT_TOKENS: int = 800  # hard cap on retrieved notes per prompt
+    
+    # Itinerary templates (precomputed with `python -m app.ai.templates`)
+    ITINERARY_TEMPLATES_ENABLED: bool = True
+    ITINERARY_TEMPLATES_BACKEND: str = "disk"  # "disk" or "redis"
+    ITINERARY_TEMPLATES_PATH: str = "data/itinerary_templates"
+    ITINERARY_TEMPLATES_REFRESH_SECONDS: float = 60.0  # Redis version pointer re-read
+    ITINERARY_TEMPLATE_DURATIONS: List[int] = [3, 5, 7, 10, 14]
+    ITINERARY_TEMPLATE_CONCURRENCY: int = 4
+    
     # External APIs
     AMADEUS_API_KEY: str = ""
     AMADEUS_API_SECRET: str = ""
     GOOGLE_MAPS_API_KEY: str = ""
     OPENWEATHER_API_KEY: str = ""
+    AMADEUS_BASE_URL: str = "https://test.api.amadeus.com"
+    GOOGLE_MAPS_BASE_URL: str = "https://maps.googleapis.com"
+    OPENWEATHER_BASE_URL: str = "https://api.openweathermap.org"
+    AMADEUS_TIMEOUT: float = 10.0
+    GOOGLE_MAPS_TIMEOUT: float = 5.0
+    GOOGLE_MAPS_GEOCODE_CACHE_ENTRIES: int = 10000
+    GOOGLE_MAPS_GEOCODE_CACHE_TTL_SECONDS: int = 86400
+    OPENWEATHER_TIMEOUT: float = 5.0
+    AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS: int = 60
+    PROVIDER_HTTP2: bool = True
+    PROVIDER_MAX_CONNECTIONS: int = 50
+    PROVIDER_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    PROVIDER_MAX_RETRIES: int = 2
+    PROVIDER_RETRY_BACKOFF_SECONDS: float = 0.2
+    PROVIDER_RETRY_BUDGET_RATIO: float = 0.1  # retries allowed per request made
+    PROVIDER_RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    
+    # Offer Cache (flight/hotel results: fresh, then served stale while refreshing)
+    OFFER_CACHE_ENABLED: bool = True
+    OFFER_CACHE_REDIS_ENABLED: bool = True
+    OFFER_CACHE_MAX_ENTRIES: int = 2048
+    OFFER_CACHE_NEGATIVE_TTL_SECONDS: int = 120
+    FLIGHT_OFFER_FRESH_SECONDS: int = 300
+    FLIGHT_OFFER_STALE_SECONDS: int = 1800
+    HOTEL_OFFER_FRESH_SECONDS: int = 900
+    HOTEL_OFFER_STALE_SECONDS: int = 3600
+    
+    # User cache (profiles and travel preferences: worker LRU, then Redis,
+    # then the database)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_REDIS_ENABLED: bool = True
+    USER_CACHE_TTL_SECONDS: int = 3600
+    USER_CACHE_LOCAL_TTL_SECONDS: float = 30.0  # staleness bound if invalidation missed
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Batch search
+    SEARCH_BATCH_MAX_ITEMS: int = 10
+    SEARCH_BATCH_USER_CONCURRENCY: int = 3  # per user, across all their batches
+    SEARCH_BATCH_ITEM_TIMEOUT_SECONDS: float = 90.0
+    
+    # Destination recommendations (FAISS index built with
+    # `python -m app.ai.destinations`)
+    DESTINATION_INDEX_ENABLED: bool = True
+    DESTINATION_INDEX_PATH: str = "data/destination_index"
+    DESTINATION_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    DESTINATION_INDEX_NPROBE: int = 32  # inverted lists scanned per query
+    DESTINATION_RECOMMENDATION_MAX: int = 50
+    
+    # Background jobs (Celery, with Redis at REDIS_URL as broker and result backend)
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    JOB_DEDUP_TTL_SECONDS: int = 600  # identical submissions reuse the running job
+    JOB_SOFT_TIME_LIMIT_SECONDS: int = 300
+    JOB_EVENTS_TIMEOUT_SECONDS: float = 300.0
+    JOB_QUEUE_DEPTH_INTERVAL_SECONDS: float = 15.0
     
     # Monitoring
     SENTRY_DSN: str = ""
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # share of fast, successful requests logged
+    ACCESS_LOG_SLOW_SECONDS: float = 1.0  # slower requests are always logged
     
     # Rate Limiting
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory, redis
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_LLM_PER_MINUTE: int = 10
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 5
+    RATE_LIMIT_SHARED_IP_FACTOR: int = 10  # users behind one IP: 10x one user's limit
+    RATE_LIMIT_LLM_PATHS: List[str] = [
+        "/api/v1/search/travel",
+        "/api/v1/itinerary/generate",
+        "/api/v1/search/jobs",
+        "/api/v1/itinerary/jobs",
+    ]
+    RATE_LIMIT_AUTH_PATHS: List[str] = [
+        "/api/v1/auth/login",
+        "/api/v1/auth/register",
+    ]
     
     # Email
     SMTP_HOST: str = ""
@@ -0,0 +1,196 @@
+"""
+Background job submission and status for the Celery generation workers.
+
+Job state is read straight from the Redis result backend: Celery stores
+each state change under ``celery-task-meta-<id>`` and publishes it on a
+channel of the same name, which is what event subscribers listen to.
+"""
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.metrics import JOB_QUEUE_DEPTH, JOB_SUBMISSIONS
+from app.core.redis import get_redis
+from app.core.singleflight import request_key
+from app.worker import JOB_QUEUES, celery_app, job_record_key
+
+logger = logging.getLogger(__name__)
+
+# Celery states mapped to the statuses exposed by the API
+_STATUSES = {
+    "PENDING": "queued",
+    "RECEIVED": "queued",
+    "RETRY": "queued",
+    "STARTED": "running",
+    "SUCCESS": "completed",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+FINAL_STATUSES = ("completed", "failed")
+
+
+def _dedup_key(kind: str, key: str) -> str:
+    return f"jobs:dedup:{kind}:{key}"
+
+
+def _meta_key(job_id: str) -> str:
+    return f"celery-task-meta-{job_id}"
+
+
+def _job_state(job_id: str, kind: str, meta: Optional[bytes]) -> Dict[str, Any]:
+    state: Dict[str, Any] = {
+        "job_id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "result": None,
+        "error": None,
+    }
+    if meta is None:
+        return state
+    data = json.loads(meta)
+    state["status"] = _STATUSES.get(data.get("status"), "queued")
+    if state["status"] == "completed":
+        state["result"] = data.get("result")
+    elif state["status"] == "failed":
+        # Exception details stay in the worker logs
+        state["error"] = f"{kind.capitalize()} job failed"
+    return state
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Current state of a job, or None if it is unknown or expired."""
+    redis = get_redis()
+    kind, meta = await asyncio.gather(
+        redis.get(job_record_key(job_id)), redis.get(_meta_key(job_id))
+    )
+    if kind is None:
+        return None
+    return _job_state(job_id, kind.decode(), meta)
+
+
+async def submit_job(kind: str, request: BaseModel) -> Tuple[str, bool]:
+    """
+    Queue a ``kind`` job for ``request``.
+
+    Returns ``(job_id, deduplicated)``: an identical request submitted
+    within ``JOB_DEDUP_TTL_SECONDS`` gets the existing job back, unless
+    that job failed.
+    """
+    redis = get_redis()
+    dedup_key = _dedup_key(kind, request_key(request))
+    job_id = uuid.uuid4().hex
+
+    claimed = await redis.set(
+        dedup_key, job_id, nx=True, ex=settings.JOB_DEDUP_TTL_SECONDS
+    )
+    if not claimed:
+        existing = await redis.get(dedup_key)
+        if existing is not None:
+            job = await get_job(existing.decode())
+            if job is not None and job["status"] != "failed":
+                JOB_SUBMISSIONS.labels(kind=kind, outcome="deduplicated").inc()
+                return job["job_id"], True
+        await redis.set(dedup_key, job_id, ex=settings.JOB_DEDUP_TTL_SECONDS)
+
+    # Covers the time in the queue; the worker trims it to the result TTL
+    # once the job ends, so both expire together
+    await redis.set(
+        job_record_key(job_id),
+        kind,
+        ex=settings.JOB_RESULT_TTL_SECONDS + settings.JOB_SOFT_TIME_LIMIT_SECONDS,
+    )
+    # The broker publish is blocking I/O
+    await asyncio.to_thread(
+        celery_app.send_task,
+        f"jobs.{kind}",
+        args=[request.model_dump(mode="json")],
+        task_id=job_id,
+    )
+    JOB_SUBMISSIONS.labels(kind=kind, outcome="queued").inc()
+    return job_id, False
+
+
+async def job_events(
+    job_id: str,
+    timeout: float = settings.JOB_EVENTS_TIMEOUT_SECONDS,
+    heartbeat: float = 15.0,
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Yield the job's state now and on every change until it finishes.
+
+    ``None`` is yielded every ``heartbeat`` seconds without a change so
+    callers can keep idle connections alive. Stops after ``timeout``.
+    """
+    redis = get_redis()
+    pubsub = redis.pubsub()
+    try:
+        # Subscribe before reading so no transition falls in between
+        await pubsub.subscribe(_meta_key(job_id))
+        job = await get_job(job_id)
+        if job is None:
+            return
+        yield job
+        deadline = time.monotonic() + timeout
+        while job["status"] not in FINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(remaining, heartbeat),
+            )
+            if message is None:
+                yield None
+                continue
+            job = _job_state(job_id, job["kind"], message["data"])
+            yield job
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+
+class QueueDepthMonitor:
+    """Periodically export the length of each job queue as a gauge."""
+
+    def __init__(self, interval: float = settings.JOB_QUEUE_DEPTH_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def refresh(self) -> None:
+        redis = get_redis()
+        depths = await asyncio.gather(*(redis.llen(queue) for queue in JOB_QUEUES))
+        for queue, depth in zip(JOB_QUEUES, depths):
+            JOB_QUEUE_DEPTH.labels(queue=queue).set(depth)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Job queue depth refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+queue_monitor = QueueDepthMonitor()
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics shared by the API, the AI agents and the caches.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (it must be set before the process
+starts and point to an empty directory), every uvicorn worker writes its
+samples there and ``/metrics`` aggregates all workers.
+"""
+from typing import Any
+import os
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+)
+
+# Request latencies span fast CRUD calls to multi-second LLM generations
+_HTTP_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "vacanceia_http_request_duration_seconds",
+    "HTTP request latency by method, route template and status",
+    ["method", "route", "status"],
+    buckets=_HTTP_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "vacanceia_http_requests_in_progress",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+# LLM calls
+LLM_REQUEST_DURATION = Histogram(
+    "vacanceia_llm_request_duration_seconds",
+    "LLM call latency by agent and model",
+    ["agent", "model"],
+    buckets=_LLM_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "vacanceia_llm_time_to_first_token_seconds",
+    "Time to the first streamed LLM chunk by agent and model",
+    ["agent", "model"],
+    buckets=_LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "vacanceia_llm_tokens_total",
+    "LLM tokens by agent, model and kind (prompt or completion)",
+    ["agent", "model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "vacanceia_llm_errors_total",
+    "Failed LLM calls by agent, model and exception type",
+    ["agent", "model", "error"],
+)
+LLM_HEDGES = Counter(
+    "vacanceia_llm_hedged_requests_total",
+    "Backup LLM requests fired because the primary was slow to start",
+    ["agent", "model", "outcome"],
+)
+LLM_FAILOVERS = Counter(
+    "vacanceia_llm_failovers_total",
+    "LLM calls that failed over to the next model, by failed model",
+    ["agent", "model"],
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "vacanceia_llm_prompt_tokens",
+    "Prompt size counted before sending, by agent",
+    ["agent"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+PROMPT_TOKENS_SAVED = Counter(
+    "vacanceia_prompt_tokens_saved_total",
+    "Prompt tokens removed by template compilation, by agent and template",
+    ["agent", "template"],
+)
+LLM_CONTINUATIONS = Counter(
+    "vacanceia_llm_continuations_total",
+    "Continuation calls made after an answer was cut off at max_tokens",
+    ["agent"],
+)
+LLM_WASTED_TOKENS = Counter(
+    "vacanceia_llm_wasted_tokens_total",
+    "Output tokens of cut-off answers discarded before continuing",
+    ["agent"],
+)
+ITINERARY_TEMPLATE_REQUESTS = Counter(
+    "vacanceia_itinerary_template_requests_total",
+    "Itinerary requests by template outcome (served, adapted or miss)",
+    ["outcome"],
+)
+KNOWLEDGE_RETRIEVAL_DURATION = Histogram(
+    "vacanceia_knowledge_retrieval_duration_seconds",
+    "Knowledge base retrieval latency (query embedding, search and packing)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+KNOWLEDGE_CONTEXT_TOKENS = Histogram(
+    "vacanceia_knowledge_context_tokens",
+    "Tokens of retrieved notes added to a prompt, by agent",
+    ["agent"],
+    buckets=(0, 100, 200, 400, 600, 800, 1200, 1600),
+)
+
+# External travel APIs
+PROVIDER_REQUEST_DURATION = Histogram(
+    "vacanceia_provider_request_duration_seconds",
+    "External API call latency by provider and outcome",
+    ["provider", "outcome"],
+    buckets=_HTTP_BUCKETS,
+)
+PROVIDER_RETRIES = Counter(
+    "vacanceia_provider_retries_total",
+    "External API retries by provider and outcome (retried or budget_exhausted)",
+    ["provider", "outcome"],
+)
+OFFER_CACHE_REQUESTS = Counter(
+    "vacanceia_offer_cache_requests_total",
+    "Offer cache lookups by offer type and outcome (hit, stale, negative, miss)",
+    ["offer", "outcome"],
+)
+OFFER_CACHE_REFRESHES = Counter(
+    "vacanceia_offer_cache_refreshes_total",
+    "Background offer refreshes by offer type and outcome",
+    ["offer", "outcome"],
+)
+USER_CACHE_REQUESTS = Counter(
+    "vacanceia_user_cache_requests_total",
+    "User cache lookups by cache and tier that answered (local, redis, miss)",
+    ["cache", "outcome"],
+)
+
+# Background jobs
+JOB_SUBMISSIONS = Counter(
+    "vacanceia_job_submissions_total",
+    "Background job submissions by kind and outcome (queued or deduplicated)",
+    ["kind", "outcome"],
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "vacanceia_job_queue_depth",
+    "Jobs waiting in the Celery queue, by queue",
+    ["queue"],
+    multiprocess_mode="mostrecent",
+)
+
+# Hit ratio: sum(rate(...{outcome="hit"}[5m])) / sum(rate(...[5m]))
+LLM_CACHE_REQUESTS = Counter(
+    "vacanceia_llm_cache_requests_total",
+    "LLM response cache lookups by agent, tier and outcome",
+    ["agent", "tier", "outcome"],
+)
+LLM_PARSE_OUTCOMES = Counter(
+    "vacanceia_llm_parse_total",
+    "Structured LLM output parsing by schema and outcome",
+    ["schema", "outcome"],
+)
+
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def make_metrics_app() -> Any:
+    """ASGI app serving /metrics, aggregated across workers if enabled."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return make_asgi_app(registry=registry)
+    return make_asgi_app()
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the shared multiprocess files."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,133 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+import random
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+from app.core.security import SECURITY_HEADERS
+
+logger = logging.getLogger("app.access")
+
+ASGIApp = Callable[..., Awaitable[None]]
+
+# Longest client-supplied request ID we are willing to echo back
+_MAX_REQUEST_ID_LENGTH = 128
+
+
+def _incoming_request_id(scope: Dict) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            if 0 < len(value) <= _MAX_REQUEST_ID_LENGTH and value.isascii():
+                return value.decode("ascii")
+            return None
+    return None
+
+
+def _route_templates(app: Any) -> Dict[Any, str]:
+    """Map each endpoint (or mounted app) to its path template."""
+    templates: Dict[Any, str] = {}
+    for route in getattr(app, "routes", ()):
+        endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+        path = getattr(route, "path", None)
+        if endpoint is not None and path is not None:
+            templates.setdefault(endpoint, path or "/")
+    return templates
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI request middleware: request ID, timing, metrics, security
+    headers and access logging.
+
+    Only ``http.response.start`` is rewritten; body messages are forwarded
+    untouched, so streaming responses flow through chunk by chunk.
+    ``X-Process-Time`` is the time to the response headers, while the
+    access log records the full duration once the last body chunk is sent.
+
+    The request ID (the caller's ``X-Request-ID`` or a fresh UUID) is
+    stored in ``request.state.request_id`` for handlers and error pages.
+    Latency is recorded per route template (``/users/{user_id}``), never
+    per raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_seconds: float = settings.ACCESS_LOG_SLOW_SECONDS,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self._templates: Dict[Any, str] = {}
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        status_code = 500
+
+        async def send_wrapper(message: Dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - start
+                message["headers"] = [
+                    *message.get("headers", []),
+                    *SECURITY_HEADERS,
+                    (b"x-request-id", request_id.encode("ascii")),
+                    (b"x-process-time", f"{elapsed:.6f}".encode("ascii")),
+                ]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            elapsed = time.perf_counter() - start
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], self._route(scope), str(status_code)
+            ).observe(elapsed)
+            self._log(scope, status_code, elapsed, request_id)
+
+    def _route(self, scope: Dict) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            # Routes are final after startup, so this runs once per endpoint
+            self._templates = _route_templates(scope.get("app"))
+            template = self._templates.setdefault(endpoint, "unmatched")
+        return template
+
+    def _log(
+        self,
+        scope: Dict,
+        status_code: int,
+        elapsed: float,
+        request_id: str,
+    ) -> None:
+        # Errors and slow requests are always logged; the rest are sampled
+        # before any formatting happens
+        if (
+            status_code < 500
+            and elapsed < self.slow_seconds
+            and (self.sample_rate <= 0 or random.random() >= self.sample_rate)
+        ):
+            return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(
+            f"Request: {scope['method']} {scope['path']} "
+            f"completed in {elapsed:.3f}s "
+            f"with status {status_code} [{request_id}]"
+        )
@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    # Built once per worker process; hashes below `rounds` need an update
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(
+    password: str,
+    hashed_password: str,
+    rounds: int,
+) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Async bcrypt hashing backed by a bounded process pool.
+
+    bcrypt is deliberately slow (~250 ms at 12 rounds); running it in a
+    separate process keeps the event loop (and every in-flight LLM stream
+    on this worker) responsive. When more than ``max_pending`` operations
+    are queued, new ones are rejected immediately with 503 instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING,
+        rounds: int = settings.BCRYPT_ROUNDS,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Operations queued or running in the pool."""
+        return self._pending
+
+    def start(self) -> None:
+        """Spawn the worker processes (done on first use)."""
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and
+            # connection pools is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Start every worker, not only the one taking the first call
+            for _ in range(self.max_workers):
+                self._executor.submit(_context, self.rounds)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            logger.warning("Password hashing queue full; rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.start()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password."""
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash."""
+        valid, _ = await self.verify_and_update(password, hashed_password)
+        return valid
+
+    async def verify_and_update(
+        self,
+        password: str,
+        hashed_password: str,
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and rehash it if the stored hash is outdated.
+
+        Returns:
+            (valid, new_hash) where new_hash is set only when the password
+            is valid and the stored hash uses deprecated settings (e.g.
+            fewer rounds than BCRYPT_ROUNDS); callers should persist it.
+        """
+        return await self._run(
+            _verify_and_update, password, hashed_password, self.rounds
+        )
+
+
+password_hasher = PasswordHasher()
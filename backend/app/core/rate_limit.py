@@ -0,0 +1,357 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import math
+import time
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+# Token buckets: refill continuously, spend ``cost`` tokens per request (one
+# unless an endpoint charges more) from every bucket in KEYS, or from none
+# if one of them is short. ARGV: cost, then capacity and rate per key. Uses
+# the Redis clock so every worker agrees on time.
+_TOKEN_BUCKET_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tokens = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call("HMGET", key, "tokens", "ts")
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens[i] = math.min(capacity, level + math.max(0, now - ts) * rate)
+    if tokens[i] < cost then
+        allowed = 0
+    end
+end
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - cost
+    end
+    redis.call("HSET", key, "tokens", tostring(tokens[i]), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil((capacity - tokens[i]) / rate) + 1000)
+    result[i + 1] = tostring(tokens[i])
+end
+return result
+"""
+
+# (bucket key, rule limiting it)
+Bucket = Tuple[str, "RateLimitRule"]
+
+
+class RateLimitRule:
+    """A named bucket configuration applied to a set of path prefixes."""
+
+    __slots__ = ("name", "limit", "period", "prefixes")
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        period: float = 60.0,
+        prefixes: Sequence[str] = (),
+    ):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.prefixes = tuple(prefixes)
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.limit / self.period
+
+
+class RateLimitResult:
+    __slots__ = ("allowed", "limit", "remaining", "reset_at", "retry_after")
+
+    def __init__(
+        self, rule: RateLimitRule, allowed: bool, tokens: float, cost: float = 1
+    ):
+        now = time.time()
+        self.allowed = allowed
+        self.limit = rule.limit
+        self.remaining = max(int(tokens), 0)
+        self.reset_at = int(math.ceil(now + (rule.limit - tokens) / rule.rate))
+        self.retry_after = 0 if allowed else int(
+            math.ceil((cost - tokens) / rule.rate)
+        )
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (b"x-ratelimit-limit", str(self.limit).encode()),
+            (b"x-ratelimit-remaining", str(self.remaining).encode()),
+            (b"x-ratelimit-reset", str(self.reset_at).encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(self.retry_after).encode()))
+        return headers
+
+
+class MemoryRateLimiter:
+    """Per-worker token buckets, bounded to ``max_keys`` (LRU)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def hit(
+        self, buckets: Sequence[Bucket], cost: int = 1
+    ) -> List[RateLimitResult]:
+        return self.hit_sync(buckets, cost)
+
+    def hit_sync(
+        self, buckets: Sequence[Bucket], cost: int = 1
+    ) -> List[RateLimitResult]:
+        """Spend ``cost`` from every bucket, or from none if one is short."""
+        now = time.monotonic()
+        levels = [self._refill(key, rule, now) for key, rule in buckets]
+        allowed = all(level[0] >= cost for level in levels)
+        if allowed:
+            for level in levels:
+                level[0] -= cost
+        return [
+            RateLimitResult(rule, allowed, level[0], cost)
+            for (_, rule), level in zip(buckets, levels)
+        ]
+
+    def _refill(self, key: str, rule: RateLimitRule, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(rule.limit), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(rule.limit, bucket[0] + (now - bucket[1]) * rule.rate)
+            bucket[1] = now
+        return bucket
+
+
+class RedisRateLimiter:
+    """Token buckets shared by all workers, one atomic Lua call per check.
+
+    Falls back to a per-worker bucket while Redis is unreachable.
+    """
+
+    def __init__(self, prefix: str = "ratelimit"):
+        self.prefix = prefix
+        self.fallback = MemoryRateLimiter()
+        self._script = None
+
+    async def hit(
+        self, buckets: Sequence[Bucket], cost: int = 1
+    ) -> List[RateLimitResult]:
+        """Spend ``cost`` from every bucket, or from none if one is short."""
+        args: List[float] = [cost]
+        for _, rule in buckets:
+            args += [rule.limit, rule.rate / 1000.0]
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(_TOKEN_BUCKET_SCRIPT)
+            allowed, *tokens = await self._script(
+                keys=[f"{self.prefix}:{key}" for key, _ in buckets], args=args
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable: {str(e)}")
+            return self.fallback.hit_sync(buckets, cost)
+        return [
+            RateLimitResult(rule, bool(allowed), float(level), cost)
+            for (_, rule), level in zip(buckets, tokens)
+        ]
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Rules from settings, most specific first; the last one is the default."""
+    return [
+        RateLimitRule(
+            "llm",
+            settings.RATE_LIMIT_LLM_PER_MINUTE,
+            prefixes=settings.RATE_LIMIT_LLM_PATHS,
+        ),
+        RateLimitRule(
+            "auth",
+            settings.RATE_LIMIT_AUTH_PER_MINUTE,
+            prefixes=settings.RATE_LIMIT_AUTH_PATHS,
+        ),
+        RateLimitRule("default", settings.RATE_LIMIT_PER_MINUTE),
+    ]
+
+
+ASGIApp = Callable[..., Awaitable[None]]
+
+_TOO_MANY_REQUESTS = json.dumps(
+    {"detail": "Rate limit exceeded. Please try again later."}
+).encode()
+
+
+def _bearer_subject(scope: Dict) -> Optional[str]:
+    """JWT ``sub`` of a valid bearer token, if the request carries one."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    return decode_token(token).get("sub") or None
+                except HTTPException:
+                    return None
+            return None
+    return None
+
+
+def _client_ip(scope: Dict) -> str:
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def client_identity(scope: Dict) -> str:
+    """
+    ``user:<sub>`` for requests with a valid bearer token, otherwise
+    ``ip:<client address>``.
+    """
+    subject = _bearer_subject(scope)
+    return f"user:{subject}" if subject else _client_ip(scope)
+
+
+def client_buckets(
+    scope: Dict,
+    rule: RateLimitRule,
+    shared_ip_factor: int = settings.RATE_LIMIT_SHARED_IP_FACTOR,
+) -> List[Bucket]:
+    """
+    Buckets a request is charged to under ``rule``.
+
+    With a valid bearer token: the user's, and one shared by every user
+    behind the client IP (a NAT or proxy) with ``shared_ip_factor`` times
+    the limit, so minting tokens for new subjects still hits a ceiling.
+    Otherwise only the client IP's.
+    """
+    subject = _bearer_subject(scope)
+    if not subject:
+        return [(f"{rule.name}:{_client_ip(scope)}", rule)]
+    shared = RateLimitRule(rule.name, rule.limit * shared_ip_factor, rule.period)
+    return [
+        (f"{rule.name}:user:{subject}", rule),
+        (f"{rule.name}:users-{_client_ip(scope)}", shared),
+    ]
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI rate limiter.
+
+    Requests are bucketed per rule, so LLM-backed routes get their own
+    stricter budget, and per client IP, or per user (JWT ``sub``) and the
+    users sharing an IP when a valid bearer token is present (see
+    ``client_buckets``). A request is charged only if it fits every one of
+    its buckets. Every response carries the documented X-RateLimit-*
+    headers of its tightest bucket; exhausted buckets get a 429.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: Optional[object] = None,
+        rules: Optional[List[RateLimitRule]] = None,
+        exempt_paths: Sequence[str] = ("/health", "/metrics"),
+        shared_ip_factor: int = settings.RATE_LIMIT_SHARED_IP_FACTOR,
+    ):
+        self.app = app
+        if backend is None:
+            backend = (
+                RedisRateLimiter()
+                if settings.RATE_LIMIT_BACKEND == "redis"
+                else MemoryRateLimiter()
+            )
+        self.backend = backend
+        self.rules = rules or default_rules()
+        self.exempt_paths = tuple(exempt_paths)
+        self.shared_ip_factor = shared_ip_factor
+
+    def _rule(self, path: str) -> RateLimitRule:
+        for rule in self.rules:
+            if not rule.prefixes or path.startswith(rule.prefixes):
+                return rule
+        return self.rules[-1]
+
+    async def _hit(
+        self, scope: Dict, rule: RateLimitRule, cost: int = 1
+    ) -> RateLimitResult:
+        """
+        Charge the request's buckets, all or none; return the result to
+        report: the bucket that refused it, or else the tightest one.
+        """
+        buckets = client_buckets(scope, rule, self.shared_ip_factor)
+        results = await self.backend.hit(buckets, cost)  # type: ignore[attr-defined]
+        if not results[0].allowed:
+            return max(results, key=lambda result: result.retry_after)
+        return min(results, key=lambda result: result.remaining)
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._rule(scope["path"])
+        result = await self._hit(scope, rule)
+        headers = result.headers()
+
+        if not result.allowed:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_TOO_MANY_REQUESTS)).encode()),
+                    *headers,
+                ],
+            })
+            await send({"type": "http.response.body", "body": _TOO_MANY_REQUESTS})
+            return
+
+        async def charge(cost: int) -> RateLimitResult:
+            # The response reports the buckets after the extra charge
+            extra = await self._hit(scope, rule, cost)
+            headers[:] = extra.headers()
+            return extra
+
+        # Endpoints doing the work of several requests charge the rest
+        scope.setdefault("state", {})["rate_limit"] = charge
+
+        async def send_with_headers(message: Dict) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+async def charge_rate_limit(request: Request, cost: int) -> None:
+    """
+    Spend ``cost`` more tokens from the buckets that admitted ``request``,
+    for endpoints that do the work of several requests. Raises a 429 when
+    the buckets cannot cover it; does nothing if rate limiting is disabled.
+    """
+    charge = request.scope.get("state", {}).get("rate_limit")
+    if charge is None or cost <= 0:
+        return
+    result = await charge(cost)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please try again later.",
+        )
@@ -0,0 +1,30 @@
+from typing import Optional
+import logging
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the process-wide async Redis client (created lazily)."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis connection pool."""
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
@@ -1,15 +1,24 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Response
+import hashlib
 import pyotp
 import secrets
+import time
 
 from app.core.config import settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Synchronous helpers; async code should use app.core.passwords instead
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
@@ -33,7 +42,7 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "access"})
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -47,7 +56,7 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     expire = datetime.utcnow() + timedelta(
         days=settings.REFRESH_TOKEN_EXPIRE_DAYS
     )
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "refresh"})
     
     encoded_jwt = jwt.encode(
         to_encode,
@@ -56,21 +65,163 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     )
     return encoded_jwt
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified JWT payloads, keyed by token digest.
+    
+    Entries expire at the token's own ``exp`` claim and are evicted by
+    ``revoke_token``/``revoke_subject``, so a cache hit is never more
+    permissive than re-verifying the signature. Tokens of revoked subjects
+    are checked before they are cached (see ``RevokedSubjects``).
+    """
+    
+    def __init__(self, max_entries: int = settings.JWT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._by_subject: Dict[str, Set[bytes]] = {}
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return dict(payload)
+    
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        key = self._digest(token)
+        self._entries[key] = (float(exp), dict(payload))
+        self._entries.move_to_end(key)
+        subject = payload.get("sub")
+        if subject is not None:
+            self._by_subject.setdefault(str(subject), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+    
+    def revoke_token(self, token: str) -> None:
+        self._evict(self._digest(token))
+    
+    def revoke_subject(self, subject: str) -> None:
+        for key in self._by_subject.pop(str(subject), set()):
+            self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_subject.clear()
+    
+    def _evict(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        subject = entry[1].get("sub")
+        keys = self._by_subject.get(str(subject))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[str(subject)]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+verified_tokens = VerifiedTokenCache()
+
+# Every token expires within this long of being issued
+TOKEN_MAX_LIFETIME_SECONDS = max(
+    settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+)
+
+class RevokedSubjects:
+    """
+    Subjects whose tokens issued up to a revocation time are rejected.
+    
+    This worker's copy of the shared revocation list (kept in sync by
+    ``app.services.token_revocation``). Entries are dropped once every
+    token they cover has expired.
+    """
+    
+    def __init__(self):
+        self._revoked_at: Dict[str, float] = {}
+    
+    def add(self, subject: str, revoked_at: float) -> None:
+        previous = self._revoked_at.get(subject, 0.0)
+        self._revoked_at[subject] = max(previous, revoked_at)
+        self._prune()
+    
+    def replace(self, revoked: Dict[str, float]) -> None:
+        self._revoked_at = dict(revoked)
+        self._prune()
+    
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        revoked_at = self._revoked_at.get(str(payload.get("sub")))
+        if revoked_at is None:
+            return False
+        issued_at = payload.get("iat")
+        return not isinstance(issued_at, (int, float)) or issued_at <= revoked_at
+    
+    def _prune(self) -> None:
+        oldest = time.time() - TOKEN_MAX_LIFETIME_SECONDS
+        for subject in [s for s, at in self._revoked_at.items() if at < oldest]:
+            del self._revoked_at[subject]
+    
+    def __len__(self) -> int:
+        return len(self._revoked_at)
+
+revoked_subjects = RevokedSubjects()
+
+def revoke_token(token: str) -> None:
+    """Drop a token from the verified-token cache."""
+    verified_tokens.revoke_token(token)
+
+def revoke_user_tokens(subject: str, revoked_at: Optional[float] = None) -> None:
+    """
+    Reject every token issued to a subject so far, in this worker only.
+    
+    Use ``app.services.token_revocation.revoke_user_tokens`` to revoke
+    them in every worker.
+    """
+    if revoked_at is None:
+        revoked_at = time.time()
+    revoked_subjects.add(str(subject), revoked_at)
+    verified_tokens.revoke_subject(subject)
+
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def decode_token(token: str) -> Dict[str, Any]:
     """Decode and validate JWT token."""
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
+    if revoked_subjects.is_revoked(payload):
+        raise _credentials_error()
+    verified_tokens.put(token, payload)
+    return payload
 
 def generate_totp_secret() -> str:
     """Generate a TOTP secret for MFA."""
@@ -85,21 +236,30 @@ def generate_api_key() -> str:
     """Generate a secure API key."""
     return secrets.token_urlsafe(32)
 
+# Built once at import; the request middleware appends these raw pairs
+SECURITY_HEADERS: Tuple[Tuple[bytes, bytes], ...] = tuple(
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in (
+        ("X-Content-Type-Options", "nosniff"),
+        ("X-Frame-Options", "DENY"),
+        ("X-XSS-Protection", "1; mode=block"),
+        ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+        (
+            "Content-Security-Policy",
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self' data:; "
+            "connect-src 'self' https://api.vacanceia.io;",
+        ),
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
+        ("Permissions-Policy", "geolocation=(), microphone=(), camera=()"),
+    )
+)
+
+
 def setup_security_headers(response: Response) -> Response:
     """Add security headers to response."""
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data: https:; "
-        "font-src 'self' data:; "
-        "connect-src 'self' https://api.vacanceia.io;"
-    )
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    
+    response.raw_headers.extend(SECURITY_HEADERS)
     return response
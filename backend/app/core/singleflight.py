@@ -0,0 +1,198 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import time
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def request_key(request: BaseModel) -> str:
+    """Canonical digest of a request model, independent of field order."""
+    payload = json.dumps(
+        request.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one execution.
+
+    Within a worker, callers sharing a key await the same task. The task is
+    detached from any single caller: it keeps running if the caller that
+    started it disconnects, and is cancelled only once every waiter is gone.
+
+    With ``use_redis``, the first worker to take a Redis lock runs the call
+    and publishes the (JSON-serializable) result on a channel; other workers
+    wait for it and fall back to running the call themselves on timeout or
+    if the leader fails.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        use_redis: bool = settings.SINGLE_FLIGHT_REDIS_ENABLED,
+        lock_ttl: int = settings.SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+        wait_timeout: float = settings.SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS,
+    ):
+        self.namespace = namespace
+        self.use_redis = use_redis
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self._calls: Dict[str, _Call] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` once for all concurrent callers sharing ``key``."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(self._run(key, fn)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller has gone away; stop the orphaned work. Forget
+                # it now so a caller arriving before it unwinds starts afresh
+                self._forget_key(key, call)
+                call.task.cancel()
+
+    def _forget_key(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _forget(self, key: str, call: _Call) -> None:
+        self._forget_key(key, call)
+        if not call.task.cancelled():
+            # Mark the exception as retrieved when no waiter is left
+            call.task.exception()
+
+    def inflight(self) -> int:
+        """Number of distinct calls currently executing in this worker."""
+        return len(self._calls)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.use_redis:
+            return await fn()
+
+        lock_key = f"singleflight:{self.namespace}:{key}:lock"
+        channel = f"singleflight:{self.namespace}:{key}:done"
+        result_key = f"singleflight:{self.namespace}:{key}:result"
+        token = secrets.token_hex(8)
+
+        try:
+            leader = await get_redis().set(
+                lock_key, token, nx=True, ex=self.lock_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Single-flight Redis lock failed: {str(e)}")
+            return await fn()
+
+        if not leader:
+            result = await self._await_leader(lock_key, channel, result_key)
+            if result is not _MISSING:
+                return result
+            return await fn()
+
+        ok = False
+        result: Any = None
+        try:
+            result = await fn()
+            ok = True
+            return result
+        finally:
+            await self._publish(lock_key, channel, result_key, token, ok, result)
+
+    async def _publish(
+        self,
+        lock_key: str,
+        channel: str,
+        result_key: str,
+        token: str,
+        ok: bool,
+        result: Any,
+    ) -> None:
+        try:
+            message = json.dumps({"ok": ok, "result": result if ok else None})
+        except (TypeError, ValueError):
+            message = json.dumps({"ok": False, "result": None})
+            logger.warning("Single-flight result is not JSON serializable")
+        try:
+            redis = get_redis()
+            if ok:
+                # Short-lived copy for followers that subscribe late
+                await redis.set(result_key, message, ex=5)
+            await redis.publish(channel, message)
+            await redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"Single-flight Redis publish failed: {str(e)}")
+
+    async def _await_leader(
+        self,
+        lock_key: str,
+        channel: str,
+        result_key: str,
+    ) -> Any:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            raw: Optional[bytes] = await redis.get(result_key)
+            deadline = time.monotonic() + self.wait_timeout
+            while raw is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return _MISSING
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=min(remaining, 1.0),
+                )
+                if message is not None:
+                    raw = message["data"]
+                elif not await redis.exists(lock_key):
+                    # Leader went away without publishing
+                    raw = await redis.get(result_key)
+                    if raw is None:
+                        return _MISSING
+            payload = json.loads(raw)
+            return payload["result"] if payload.get("ok") else _MISSING
+        except Exception as e:
+            logger.warning(f"Single-flight wait failed: {str(e)}")
+            return _MISSING
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.aclose()
+            except Exception:
+                pass
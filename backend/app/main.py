@@ -2,14 +2,24 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
-from prometheus_client import make_asgi_app
 import sentry_sdk
-import time
 import logging
 
 from app.core.config import settings
-from app.core.security import setup_security_headers
+from app.core.metrics import make_metrics_app, mark_worker_dead
+from app.core.middleware import RequestContextMiddleware
+from app.core.rate_limit import RateLimitMiddleware
 from app.api.v1.router import api_router
+from app.api.deps import agent_specs
+from app.ai.destinations import destination_index
+from app.ai.knowledge import knowledge_base
+from app.ai.registry import agent_registry
+from app.ai.templates import template_store
+from app.core.jobs import queue_monitor
+from app.core.redis import close_redis
+from app.core.passwords import password_hasher
+from app.services.clients import provider_clients
+from app.services.user_cache import invalidation_listener
 
 # Configure logging
 logging.basicConfig(
@@ -35,6 +45,10 @@ app = FastAPI(
     redoc_url="/api/redoc" if settings.ENVIRONMENT != "production" else None,
 )
 
+# Rate limiting (innermost, so rejected requests still get CORS headers)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Security Middleware
 app.add_middleware(
     TrustedHostMiddleware,
@@ -51,31 +65,9 @@ app.add_middleware(
     expose_headers=["X-Request-ID"],
 )
 
-# Custom middleware for request timing and logging
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    
-    # Add request ID for tracing
-    request_id = request.headers.get("X-Request-ID", str(time.time()))
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    response.headers["X-Request-ID"] = request_id
-    
-    # Add security headers
-    response = setup_security_headers(response)
-    
-    # Log request
-    logger.info(
-        f"Request: {request.method} {request.url.path} "
-        f"completed in {process_time:.3f}s "
-        f"with status {response.status_code}"
-    )
-    
-    return response
+# Request ID, timing, security headers and access log (outermost, so every
+# response gets them, including CORS preflights and 429s)
+app.add_middleware(RequestContextMiddleware)
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
@@ -87,8 +79,8 @@ async def health_check():
         "version": settings.VERSION,
     }
 
-# Prometheus metrics endpoint
-metrics_app = make_asgi_app()
+# Prometheus metrics endpoint (aggregates all workers in multiprocess mode)
+metrics_app = make_metrics_app()
 app.mount("/metrics", metrics_app)
 
 # API Routes
@@ -102,7 +94,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "detail": "An unexpected error occurred. Please try again later.",
-            "request_id": request.headers.get("X-Request-ID"),
+            "request_id": getattr(request.state, "request_id", None),
         },
     )
 
@@ -111,12 +103,29 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def startup_event():
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
+    # Build shared AI agents once per worker
+    agent_registry.startup(agent_specs())
+    queue_monitor.start()
+    invalidation_listener.start()
+    if settings.DESTINATION_INDEX_ENABLED:
+        destination_index.load()
+    if settings.KNOWLEDGE_ENABLED:
+        knowledge_base.load()
+    if settings.ITINERARY_TEMPLATES_ENABLED:
+        template_store.load()
     # Initialize database connections, cache, etc.
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
+    await queue_monitor.stop()
+    await invalidation_listener.stop()
+    await agent_registry.close()
+    await provider_clients.aclose()
+    await close_redis()
+    password_hasher.shutdown()
+    mark_worker_dead()
     # Close database connections, cache, etc.
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import re
+import time
+
+from app.ai.schemas import FlightOption, HotelOption
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.http import ProviderClient, ProviderError
+from app.services.schemas import FlightDateFare
+
+logger = logging.getLogger(__name__)
+
+_DURATION_RE = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+# Hotel ids sent to the offers endpoint per search
+_MAX_HOTELS = 20
+
+
+def _format_duration(iso: str) -> str:
+    """``PT13H5M`` -> ``13h05``."""
+    match = _DURATION_RE.fullmatch(iso or "")
+    if not match:
+        return iso
+    hours, minutes = (int(part or 0) for part in match.groups())
+    return f"{hours}h{minutes:02d}" if minutes else f"{hours}h"
+
+
+class AmadeusClient(ProviderClient):
+    """
+    Amadeus Self-Service API client (flights, hotels, city codes).
+
+    The OAuth2 client-credentials token is cached and refreshed
+    ``AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS`` before it expires. Concurrent
+    callers share a single refresh.
+    """
+
+    provider = "amadeus"
+
+    def __init__(
+        self,
+        api_key: str = settings.AMADEUS_API_KEY,
+        api_secret: str = settings.AMADEUS_API_SECRET,
+        base_url: str = settings.AMADEUS_BASE_URL,
+        timeout: float = settings.AMADEUS_TIMEOUT,
+        refresh_margin: int = settings.AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS,
+        **kwargs: Any,
+    ):
+        super().__init__(base_url, timeout, **kwargs)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._refresh_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self._city_codes: Dict[str, str] = {}
+        self._city_lookups = SingleFlight("amadeus:city", use_redis=False)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.api_secret)
+
+    async def _access_token(self) -> str:
+        if self._token is not None and time.monotonic() < self._refresh_at:
+            return self._token
+        async with self._token_lock:
+            # Another caller may have refreshed while we waited
+            if self._token is None or time.monotonic() >= self._refresh_at:
+                payload = await super().request(
+                    "POST",
+                    "/v1/security/oauth2/token",
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": self.api_key,
+                        "client_secret": self.api_secret,
+                    },
+                )
+                self._token = payload["access_token"]
+                lifetime = int(payload.get("expires_in", 1799))
+                self._refresh_at = time.monotonic() + max(
+                    lifetime - self.refresh_margin, 0
+                )
+        return self._token  # type: ignore[return-value]
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Authenticated request; a rejected token is refreshed once."""
+        extra_headers = kwargs.pop("headers", {})
+        for attempt in range(2):
+            token = await self._access_token()
+            headers = {"Authorization": f"Bearer {token}", **extra_headers}
+            try:
+                return await super().request(method, url, headers=headers, **kwargs)
+            except ProviderError as e:
+                if e.status_code != 401 or attempt:
+                    raise
+                logger.info("Amadeus token rejected; refreshing")
+                self._token = None
+
+    async def city_code(self, city: str) -> Optional[str]:
+        """IATA city code for a free-text destination like "Tokyo, Japan"."""
+        keyword = city.split(",")[0].strip()
+        if len(keyword) == 3 and keyword.isalpha() and keyword.isupper():
+            return keyword
+        cached = self._city_codes.get(keyword.lower())
+        if cached is not None:
+            return cached
+        # Searches sharing an origin or destination share one lookup
+        return await self._city_lookups.do(
+            keyword.lower(), lambda: self._lookup_city_code(keyword)
+        )
+
+    async def _lookup_city_code(self, keyword: str) -> Optional[str]:
+        payload = await self.get(
+            "/v1/reference-data/locations",
+            params={"subType": "CITY", "keyword": keyword, "page[limit]": 1},
+        )
+        data = payload.get("data") or []
+        if not data:
+            return None
+        code = data[0]["iataCode"]
+        self._city_codes[keyword.lower()] = code
+        return code
+
+    async def search_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        adults: int,
+        max_results: int = 5,
+    ) -> List[FlightOption]:
+        """Cheapest flight offers; ``price`` is per traveler in USD."""
+        origin_code, destination_code = await asyncio.gather(
+            self.city_code(origin), self.city_code(destination)
+        )
+        if not origin_code or not destination_code:
+            return []
+        params: Dict[str, Any] = {
+            "originLocationCode": origin_code,
+            "destinationLocationCode": destination_code,
+            "departureDate": departure_date.isoformat(),
+            "adults": adults,
+            "currencyCode": "USD",
+            "max": max_results,
+        }
+        if return_date is not None:
+            params["returnDate"] = return_date.isoformat()
+        payload = await self.get("/v2/shopping/flight-offers", params=params)
+
+        flights = []
+        for offer in payload.get("data", []):
+            outbound = offer["itineraries"][0]
+            segments = outbound["segments"]
+            airline = (offer.get("validatingAirlineCodes") or [None])[0]
+            flights.append(FlightOption(
+                airline=airline or segments[0]["carrierCode"],
+                departure_time=segments[0]["departure"]["at"],
+                arrival_time=segments[-1]["arrival"]["at"],
+                duration=_format_duration(outbound.get("duration", "")),
+                price=round(float(offer["price"]["grandTotal"]) / adults, 2),
+                stops=len(segments) - 1,
+            ))
+        return flights
+
+    async def search_flight_dates(
+        self,
+        origin: str,
+        destination: str,
+        earliest_departure: date,
+        latest_departure: date,
+        min_nights: int,
+        max_nights: int,
+    ) -> List[FlightDateFare]:
+        """
+        Cheapest round-trip fare per (departure, return) date pair over a
+        departure window and range of stay lengths, in one call.
+        """
+        origin_code, destination_code = await asyncio.gather(
+            self.city_code(origin), self.city_code(destination)
+        )
+        if not origin_code or not destination_code:
+            return []
+        payload = await self.get(
+            "/v1/shopping/flight-dates",
+            params={
+                "origin": origin_code,
+                "destination": destination_code,
+                "departureDate": (
+                    f"{earliest_departure.isoformat()},{latest_departure.isoformat()}"
+                ),
+                "duration": f"{max(min_nights, 1)},{max_nights}",
+                "oneWay": "false",
+            },
+        )
+        return [
+            FlightDateFare(
+                departure_date=entry["departureDate"],
+                return_date=entry["returnDate"],
+                price=float(entry["price"]["total"]),
+            )
+            for entry in payload.get("data", [])
+            if entry.get("returnDate")
+        ]
+
+    async def search_hotels(
+        self,
+        destination: str,
+        check_in: date,
+        check_out: date,
+        adults: int,
+        max_results: int = 5,
+    ) -> List[HotelOption]:
+        """Available hotel offers, cheapest first, priced per night in USD."""
+        code = await self.city_code(destination)
+        if not code:
+            return []
+        listing = await self.get(
+            "/v1/reference-data/locations/hotels/by-city",
+            params={"cityCode": code},
+        )
+        listed = listing.get("data", [])[:_MAX_HOTELS]
+        hotel_ids = [hotel["hotelId"] for hotel in listed]
+        if not hotel_ids:
+            return []
+        payload = await self.get(
+            "/v3/shopping/hotel-offers",
+            params={
+                "hotelIds": ",".join(hotel_ids),
+                "adults": adults,
+                "checkInDate": check_in.isoformat(),
+                "checkOutDate": check_out.isoformat(),
+                "currency": "USD",
+            },
+        )
+
+        nights = max((check_out - check_in).days, 1)
+        hotels = []
+        for entry in payload.get("data", []):
+            offers = entry.get("offers") or []
+            if not offers:
+                continue
+            hotel = entry.get("hotel", {})
+            hotels.append(HotelOption(
+                name=hotel.get("name", ""),
+                rating=float(hotel.get("rating") or 0),
+                price_per_night=round(float(offers[0]["price"]["total"]) / nights, 2),
+                location=hotel.get("cityCode", code),
+                amenities=hotel.get("amenities") or [],
+            ))
+        hotels.sort(key=lambda h: h.price_per_night)
+        return hotels[:max_results]
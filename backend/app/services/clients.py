@@ -0,0 +1,172 @@
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from app.ai.schemas import FlightOption, HotelOption
+from app.core.config import settings
+from app.services.amadeus import AmadeusClient
+from app.services.maps import GoogleMapsClient
+from app.services.offer_cache import OfferCache
+from app.services.schemas import FlightDateFare, LiveTravelData
+from app.services.weather import OpenWeatherClient
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderClients:
+    """Process-wide external API clients, each built on first use."""
+
+    def __init__(self):
+        self._amadeus: Optional[AmadeusClient] = None
+        self._maps: Optional[GoogleMapsClient] = None
+        self._weather: Optional[OpenWeatherClient] = None
+
+    @property
+    def amadeus(self) -> AmadeusClient:
+        if self._amadeus is None:
+            self._amadeus = AmadeusClient()
+        return self._amadeus
+
+    @property
+    def maps(self) -> GoogleMapsClient:
+        if self._maps is None:
+            self._maps = GoogleMapsClient()
+        return self._maps
+
+    @property
+    def weather(self) -> OpenWeatherClient:
+        if self._weather is None:
+            self._weather = OpenWeatherClient()
+        return self._weather
+
+    async def aclose(self) -> None:
+        """Close every connection pool that was opened."""
+        for client in (self._amadeus, self._maps, self._weather):
+            if client is not None:
+                await client.aclose()
+        self._amadeus = self._maps = self._weather = None
+
+
+provider_clients = ProviderClients()
+
+flight_offers: OfferCache[FlightOption] = OfferCache(
+    "flights",
+    FlightOption,
+    fresh_ttl=settings.FLIGHT_OFFER_FRESH_SECONDS,
+    stale_ttl=settings.FLIGHT_OFFER_STALE_SECONDS,
+)
+flight_date_fares: OfferCache[FlightDateFare] = OfferCache(
+    "flight_dates",
+    FlightDateFare,
+    fresh_ttl=settings.FLIGHT_OFFER_FRESH_SECONDS,
+    stale_ttl=settings.FLIGHT_OFFER_STALE_SECONDS,
+)
+hotel_offers: OfferCache[HotelOption] = OfferCache(
+    "hotels",
+    HotelOption,
+    fresh_ttl=settings.HOTEL_OFFER_FRESH_SECONDS,
+    stale_ttl=settings.HOTEL_OFFER_STALE_SECONDS,
+)
+
+
+async def _cached(
+    cache: OfferCache,
+    params: Dict[str, Any],
+    fetch: Callable[[], Awaitable[List[Any]]],
+) -> List[Any]:
+    if not settings.OFFER_CACHE_ENABLED:
+        return await fetch()
+    return await cache.get_or_fetch(params, fetch)
+
+
+async def _optional(name: str, call: Awaitable[List[Any]]) -> List[Any]:
+    # One provider failing must not sink the others
+    try:
+        return await call
+    except Exception as e:
+        logger.warning(f"Live {name} lookup failed: {str(e)}")
+        return []
+
+
+async def fetch_travel_data(
+    destination: str,
+    start_date: date,
+    end_date: date,
+    travelers: int,
+    origin: Optional[str] = None,
+    flexible_days: int = 0,
+    clients: ProviderClients = provider_clients,
+) -> LiveTravelData:
+    """
+    Fetch flights, hotels and weather for one trip concurrently.
+
+    With ``flexible_days``, round-trip fares for every date pair within
+    that many days of the requested dates come from one bulk lookup.
+
+    Flight and hotel offers go through the stale-while-revalidate offer
+    caches. Unconfigured providers are skipped and failing ones contribute an
+    empty list, so the result is always usable as a partial answer.
+    """
+    amadeus = clients.amadeus
+    weather = clients.weather
+    calls: Dict[str, Awaitable[List[Any]]] = {}
+    if amadeus.configured:
+        if origin:
+            calls["flights"] = _cached(
+                flight_offers,
+                {
+                    "origin": origin,
+                    "destination": destination,
+                    "departure": start_date,
+                    "return": end_date,
+                    "adults": travelers,
+                },
+                lambda: amadeus.search_flights(
+                    origin, destination, start_date, end_date, travelers
+                ),
+            )
+        if origin and flexible_days:
+            nights = (end_date - start_date).days
+            earliest = start_date - timedelta(days=flexible_days)
+            latest = start_date + timedelta(days=flexible_days)
+            min_nights = nights - 2 * flexible_days
+            max_nights = nights + 2 * flexible_days
+            calls["date_fares"] = _cached(
+                flight_date_fares,
+                {
+                    "origin": origin,
+                    "destination": destination,
+                    "earliest": earliest,
+                    "latest": latest,
+                    "min_nights": min_nights,
+                    "max_nights": max_nights,
+                },
+                lambda: amadeus.search_flight_dates(
+                    origin, destination, earliest, latest, min_nights, max_nights
+                ),
+            )
+        calls["hotels"] = _cached(
+            hotel_offers,
+            {
+                "destination": destination,
+                "check_in": start_date,
+                "check_out": end_date,
+                "adults": travelers,
+            },
+            lambda: amadeus.search_hotels(
+                destination, start_date, end_date, travelers
+            ),
+        )
+    if weather.configured:
+        calls["weather"] = weather.daily_forecast(destination, start_date, end_date)
+
+    results = dict(zip(calls, await asyncio.gather(
+        *(_optional(name, call) for name, call in calls.items())
+    )))
+    return LiveTravelData(
+        flights=results.get("flights", []),
+        hotels=results.get("hotels", []),
+        weather=results.get("weather", []),
+        date_fares=results.get("date_fares", []),
+    )
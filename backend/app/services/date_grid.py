@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ai.schemas import HotelOption
+from app.services.schemas import DateOption, FlightDateFare, PriceGrid
+
+
+def date_window(day: date, flexible_days: int) -> List[date]:
+    """``day`` and every date up to ``flexible_days`` either side of it."""
+    offsets = range(-flexible_days, flexible_days + 1)
+    return [day + timedelta(days=offset) for offset in offsets]
+
+
+def _fare_matrix(
+    departures: Sequence[date],
+    returns: Sequence[date],
+    fares: Sequence[FlightDateFare],
+) -> np.ndarray:
+    """(departures x returns) cheapest fare per traveler, NaN where unknown."""
+    matrix = np.full((len(departures), len(returns)), np.inf)
+    if fares:
+        rows = np.array([fare.departure_date.toordinal() for fare in fares])
+        cols = np.array([fare.return_date.toordinal() for fare in fares])
+        prices = np.array([fare.price for fare in fares], dtype=float)
+        rows -= departures[0].toordinal()
+        cols -= returns[0].toordinal()
+        inside = (
+            (rows >= 0) & (rows < len(departures))
+            & (cols >= 0) & (cols < len(returns))
+        )
+        # Several fares may land on one cell; keep the cheapest
+        np.minimum.at(matrix, (rows[inside], cols[inside]), prices[inside])
+    matrix[np.isinf(matrix)] = np.nan
+    return matrix
+
+
+def build_price_grid(
+    start_date: date,
+    end_date: date,
+    flexible_days: int,
+    hotels: Sequence[HotelOption],
+    travelers: int,
+    budget: float,
+    fares: Sequence[FlightDateFare] = (),
+    fallback_fare: Optional[float] = None,
+    top_k: int = 3,
+) -> PriceGrid:
+    """
+    Price every departure/return pair within ``flexible_days`` of the
+    requested dates.
+
+    Each cell is ``fare * travelers + nightly rate * nights``, computed for
+    all cells and hotels at once: the cheapest total, and the best-rated
+    hotel that still fits ``budget`` for those dates. Without any
+    per-date fare, every pair uses ``fallback_fare`` (typically the
+    cheapest fare for the requested dates) so the grid still compares
+    stay lengths.
+    """
+    departures = date_window(start_date, flexible_days)
+    returns = date_window(end_date, flexible_days)
+
+    fare = _fare_matrix(departures, returns, fares)
+    fares_by_date = not np.isnan(fare).all()
+    if not fares_by_date and fallback_fare is not None:
+        fare = np.full_like(fare, fallback_fare)
+
+    departure_days = np.array([day.toordinal() for day in departures])
+    return_days = np.array([day.toordinal() for day in returns])
+    nights = return_days[None, :] - departure_days[:, None]
+    valid = (nights >= 1) & ~np.isnan(fare)
+
+    # Cheapest first, so ties on rating below go to the cheaper hotel
+    order = sorted(range(len(hotels)), key=lambda k: hotels[k].price_per_night)
+    nightly = np.array([hotels[k].price_per_night for k in order], dtype=float)
+    ratings = np.array([hotels[k].rating for k in order], dtype=float)
+    if nightly.size == 0:
+        nightly = np.zeros(1)
+
+    # (departures, returns, hotels) totals for every combination at once
+    totals = (
+        (fare * travelers)[:, :, None] + nights[:, :, None] * nightly[None, None, :]
+    )
+    totals = np.where(valid[:, :, None], totals, np.inf)
+    cheapest = totals[:, :, 0]
+    within_budget = cheapest <= budget
+
+    affordable = totals <= budget
+    if hotels:
+        scores = np.where(affordable, ratings[None, None, :], -np.inf)
+        best_hotel = scores.argmax(axis=2)
+        best_hotel_total = np.take_along_axis(
+            totals, best_hotel[:, :, None], axis=2
+        )[:, :, 0]
+
+    ranked = np.argsort(np.where(within_budget, cheapest, np.inf), axis=None)[:top_k]
+    cells: List[Tuple[int, int]] = [
+        (int(i), int(j))
+        for i, j in zip(*np.unravel_index(ranked, cheapest.shape))
+        if within_budget[i, j]
+    ]
+
+    def hotel_at(i: int, j: int) -> Optional[int]:
+        if not hotels or not within_budget[i, j]:
+            return None
+        return order[best_hotel[i, j]]
+
+    rounded = np.round(cheapest, 2).tolist()
+    finite = np.isfinite(cheapest).tolist()
+    return PriceGrid(
+        departure_dates=departures,
+        return_dates=returns,
+        totals=[
+            [value if ok else None for value, ok in zip(row, ok_row)]
+            for row, ok_row in zip(rounded, finite)
+        ],
+        hotels=[
+            [hotel_at(i, j) for j in range(len(returns))]
+            for i in range(len(departures))
+        ],
+        within_budget=within_budget.tolist(),
+        fares_by_date=fares_by_date,
+        best_options=[
+            DateOption(
+                departure_date=departures[i],
+                return_date=returns[j],
+                total=rounded[i][j],
+                best_hotel=hotels[hotel_at(i, j)].name if hotels else None,
+                best_hotel_total=(
+                    round(float(best_hotel_total[i, j]), 2) if hotels else None
+                ),
+            )
+            for i, j in cells
+        ],
+    )
@@ -0,0 +1,181 @@
+from typing import Any, Dict, Optional
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import PROVIDER_REQUEST_DURATION, PROVIDER_RETRIES
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Longest server-requested Retry-After we honour before giving up
+_MAX_RETRY_AFTER_SECONDS = 5.0
+
+
+class ProviderError(Exception):
+    """Raised when an external travel API call fails."""
+
+    def __init__(self, provider: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status_code = status_code
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries across all providers.
+
+    Every request deposits ``ratio`` tokens and every retry spends one, so
+    retries stay a bounded fraction of traffic (10% by default) plus a
+    small floor of ``min_per_second``. When a provider is down, requests
+    fail fast instead of multiplying the load with retries.
+    """
+
+    def __init__(
+        self,
+        ratio: float = settings.PROVIDER_RETRY_BUDGET_RATIO,
+        min_per_second: float = settings.PROVIDER_RETRY_BUDGET_MIN_PER_SECOND,
+        max_balance: float = 100.0,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self._balance = 0.0
+        self._reserve = min_per_second
+        self._last = time.monotonic()
+
+    def record_request(self) -> None:
+        self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if any is left."""
+        now = time.monotonic()
+        self._reserve = min(
+            self.min_per_second,
+            self._reserve + (now - self._last) * self.min_per_second,
+        )
+        self._last = now
+        if self._balance >= 1:
+            self._balance -= 1
+            return True
+        if self._reserve >= 1:
+            self._reserve -= 1
+            return True
+        return False
+
+
+retry_budget = RetryBudget()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ProviderClient:
+    """
+    Base for external API clients: one pooled ``httpx.AsyncClient`` per
+    provider, with HTTP/2 when available, a per-provider timeout and
+    retries with full-jitter backoff drawn from the shared retry budget.
+    """
+
+    provider: str = "provider"
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float,
+        max_retries: int = settings.PROVIDER_MAX_RETRIES,
+        backoff: float = settings.PROVIDER_RETRY_BACKOFF_SECONDS,
+        budget: RetryBudget = retry_budget,
+        http2: bool = settings.PROVIDER_HTTP2,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.budget = budget
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            http2=http2 and http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+
+    @property
+    def configured(self) -> bool:
+        """Whether credentials for this provider are set."""
+        return True
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _headers(self) -> Dict[str, str]:
+        """Per-request headers (e.g. auth); overridden by providers."""
+        return {}
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), _MAX_RETRY_AFTER_SECONDS)
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """
+        Send a request and return the decoded JSON body.
+
+        Transport errors, 429 and 5xx responses are retried while the
+        budget allows; anything else raises ``ProviderError``.
+        """
+        self.budget.record_request()
+        extra_headers = kwargs.pop("headers", {})
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response: Optional[httpx.Response] = None
+            error: str
+            try:
+                headers = {**await self._headers(), **extra_headers}
+                response = await self._client.request(
+                    method, url, headers=headers, **kwargs
+                )
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+                outcome = "transport_error"
+            else:
+                if response.is_success:
+                    PROVIDER_REQUEST_DURATION.labels(self.provider, "ok").observe(
+                        time.perf_counter() - start
+                    )
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                outcome = str(response.status_code)
+            PROVIDER_REQUEST_DURATION.labels(self.provider, outcome).observe(
+                time.perf_counter() - start
+            )
+
+            retryable = response is None or response.status_code in _RETRYABLE_STATUS
+            if retryable and attempt < self.max_retries:
+                if self.budget.try_spend():
+                    PROVIDER_RETRIES.labels(self.provider, "retried").inc()
+                    await asyncio.sleep(self._delay(attempt, response))
+                    attempt += 1
+                    continue
+                PROVIDER_RETRIES.labels(self.provider, "budget_exhausted").inc()
+                logger.warning(f"{self.provider}: retry budget exhausted")
+            raise ProviderError(
+                self.provider,
+                f"{method} {url} failed: {error}",
+                response.status_code if response is not None else None,
+            )
+
+    async def get(self, url: str, **kwargs: Any) -> Any:
+        return await self.request("GET", url, **kwargs)
@@ -0,0 +1,60 @@
+from typing import Any, Dict, Optional, Tuple
+
+from app.ai.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.http import ProviderClient, ProviderError
+
+Coordinates = Tuple[float, float]
+
+
+class GoogleMapsClient(ProviderClient):
+    """Google Maps Platform client (geocoding)."""
+
+    provider = "google_maps"
+
+    def __init__(
+        self,
+        api_key: str = settings.GOOGLE_MAPS_API_KEY,
+        base_url: str = settings.GOOGLE_MAPS_BASE_URL,
+        timeout: float = settings.GOOGLE_MAPS_TIMEOUT,
+        geocode_cache_entries: int = settings.GOOGLE_MAPS_GEOCODE_CACHE_ENTRIES,
+        geocode_cache_ttl: float = settings.GOOGLE_MAPS_GEOCODE_CACHE_TTL_SECONDS,
+        **kwargs: Any,
+    ):
+        super().__init__(base_url, timeout, **kwargs)
+        self.api_key = api_key
+        # Wrapped in a 1-tuple so unknown places (None) are cached too
+        self._geocodes: TTLCache[Tuple[Optional[Coordinates]]] = TTLCache(
+            geocode_cache_entries, geocode_cache_ttl
+        )
+        self._geocode_lookups = SingleFlight("maps:geocode", use_redis=False)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def _call(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        payload = await self.get(path, params={**params, "key": self.api_key})
+        status = payload.get("status")
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise ProviderError(self.provider, f"{path} returned {status}")
+        return payload
+
+    async def geocode(self, address: str) -> Optional[Coordinates]:
+        """(lat, lng) of an address or place name; results are cached."""
+        key = address.strip().lower()
+        cached = self._geocodes.get(key)
+        if cached is not None:
+            return cached[0]
+        return await self._geocode_lookups.do(key, lambda: self._geocode(key, address))
+
+    async def _geocode(self, key: str, address: str) -> Optional[Coordinates]:
+        payload = await self._call("/maps/api/geocode/json", {"address": address})
+        results = payload.get("results") or []
+        location = None
+        if results:
+            point = results[0]["geometry"]["location"]
+            location = (point["lat"], point["lng"])
+        self._geocodes.set(key, (location,))
+        return location
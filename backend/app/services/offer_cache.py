@@ -0,0 +1,223 @@
+from datetime import date
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+)
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+
+from pydantic import BaseModel
+
+from app.ai.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import OFFER_CACHE_REFRESHES, OFFER_CACHE_REQUESTS
+from app.core.redis import get_redis
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+_SPACES_RE = re.compile(r"\s+")
+
+# Seconds a worker holds the refresh lock for one key
+_REFRESH_LOCK_SECONDS = 30
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _SPACES_RE.sub(" ", value.strip().lower())
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def offer_key(**params: Any) -> str:
+    """
+    Digest of lookup parameters, insensitive to case, surrounding and
+    repeated whitespace and argument order ("Tokyo, Japan" == " tokyo,  japan").
+    """
+    normalized = {name: _normalize(value) for name, value in params.items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Entry(Generic[M]):
+    __slots__ = ("offers", "fresh_until", "stale_until")
+
+    def __init__(self, offers: List[M], fresh_until: float, stale_until: float):
+        self.offers = offers
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class OfferCache(Generic[M]):
+    """
+    Stale-while-revalidate cache for provider offers of one type.
+
+    Entries are fresh for ``fresh_ttl`` seconds, then served as-is for up
+    to ``stale_ttl`` more while a single background refresh replaces them
+    (one per key per worker, and one across workers via a Redis lock).
+    Empty results are cached for ``negative_ttl`` so dead routes do not hit
+    the provider on every search. Concurrent misses for a key share one
+    fetch.
+
+    The in-process LRU sits in front of Redis; timestamps are wall-clock so
+    entries written by one worker read the same in every other.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: Type[M],
+        fresh_ttl: float,
+        stale_ttl: float,
+        negative_ttl: float = settings.OFFER_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries: int = settings.OFFER_CACHE_MAX_ENTRIES,
+        use_redis: bool = settings.OFFER_CACHE_REDIS_ENABLED,
+    ):
+        self.name = name
+        self.model = model
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.use_redis = use_redis
+        self.local: TTLCache[_Entry[M]] = TTLCache(
+            max_entries=max_entries, ttl=fresh_ttl + stale_ttl
+        )
+        self._flight = SingleFlight(f"offers:{name}", use_redis=False)
+        self._refreshing: Dict[str, "asyncio.Task[None]"] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"offers:v1:{self.name}:{key}"
+
+    def _record(self, outcome: str) -> None:
+        OFFER_CACHE_REQUESTS.labels(offer=self.name, outcome=outcome).inc()
+
+    async def get_or_fetch(
+        self,
+        params: Dict[str, Any],
+        fetch: Callable[[], Awaitable[List[M]]],
+    ) -> List[M]:
+        """Cached offers for ``params``, calling ``fetch`` on a miss."""
+        key = offer_key(**params)
+        now = time.time()
+
+        entry = self.local.get(key)
+        if entry is None or entry.fresh_until <= now:
+            # Another worker may already have refreshed it
+            entry = await self._load(key) or entry
+
+        if entry is not None:
+            if now < entry.fresh_until:
+                self._record("negative" if not entry.offers else "hit")
+                return entry.offers
+            if now < entry.stale_until:
+                self._record("stale")
+                self._schedule_refresh(key, fetch)
+                return entry.offers
+
+        self._record("miss")
+        return await self._flight.do(key, lambda: self._fetch_and_store(key, fetch))
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[List[M]]],
+    ) -> List[M]:
+        offers = await fetch()
+        await self._store(key, offers)
+        return offers
+
+    async def _store(self, key: str, offers: List[M]) -> None:
+        now = time.time()
+        if offers:
+            fresh_until = now + self.fresh_ttl
+            stale_until = fresh_until + self.stale_ttl
+        else:
+            fresh_until = stale_until = now + self.negative_ttl
+        entry = _Entry(offers, fresh_until, stale_until)
+        self.local.set(key, entry, ttl=stale_until - now)
+
+        if self.use_redis:
+            payload = json.dumps({
+                "offers": [offer.model_dump(mode="json") for offer in offers],
+                "fresh_until": fresh_until,
+                "stale_until": stale_until,
+            })
+            try:
+                await get_redis().set(
+                    self._redis_key(key), payload, ex=max(int(stale_until - now), 1)
+                )
+            except Exception as e:
+                logger.warning(f"Offer cache Redis write failed: {str(e)}")
+
+    async def _load(self, key: str) -> Optional[_Entry[M]]:
+        if not self.use_redis:
+            return None
+        try:
+            raw = await get_redis().get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Offer cache Redis lookup failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        entry = _Entry(
+            [self.model.model_validate(offer) for offer in data["offers"]],
+            data["fresh_until"],
+            data["stale_until"],
+        )
+        self.local.set(key, entry, ttl=max(entry.stale_until - time.time(), 0))
+        return entry
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[List[M]]],
+    ) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[List[M]]],
+    ) -> None:
+        lock_key = f"{self._redis_key(key)}:refresh"
+        if self.use_redis:
+            try:
+                acquired = await get_redis().set(
+                    lock_key, "1", nx=True, ex=_REFRESH_LOCK_SECONDS
+                )
+            except Exception as e:
+                logger.warning(f"Offer cache refresh lock failed: {str(e)}")
+                acquired = True
+            if not acquired:
+                OFFER_CACHE_REFRESHES.labels(offer=self.name, outcome="skipped").inc()
+                return
+        try:
+            await self._fetch_and_store(key, fetch)
+            OFFER_CACHE_REFRESHES.labels(offer=self.name, outcome="ok").inc()
+        except Exception as e:
+            # Keep serving the stale entry until it expires
+            OFFER_CACHE_REFRESHES.labels(offer=self.name, outcome="error").inc()
+            logger.warning(f"Background {self.name} refresh failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop the in-process tier (Redis entries expire on their own)."""
+        self.local.clear()
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.ai.schemas import FlightOption, HotelOption
+
+
+class WeatherForecast(BaseModel):
+    date: date
+    description: str
+    temp_min: float
+    temp_max: float
+    precipitation_probability: float = 0.0
+
+
+class FlightDateFare(BaseModel):
+    """Cheapest round-trip fare for one pair of dates, per traveler."""
+    departure_date: date
+    return_date: date
+    price: float
+
+
+class LiveTravelData(BaseModel):
+    """Offers and forecast fetched from the external travel APIs."""
+    flights: List[FlightOption] = []
+    hotels: List[HotelOption] = []
+    weather: List[WeatherForecast] = []
+    date_fares: List[FlightDateFare] = []
+
+
+class DateOption(BaseModel):
+    departure_date: date
+    return_date: date
+    total: float
+    best_hotel: Optional[str] = None
+    best_hotel_total: Optional[float] = None
+
+
+class PriceGrid(BaseModel):
+    """
+    Trip totals for every departure/return date pair of a flexible search.
+
+    ``totals[i][j]`` is the cheapest flight plus hotel total for leaving on
+    ``departure_dates[i]`` and returning on ``return_dates[j]`` (None when
+    the pair is impossible or has no fare). ``hotels[i][j]`` indexes, in
+    the response's ``hotels``, the best-rated hotel that keeps that pair
+    within budget (None if none does).
+    """
+    departure_dates: List[date]
+    return_dates: List[date]
+    totals: List[List[Optional[float]]]
+    hotels: List[List[Optional[int]]]
+    within_budget: List[List[bool]]
+    fares_by_date: bool
+    best_options: List[DateOption]
@@ -0,0 +1,81 @@
+"""
+Token revocation shared by every API worker.
+
+Revoking a subject records the revocation time in a Redis sorted set
+(scored by that time, pruned once every token it covers has expired) and
+publishes it on the user cache invalidation channel. Each worker mirrors
+the set in ``app.core.security.revoked_subjects``, which ``decode_token``
+checks before caching a verified token: from the messages while
+subscribed, and from Redis whenever it (re)subscribes, so a worker that
+missed messages or started later still rejects the revoked tokens.
+"""
+import logging
+import time
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.security import (
+    TOKEN_MAX_LIFETIME_SECONDS,
+    revoke_user_tokens as revoke_local,
+    revoked_subjects,
+    verified_tokens,
+)
+from app.services.user_cache import (
+    INVALIDATION_CHANNEL,
+    register_invalidation_handler,
+)
+
+logger = logging.getLogger(__name__)
+
+REVOKED_SUBJECTS_KEY = "auth:v1:revoked"
+MESSAGE_PREFIX = "tokens"
+
+
+class TokenRevocations:
+    """Keeps this worker's revoked subjects in sync with Redis."""
+
+    def evict_local(self, key: str) -> None:
+        revoked_at, _, subject = key.partition(":")
+        revoke_local(subject, float(revoked_at))
+
+    async def resync(self) -> None:
+        oldest = time.time() - TOKEN_MAX_LIFETIME_SECONDS
+        entries = await get_redis().zrangebyscore(
+            REVOKED_SUBJECTS_KEY, oldest, "+inf", withscores=True
+        )
+        revoked_subjects.replace(
+            {subject.decode(): float(score) for subject, score in entries}
+        )
+        # Tokens of a revocation we missed may have been cached meanwhile
+        verified_tokens.clear()
+
+
+async def revoke_user_tokens(subject: str) -> None:
+    """
+    Reject every token issued to ``subject`` so far, in every worker.
+
+    This worker is updated first, so the caller's own next request is
+    rejected even if Redis is unreachable; that failure is logged.
+    """
+    revoked_at = time.time()
+    revoke_local(subject, revoked_at)
+    if not settings.JWT_REVOCATION_REDIS_ENABLED:
+        return
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.zadd(REVOKED_SUBJECTS_KEY, {subject: revoked_at})
+            pipe.zremrangebyscore(
+                REVOKED_SUBJECTS_KEY, "-inf", revoked_at - TOKEN_MAX_LIFETIME_SECONDS
+            )
+            pipe.expire(REVOKED_SUBJECTS_KEY, TOKEN_MAX_LIFETIME_SECONDS)
+            pipe.publish(
+                INVALIDATION_CHANNEL, f"{MESSAGE_PREFIX}:{revoked_at!r}:{subject}"
+            )
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Token revocation could not be shared: {str(e)}")
+
+
+token_revocations = TokenRevocations()
+if settings.JWT_REVOCATION_REDIS_ENABLED:
+    register_invalidation_handler(MESSAGE_PREFIX, token_revocations)
@@ -0,0 +1,265 @@
+"""
+Read-through cache for per-user records (profile, travel preferences).
+
+    worker LRU  ->  Redis  ->  loader (the database)
+
+Entries are keyed by user ID. Payloads are compact: the model's field
+values in declaration order, without field names, as a JSON array behind
+a 4-byte tag of the model's fields, so an entry written by another schema
+version reads as a miss instead of misaligned data. JSON reads the same on
+every Python version, so workers on different interpreters can share Redis.
+
+``invalidate`` is awaited by the writing request before it responds: it
+deletes the Redis entry and this worker's copy, and bumps a per-user
+generation so a read that loaded the old row concurrently cannot write it
+back. Other API workers drop their copy when the invalidation is published
+to them (see ``InvalidationListener``); local entries also expire after
+USER_CACHE_LOCAL_TTL_SECONDS, which bounds staleness if a message is lost.
+Other per-worker state can share the channel through
+``register_invalidation_handler``.
+"""
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Optional,
+    Type,
+    TypeVar,
+)
+import asyncio
+import json
+import logging
+import zlib
+
+from pydantic import BaseModel
+
+from app.ai.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import USER_CACHE_REQUESTS
+from app.core.redis import get_redis
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+INVALIDATION_CHANNEL = "users:v1:invalidate"
+
+# Fill the entry only if no invalidation happened since the read
+_FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Invalidation message prefix -> handler with ``evict_local(key)`` and an
+# async ``resync()`` for when messages may have been missed
+_handlers: Dict[str, Any] = {}
+
+
+def register_invalidation_handler(name: str, handler: Any) -> None:
+    """Route ``<name>:<key>`` invalidation messages to ``handler``."""
+    _handlers[name] = handler
+
+
+def _schema_tag(model: Type[BaseModel]) -> bytes:
+    fields = ",".join([model.__name__, *model.model_fields])
+    return zlib.crc32(fields.encode("utf-8")).to_bytes(4, "big")
+
+
+def encode_model(value: BaseModel) -> bytes:
+    """Schema tag followed by the field values as a JSON array."""
+    data = value.model_dump(mode="json")
+    values = [data[name] for name in type(value).model_fields]
+    encoded = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return _schema_tag(type(value)) + encoded.encode("utf-8")
+
+
+def decode_model(model: Type[M], payload: bytes) -> Optional[M]:
+    """The model encoded in ``payload``, None if it was written for another schema."""
+    if payload[:4] != _schema_tag(model):
+        return None
+    try:
+        values = json.loads(payload[4:])
+    except ValueError:
+        return None
+    return model.model_validate(dict(zip(model.model_fields, values)))
+
+
+class UserCache(Generic[M]):
+    """Read-through cache of one per-user record type."""
+
+    def __init__(
+        self,
+        name: str,
+        model: Type[M],
+        ttl: int = settings.USER_CACHE_TTL_SECONDS,
+        local_ttl: float = settings.USER_CACHE_LOCAL_TTL_SECONDS,
+        max_entries: int = settings.USER_CACHE_MAX_ENTRIES,
+        enabled: bool = settings.USER_CACHE_ENABLED,
+        use_redis: bool = settings.USER_CACHE_REDIS_ENABLED,
+    ):
+        self.name = name
+        self.model = model
+        self.ttl = ttl
+        self.enabled = enabled
+        self.use_redis = use_redis
+        self.local: TTLCache[M] = TTLCache(max_entries=max_entries, ttl=local_ttl)
+        self._flight = SingleFlight(f"users:{name}", use_redis=False)
+        # Bumped by every invalidation seen by this worker; a fill that
+        # started before one is not kept locally
+        self._epoch = 0
+        register_invalidation_handler(name, self)
+
+    def _redis_key(self, user_id: str) -> str:
+        return f"users:v1:{self.name}:{user_id}"
+
+    def _record(self, outcome: str) -> None:
+        USER_CACHE_REQUESTS.labels(cache=self.name, outcome=outcome).inc()
+
+    async def get(
+        self,
+        user_id: str,
+        load: Callable[[str], Awaitable[Optional[M]]],
+    ) -> Optional[M]:
+        """The user's record, calling ``load`` on a miss (None if absent)."""
+        if not self.enabled:
+            return await load(user_id)
+        value = self.local.get(user_id)
+        if value is not None:
+            self._record("local")
+            return value
+        return await self._flight.do(user_id, lambda: self._read_through(user_id, load))
+
+    async def _read_through(
+        self,
+        user_id: str,
+        load: Callable[[str], Awaitable[Optional[M]]],
+    ) -> Optional[M]:
+        epoch = self._epoch
+        key = self._redis_key(user_id)
+        generation = b""
+        if self.use_redis:
+            try:
+                async with get_redis().pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.get(f"{key}:gen")
+                    raw, generation = await pipe.execute()
+                generation = generation or b""
+                value = decode_model(self.model, raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"User cache Redis lookup failed: {str(e)}")
+                value = None
+            if value is not None:
+                self._record("redis")
+                self._keep(user_id, value, epoch)
+                return value
+
+        self._record("miss")
+        value = await load(user_id)
+        if value is None:
+            return None
+        if self.use_redis:
+            try:
+                await get_redis().eval(
+                    _FILL_SCRIPT, 2, key, f"{key}:gen",
+                    generation, encode_model(value), self.ttl,
+                )
+            except Exception as e:
+                logger.warning(f"User cache Redis write failed: {str(e)}")
+        self._keep(user_id, value, epoch)
+        return value
+
+    def _keep(self, user_id: str, value: M, epoch: int) -> None:
+        if epoch == self._epoch:
+            self.local.set(user_id, value)
+
+    def evict_local(self, user_id: str) -> None:
+        self._epoch += 1
+        self.local.pop(user_id)
+
+    async def invalidate(self, user_id: str) -> None:
+        """
+        Drop the user's entry everywhere; call after writing the database.
+
+        Never fails the write: if Redis is unreachable the error is logged
+        and stale copies expire on their own (local_ttl in other workers,
+        ttl in Redis).
+        """
+        self.evict_local(user_id)
+        if not (self.enabled and self.use_redis):
+            return
+        key = self._redis_key(user_id)
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.incr(f"{key}:gen")
+                pipe.expire(f"{key}:gen", self.ttl)
+                pipe.publish(INVALIDATION_CHANNEL, f"{self.name}:{user_id}")
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"User cache invalidation failed for {self.name}: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop the in-process tier (Redis entries expire on their own)."""
+        self._epoch += 1
+        self.local.clear()
+
+    async def resync(self) -> None:
+        self.clear()
+
+
+class InvalidationListener:
+    """Evict this worker's copies of entries invalidated by other workers."""
+
+    def __init__(self):
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything invalidated while unsubscribed may still be cached
+                for handler in list(_handlers.values()):
+                    await handler.resync()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is None:
+                        continue
+                    name, _, key = message["data"].decode().partition(":")
+                    handler = _handlers.get(name)
+                    if handler is not None:
+                        handler.evict_local(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"User cache invalidation listener failed: {str(e)}")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        enabled = (
+            settings.USER_CACHE_ENABLED and settings.USER_CACHE_REDIS_ENABLED
+        ) or settings.JWT_REVOCATION_REDIS_ENABLED
+        if self._task is None and enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+invalidation_listener = InvalidationListener()
@@ -0,0 +1,78 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.http import ProviderClient
+from app.services.schemas import WeatherForecast
+
+
+class OpenWeatherClient(ProviderClient):
+    """OpenWeather client (5-day / 3-hour forecast, summarized per day)."""
+
+    provider = "openweather"
+
+    def __init__(
+        self,
+        api_key: str = settings.OPENWEATHER_API_KEY,
+        base_url: str = settings.OPENWEATHER_BASE_URL,
+        timeout: float = settings.OPENWEATHER_TIMEOUT,
+        **kwargs: Any,
+    ):
+        super().__init__(base_url, timeout, **kwargs)
+        self.api_key = api_key
+        # The forecast covers the next 5 days whatever the trip dates, so
+        # concurrent searches for a city share one call
+        self._forecasts = SingleFlight("openweather:forecast", use_redis=False)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def daily_forecast(
+        self,
+        city: str,
+        start_date: date,
+        end_date: date,
+    ) -> List[WeatherForecast]:
+        """
+        Daily forecast for the trip days within the 5-day forecast window.
+
+        Trips further out return an empty list without calling the API.
+        """
+        today = datetime.now(timezone.utc).date()
+        if (start_date - today).days > 5 or end_date < today:
+            return []
+        payload = await self._forecasts.do(
+            city.strip().lower(),
+            lambda: self.get(
+                "/data/2.5/forecast",
+                params={"q": city, "units": "metric", "appid": self.api_key},
+            ),
+        )
+
+        slots: Dict[date, List[Dict[str, Any]]] = defaultdict(list)
+        for slot in payload.get("list", []):
+            day = datetime.fromtimestamp(slot["dt"], tz=timezone.utc).date()
+            if start_date <= day <= end_date:
+                slots[day].append(slot)
+
+        forecasts = []
+        for day in sorted(slots):
+            entries = slots[day]
+            descriptions = Counter(
+                entry["weather"][0]["description"]
+                for entry in entries
+                if entry.get("weather")
+            )
+            forecasts.append(WeatherForecast(
+                date=day,
+                description=descriptions.most_common(1)[0][0] if descriptions else "",
+                temp_min=min(entry["main"]["temp_min"] for entry in entries),
+                temp_max=max(entry["main"]["temp_max"] for entry in entries),
+                precipitation_probability=max(
+                    float(entry.get("pop", 0)) for entry in entries
+                ),
+            ))
+        return forecasts
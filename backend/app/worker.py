@@ -0,0 +1,134 @@
+"""
+Celery worker running search and itinerary generations off the API
+processes:
+
+    celery -A app.worker worker --loglevel=info
+    celery -A app.worker worker -Q itinerary --concurrency=8
+
+Redis (``REDIS_URL``) is both the broker and the result backend. Each kind
+of job has its own queue, so workers can be scaled per kind.
+"""
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+import asyncio
+import logging
+
+from celery import Celery
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown
+from kombu import Queue
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+JOB_QUEUES = ("search", "itinerary")
+
+celery_app = Celery(
+    "vacanceia",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL,
+)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_queues=[Queue(name) for name in JOB_QUEUES],
+    task_default_queue=JOB_QUEUES[0],
+    task_routes={f"jobs.{name}": {"queue": name} for name in JOB_QUEUES},
+    task_track_started=True,
+    # A job lost with its worker goes back to the queue
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_soft_time_limit=settings.JOB_SOFT_TIME_LIMIT_SECONDS,
+    task_time_limit=settings.JOB_SOFT_TIME_LIMIT_SECONDS + 30,
+    result_expires=settings.JOB_RESULT_TTL_SECONDS,
+    broker_connection_retry_on_startup=True,
+)
+
+
+def job_record_key(job_id: str) -> str:
+    """Redis key marking a submitted job (its kind), see ``app.core.jobs``."""
+    return f"jobs:{job_id}"
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on this worker process's event loop.
+
+    The loop lives as long as the process, so the agents' pooled LLM
+    clients, provider clients and the Redis pool are reused across tasks.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+@celery_app.task(name="jobs.search")
+def search_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a travel search and return the ``SearchResponse`` as JSON."""
+    from app.api.deps import get_research_agent
+    from app.api.v1.endpoints.search import SearchRequest, run_search
+
+    request = SearchRequest.model_validate(payload)
+    response = run_async(run_search(request, get_research_agent()))
+    return response.model_dump(mode="json")
+
+
+@celery_app.task(name="jobs.itinerary")
+def itinerary_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate an itinerary and return the ``ItineraryResponse`` as JSON."""
+    from app.api.deps import get_itinerary_agent
+    from app.api.v1.endpoints.itinerary import ItineraryRequest, run_itinerary
+
+    request = ItineraryRequest.model_validate(payload)
+    response = run_async(run_itinerary(request, get_itinerary_agent()))
+    return response.model_dump(mode="json")
+
+
+@task_postrun.connect
+def _expire_job_record(task_id: str, **kwargs: Any) -> None:
+    try:
+        celery_app.backend.client.expire(
+            job_record_key(task_id), settings.JOB_RESULT_TTL_SECONDS
+        )
+    except Exception as e:
+        logger.warning(f"Could not expire job record {task_id}: {str(e)}")
+
+
+@worker_process_init.connect
+def _load_indexes(**kwargs: Any) -> None:
+    if settings.KNOWLEDGE_ENABLED:
+        from app.ai.knowledge import knowledge_base
+
+        knowledge_base.load()
+    if settings.ITINERARY_TEMPLATES_ENABLED:
+        from app.ai.templates import template_store
+
+        template_store.load()
+
+
+@worker_process_shutdown.connect
+def _close_clients(**kwargs: Any) -> None:
+    if _loop is None or _loop.is_closed():
+        return
+    from app.ai.registry import agent_registry
+    from app.core.redis import close_redis
+    from app.services.clients import provider_clients
+
+    async def close() -> None:
+        await agent_registry.close()
+        await provider_clients.aclose()
+        await close_redis()
+
+    try:
+        _loop.run_until_complete(close())
+    except Exception as e:
+        logger.warning(f"Error closing worker clients: {str(e)}")
+    _loop.close()
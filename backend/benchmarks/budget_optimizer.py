@@ -0,0 +1,124 @@
+"""
+Budget optimizer latency, checked against exhaustive search.
+
+Generates random flights, hotels and activities, ranks the top-k bundles
+under the budget and, for instances small enough, verifies the best score
+against brute force over every combination. Run from the backend directory:
+
+    python -m benchmarks.budget_optimizer --flights 10 --hotels 10 --activities 25
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+from typing import List
+
+from app.ai.budget import (
+    _FLIGHT_WEIGHT,
+    _HOTEL_WEIGHT,
+    optimize_budget,
+    score_activities,
+    score_flights,
+    score_hotels,
+)
+from app.ai.schemas import ActivityOption, FlightOption, HotelOption
+
+_PREFERENCES = ["food", "museum"]
+
+
+def _options(args: argparse.Namespace):
+    flights = [
+        FlightOption(
+            airline=f"F{i}",
+            departure_time="",
+            arrival_time="",
+            duration="",
+            price=random.uniform(200, 1200),
+            stops=random.randint(0, 2),
+        )
+        for i in range(args.flights)
+    ]
+    hotels = [
+        HotelOption(
+            name=f"H{i}",
+            rating=random.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+            price_per_night=random.uniform(50, 400),
+            location="",
+            amenities=[],
+        )
+        for i in range(args.hotels)
+    ]
+    activities = [
+        ActivityOption(
+            name=f"A{i}",
+            price=random.choice([0.0, random.uniform(5, 150)]),
+            category=random.choice(["food", "museum", "hiking", "nightlife"]),
+        )
+        for i in range(args.activities)
+    ]
+    return flights, hotels, activities
+
+
+def _brute_force(flights, hotels, activities, args) -> float:
+    f_scores = _FLIGHT_WEIGHT * score_flights(flights)
+    h_scores = _HOTEL_WEIGHT * score_hotels(hotels)
+    a_values = score_activities(activities, _PREFERENCES)
+    best = float("-inf")
+    for (i, f), (j, h) in itertools.product(enumerate(flights), enumerate(hotels)):
+        base = f.price * args.travelers + h.price_per_night * args.nights
+        for r in range(len(activities) + 1):
+            for subset in itertools.combinations(range(len(activities)), r):
+                cost = base + sum(activities[k].price for k in subset) * args.travelers
+                if cost <= args.budget:
+                    score = f_scores[i] + h_scores[j] + sum(a_values[k] for k in subset)
+                    best = max(best, score)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flights", type=int, default=10)
+    parser.add_argument("--hotels", type=int, default=10)
+    parser.add_argument("--activities", type=int, default=25)
+    parser.add_argument("--travelers", type=int, default=2)
+    parser.add_argument("--nights", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=4000.0)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    samples: List[float] = []
+    for _ in range(args.repeat):
+        flights, hotels, activities = _options(args)
+        start = time.perf_counter()
+        bundles = optimize_budget(
+            flights, hotels, activities, args.budget, args.travelers, args.nights,
+            preferences=_PREFERENCES, top_k=args.top_k,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(
+        f"{args.flights} flights x {args.hotels} hotels x {args.activities} activities, "
+        f"top {args.top_k}: median={statistics.median(samples):.2f}ms "
+        f"p95={samples[int(0.95 * len(samples))]:.2f}ms "
+        f"(last run: {len(bundles)} bundles)"
+    )
+
+    # Optimality check on a small instance
+    small = argparse.Namespace(**{**vars(args), "flights": 3, "hotels": 3, "activities": 10})
+    mismatches = 0
+    for _ in range(20):
+        flights, hotels, activities = _options(small)
+        bundles = optimize_budget(
+            flights, hotels, activities, args.budget, args.travelers, args.nights,
+            preferences=_PREFERENCES, top_k=1,
+        )
+        expected = _brute_force(flights, hotels, activities, small)
+        got = bundles[0].score if bundles else float("-inf")
+        mismatches += abs(got - expected) > 1e-3
+    print(f"brute-force check: {20 - mismatches}/20 optimal")
+
+
+if __name__ == "__main__":
+    main()
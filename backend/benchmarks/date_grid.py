@@ -0,0 +1,98 @@
+"""
+Flexible-dates price grid: vectorized build vs a per-cell Python loop.
+
+Builds the grid for +/- --days on each end with --hotels candidates and
+synthetic fares for every date pair. Run from the backend directory:
+
+    python -m benchmarks.date_grid --days 7 --hotels 20
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Callable, List, Sequence
+
+from app.ai.schemas import HotelOption
+from app.services.date_grid import build_price_grid, date_window
+from app.services.schemas import FlightDateFare
+
+_START = date(2025, 3, 15)
+_END = date(2025, 3, 22)
+
+
+def _naive_grid(
+    days: int,
+    hotels: Sequence[HotelOption],
+    fares: Sequence[FlightDateFare],
+    travelers: int,
+) -> List[List[float]]:
+    by_dates = {(fare.departure_date, fare.return_date): fare.price for fare in fares}
+    grid = []
+    for departure in date_window(_START, days):
+        row = []
+        for ret in date_window(_END, days):
+            nights = (ret - departure).days
+            fare = by_dates.get((departure, ret))
+            if nights < 1 or fare is None:
+                row.append(float("inf"))
+                continue
+            row.append(min(fare * travelers + h.price_per_night * nights for h in hotels))
+        grid.append(row)
+    return grid
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--hotels", type=int, default=20)
+    parser.add_argument("--travelers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    hotels = [
+        HotelOption(
+            name=f"Hotel {i}",
+            rating=random.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+            price_per_night=random.uniform(60, 400),
+            location="Center",
+            amenities=[],
+        )
+        for i in range(args.hotels)
+    ]
+    fares = [
+        FlightDateFare(
+            departure_date=_START + timedelta(days=d),
+            return_date=_END + timedelta(days=r),
+            price=random.uniform(300, 900),
+        )
+        for d in range(-args.days, args.days + 1)
+        for r in range(-args.days, args.days + 1)
+    ]
+
+    cells = (2 * args.days + 1) ** 2
+    print(f"{cells} cells x {args.hotels} hotels")
+    for label, fn in (
+        ("numpy", lambda: build_price_grid(
+            _START, _END, args.days, hotels, args.travelers, 3000, fares=fares
+        )),
+        ("loop", lambda: _naive_grid(args.days, hotels, fares, args.travelers)),
+    ):
+        samples = sorted(_time(fn, args.repeat))
+        print(
+            f"{label:<6} median={statistics.median(samples):7.3f}ms "
+            f"p95={samples[int(0.95 * len(samples))]:7.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
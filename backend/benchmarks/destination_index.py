@@ -0,0 +1,86 @@
+"""
+Destination index: build, incremental rebuild and query latency.
+
+Builds an index for --count synthetic destinations (clustered unit vectors
+of --dim dimensions, no encoder needed) in a temporary directory, loads it
+memory-mapped like a worker does, and times single queries against an
+exact search for recall. Run from the backend directory:
+
+    python -m benchmarks.destination_index --count 50000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.ai.destinations import Destination, DestinationIndex, write_generation
+
+
+def _vectors(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim))
+    points = centers[rng.integers(clusters, size=count)] + 0.6 * rng.standard_normal((count, dim))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points.astype("float32")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = _vectors(args.count, args.dim, max(args.count // 100, 1), rng)
+    destinations = [
+        Destination(id=str(i), name=f"Destination {i}", popularity=float(rng.random()))
+        for i in range(args.count)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        start = time.perf_counter()
+        write_generation(root, destinations, embeddings, "synthetic")
+        print(f"full build        {time.perf_counter() - start:7.2f}s (quantizer trained)")
+
+        # 1% of the catalogue changed: the quantizer is reused
+        changed = rng.choice(args.count, size=max(args.count // 100, 1), replace=False)
+        embeddings[changed] = _vectors(len(changed), args.dim, 10, rng)
+        start = time.perf_counter()
+        write_generation(root, destinations, embeddings, "synthetic")
+        print(f"incremental build {time.perf_counter() - start:7.2f}s")
+
+        index = DestinationIndex(path=str(root), nprobe=args.nprobe)
+        start = time.perf_counter()
+        index.load()
+        print(f"load (mmap)       {(time.perf_counter() - start) * 1000:7.1f}ms")
+
+        queries = embeddings[rng.choice(args.count, size=args.queries)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape).astype("float32")
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        samples, recall = [], []
+        for query in queries:
+            start = time.perf_counter()
+            results = index.search(query, args.limit)
+            samples.append((time.perf_counter() - start) * 1000)
+            exact = np.argsort(-(embeddings @ query))[:args.limit]
+            found = {int(match.id) for match in results}
+            recall.append(len(found & set(exact.tolist())) / args.limit)
+        samples.sort()
+
+    print(
+        f"query             median={statistics.median(samples):6.2f}ms "
+        f"p95={samples[int(0.95 * len(samples))]:6.2f}ms "
+        f"p99={samples[int(0.99 * len(samples))]:6.2f}ms"
+    )
+    print(f"recall@{args.limit}         {statistics.mean(recall):.3f} (nprobe={args.nprobe})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Wall-clock comparison of single-call vs chunked itinerary generation.
+
+The LLM is simulated: latency is a fixed time-to-first-token plus a per-day
+generation cost, which is what dominates real completions. Run from the
+backend directory:
+
+    python -m benchmarks.itinerary_chunking --duration 14 --day-seconds 0.2
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from app.ai.agents.itinerary_agent import ItineraryAgent
+
+
+class _Generation:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Result:
+    def __init__(self, text: str):
+        self.generations = [[_Generation(text)]]
+        self.llm_output = None
+
+
+class SimulatedLLM:
+    """Returns well-formed days after a latency proportional to output size."""
+
+    def __init__(self, ttft: float, day_seconds: float):
+        self.ttft = ttft
+        self.day_seconds = day_seconds
+
+    async def agenerate(self, batches, **kwargs):
+        prompt = batches[0][-1].content
+        if "outline all" in prompt:
+            await asyncio.sleep(self.ttft + self.day_seconds / 2)
+            return _Result(json.dumps({"accommodation": "Hotel", "days": []}))
+
+        match = re.search(r"days (\d+) to (\d+)", prompt)
+        if match:
+            first, last = int(match.group(1)), int(match.group(2))
+        else:
+            first, last = 1, int(re.search(r"detailed (\d+)-day", prompt).group(1))
+        await asyncio.sleep(self.ttft + self.day_seconds * (last - first + 1))
+        days = [
+            {
+                "day": day,
+                "morning": "m",
+                "lunch": "l",
+                "afternoon": "a",
+                "evening": "e",
+                "dinner": "d",
+                "accommodation": "h",
+                "estimated_cost": 100.0,
+                "tips": "t",
+            }
+            for day in range(first, last + 1)
+        ]
+        return _Result(json.dumps({"daily_plans": days}))
+
+
+async def run(args: argparse.Namespace) -> None:
+    agent = ItineraryAgent(model="gpt-4")
+    agent.llm = SimulatedLLM(args.ttft, args.day_seconds)
+    input_data = {"destination": "Kyoto, Japan", "duration": args.duration}
+
+    agent.chunked_generation = False
+    start = time.perf_counter()
+    await agent.execute(input_data)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = await agent.execute_chunked(
+        input_data, chunk_days=args.chunk_days, concurrency=args.concurrency
+    )
+    chunked = time.perf_counter() - start
+
+    print(f"duration={args.duration} days, chunk_days={args.chunk_days}, "
+          f"concurrency={args.concurrency}")
+    print(f"single call : {single:.2f}s")
+    print(f"chunked     : {chunked:.2f}s ({len(result['daily_plans'])} days)")
+    print(f"speedup     : {single / chunked:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=int, default=14)
+    parser.add_argument("--chunk-days", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--ttft", type=float, default=0.5)
+    parser.add_argument("--day-seconds", type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Output budget and continuation of single-call itineraries.
+
+The LLM is simulated: it writes days of about --day-tokens tokens and stops
+mid-answer when it reaches the request's max_tokens, like a real completion
+that ends on length. For each duration, compares the old fixed 2000-token
+budget (days past the cut-off are lost) with the per-request budget plus
+continuations: calls made, days delivered and tokens generated or thrown
+away. Run from the backend directory:
+
+    python -m benchmarks.itinerary_output_budget --pace packed --max-output 4096
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+
+from prometheus_client import REGISTRY
+
+from app.ai.agents.itinerary_agent import ItineraryAgent, estimate_output_tokens
+from app.ai.structured import StructuredOutputError
+from app.ai.tokens import count_tokens
+
+
+class _Generation:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Result:
+    def __init__(self, text: str):
+        self.generations = [[_Generation(text)]]
+        self.llm_output = None
+
+
+class TruncatingLLM:
+    """Writes the requested days and cuts the answer off at max_tokens."""
+
+    def __init__(self, day_tokens: int):
+        self.day_tokens = day_tokens
+        self.calls = 0
+        self.tokens = 0
+
+    async def agenerate(self, batches, max_tokens=None, **kwargs):
+        prompt = batches[0][-1].content.replace("\n", " ")
+        match = re.search(r"Write only days (\d+) to (\d+)", prompt)
+        if match:
+            first, last = int(match.group(1)), int(match.group(2))
+        else:
+            first, last = 1, int(re.search(r"detailed (\d+)-day", prompt).group(1))
+        filler = " ".join(["walk"] * self.day_tokens)
+        days = [
+            {
+                "day": day,
+                "morning": filler,
+                "lunch": "l",
+                "afternoon": "a",
+                "evening": "e",
+                "dinner": "d",
+                "accommodation": "h",
+                "estimated_cost": 100.0,
+                "tips": "t",
+            }
+            for day in range(first, last + 1)
+        ]
+        text = json.dumps({"daily_plans": days, "overview": "Kyoto"})
+        if count_tokens(text) > max_tokens:
+            # Cut at the budget; count_tokens is monotonic in the prefix length
+            low, high = 0, len(text)
+            while low < high:
+                mid = (low + high + 1) // 2
+                if count_tokens(text[:mid]) <= max_tokens:
+                    low = mid
+                else:
+                    high = mid - 1
+            text = text[:low]
+        self.calls += 1
+        self.tokens += count_tokens(text)
+        return _Result(text)
+
+
+def _wasted_tokens() -> float:
+    return REGISTRY.get_sample_value(
+        "vacanceia_llm_wasted_tokens_total", {"agent": "ItineraryAgent"}
+    ) or 0.0
+
+
+async def _measure(agent: ItineraryAgent, llm: TruncatingLLM, duration: int, pace: str):
+    agent.llm = llm
+    try:
+        result = await agent.execute(
+            {"destination": "Kyoto, Japan", "duration": duration, "pace": pace}
+        )
+        delivered = len(result["daily_plans"])
+    except StructuredOutputError:
+        delivered = 0
+    return llm.calls, delivered, llm.tokens
+
+
+async def run(args: argparse.Namespace) -> None:
+    # Cut-off warnings are the expected outcome for the fixed budget
+    logging.getLogger("app.ai.agents.itinerary_agent").setLevel(logging.ERROR)
+    print(
+        f"pace={args.pace}, ~{args.day_tokens} tokens/day, "
+        f"max {args.max_output} output tokens per answer"
+    )
+    print(f"{'days':>4} {'estimate':>9} | {'fixed 2000: calls':>17} {'days':>5} | "
+          f"{'sized: calls':>12} {'days':>5} {'tokens':>7} {'wasted':>7}")
+    for duration in args.durations:
+        fixed = ItineraryAgent(model="gpt-4", max_tokens=2000)
+        fixed.chunked_generation = False
+        fixed.max_output_tokens = 2000
+        fixed.max_continuations = 0
+        calls_fixed, days_fixed, _ = await _measure(
+            fixed, TruncatingLLM(args.day_tokens), duration, args.pace
+        )
+
+        sized = ItineraryAgent(model="gpt-4-turbo")
+        sized.chunked_generation = False
+        sized.max_output_tokens = args.max_output
+        wasted = _wasted_tokens()
+        calls, days, tokens = await _measure(
+            sized, TruncatingLLM(args.day_tokens), duration, args.pace
+        )
+        wasted = _wasted_tokens() - wasted
+        print(
+            f"{duration:>4} {estimate_output_tokens(duration, args.pace):>9} | "
+            f"{calls_fixed:>17} {days_fixed:>5} | "
+            f"{calls:>12} {days:>5} {tokens:>7} {wasted:>7.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pace", default="moderate", choices=["relaxed", "moderate", "packed"])
+    parser.add_argument("--day-tokens", type=int, default=300)
+    parser.add_argument("--max-output", type=int, default=4096)
+    parser.add_argument("--durations", type=int, nargs="+", default=[3, 5, 7, 10, 14, 21, 30])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
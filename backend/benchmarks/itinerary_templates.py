@@ -0,0 +1,133 @@
+"""
+Cost of serving itineraries from the template store.
+
+Writes a synthetic store of --destinations x durations x paces templates
+(no LLM needed), loads it like an API worker and times the lookup of the
+nearest template plus serving it as-is. For personalised requests, compares
+the prompt and output tokens of the adaptation call (which returns only the
+--changed-days rewritten days) with a full generation. Run from the backend
+directory:
+
+    python -m benchmarks.itinerary_templates --destinations 50 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.ai.agents import itinerary_agent
+from app.ai.agents.itinerary_agent import ItineraryAgent, estimate_output_tokens
+from app.ai.index_store import new_generation, publish
+from app.ai.schemas import ItineraryDays, ItineraryOutput
+from app.ai.structured import schema_instructions
+from app.ai.templates import PACES, ItineraryTemplate, TemplateStore, template_id
+from app.ai.tokens import count_message_tokens
+
+_DURATIONS = (3, 5, 7, 10, 14)
+
+
+def _day(number: int) -> dict:
+    return {
+        "day": number,
+        "morning": "Walk the old town and visit the cathedral before the crowds arrive.",
+        "lunch": "Market hall stalls with local specialities.",
+        "afternoon": "Museum of fine arts, then the botanical garden.",
+        "evening": "Sunset from the river promenade.",
+        "dinner": "Family-run bistro near the main square.",
+        "accommodation": "Central boutique hotel.",
+        "estimated_cost": 120.0,
+        "tips": "Buy a day pass for public transport; most museums close on Mondays.",
+        "stops": [{"name": f"Place {number}-{i}", "duration_minutes": 90} for i in range(4)],
+    }
+
+
+def _write_store(root: Path, destinations: int) -> None:
+    generation = new_generation(root)
+    with open(generation / "templates.jsonl", "w", encoding="utf-8") as f:
+        for d in range(destinations):
+            for duration in _DURATIONS:
+                for pace in PACES:
+                    template = ItineraryTemplate(
+                        id=template_id(f"City {d}", duration, pace),
+                        destination=f"City {d}",
+                        duration=duration,
+                        pace=pace,
+                        overview="A classic first visit.",
+                        daily_plans=[_day(n) for n in range(1, duration + 1)],
+                        total_estimated_cost=120.0 * duration,
+                        generated_at="2024-01-01T00:00:00+00:00",
+                    )
+                    f.write(template.model_dump_json() + "\n")
+    publish(root, generation)
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_store(Path(tmp), args.destinations)
+        store = TemplateStore(path=tmp, backend="disk")
+        start = time.perf_counter()
+        store.load()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        agent = ItineraryAgent(model="gpt-4")
+        input_data = {"destination": "City 1", "duration": args.duration, "pace": "moderate"}
+        samples = []
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            template = await store.nearest(f"City {i % args.destinations}", args.duration, "moderate")
+            await agent.personalize(template.model_dump(), input_data)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+
+    count = args.destinations * len(_DURATIONS) * len(PACES)
+    print(f"{count} templates, loaded in {load_ms:.0f}ms")
+    print(
+        f"nearest + serve: median={statistics.median(samples):.3f}ms "
+        f"p95={samples[int(0.95 * len(samples))]:.3f}ms (no LLM call)"
+    )
+
+    values = {
+        "destination": "City 1",
+        "duration": args.duration,
+        "interests": "food, museums",
+        "pace": "moderate",
+        "special_requirements": "vegetarian",
+    }
+    system = itinerary_agent.SYSTEM_PROMPT.render()
+    full_prompt = count_message_tokens([
+        system + schema_instructions(ItineraryOutput),
+        itinerary_agent.USER_PROMPT.render(**values),
+    ])
+    adapt_prompt = count_message_tokens([
+        system + schema_instructions(ItineraryDays),
+        itinerary_agent.ADAPT_PROMPT.render(
+            template_duration=args.duration,
+            itinerary=json.dumps(
+                {"daily_plans": template.model_dump()["daily_plans"][:args.duration]},
+                separators=(",", ":"),
+            ),
+            **values,
+        ),
+    ])
+    full_output = estimate_output_tokens(args.duration, "moderate")
+    adapt_output = estimate_output_tokens(args.changed_days, "moderate")
+    print(f"{'':<18} {'prompt':>7} {'output':>7}")
+    print(f"{'full generation':<18} {full_prompt:>7} {full_output:>7}")
+    print(f"{'adaptation':<18} {adapt_prompt:>7} {adapt_output:>7}  "
+          f"({args.changed_days} of {args.duration} days rewritten)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--destinations", type=int, default=50)
+    parser.add_argument("--duration", type=int, default=5)
+    parser.add_argument("--changed-days", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
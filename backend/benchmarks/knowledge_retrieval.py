@@ -0,0 +1,110 @@
+"""
+Knowledge base retrieval latency.
+
+Builds an in-memory knowledge index of --destinations x --chunks synthetic
+chunks (random unit vectors, no encoder needed) and times the per-request
+work: the range-restricted FAISS search over one destination's chunks and
+packing the best ones into the token budget. With sentence-transformers
+installed, the query embedding is timed too. Run from the backend
+directory:
+
+    python -m benchmarks.knowledge_retrieval --destinations 2000 --chunks 60
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app.ai.knowledge import Chunk, KnowledgeBase
+from app.ai.tokens import count_tokens
+
+_WORDS = (
+    "metro station museum temple market tram ferry district garden bakery "
+    "ticket festival harbour cathedral bridge tapas ramen night walk tour"
+).split()
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def _report(label: str, samples: List[float]) -> None:
+    print(
+        f"{label:<22} median={statistics.median(samples):7.3f}ms "
+        f"p95={samples[int(0.95 * len(samples))]:7.3f}ms"
+    )
+
+
+def main() -> None:
+    import faiss
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--destinations", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=60, help="chunks per destination")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=800)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    total = args.destinations * args.chunks
+    vectors = rng.standard_normal((total, args.dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+
+    kb = KnowledgeBase(top_k=args.top_k, context_tokens=args.budget)
+    kb.index = faiss.IndexFlatIP(args.dim)
+    kb.index.add(vectors)
+    kb.chunks = []
+    for d in range(args.destinations):
+        for c in range(args.chunks):
+            text = " ".join(random.choices(_WORDS, k=random.randint(60, 140)))
+            kb.chunks.append(Chunk(
+                destination=f"City {d}", section=f"Section {c}",
+                text=text, tokens=count_tokens(text),
+            ))
+        kb._ranges[f"city {d}"] = (d * args.chunks, (d + 1) * args.chunks)
+
+    print(f"{total} chunks, top_k={args.top_k}, budget={args.budget} tokens")
+    queries = rng.standard_normal((args.repeat, args.dim)).astype("float32")
+    faiss.normalize_L2(queries)
+    picks = iter(range(10 ** 9))
+
+    def search() -> object:
+        i = next(picks) % args.repeat
+        return kb.retrieve(f"City {i % args.destinations}", queries[i], args.top_k)
+
+    def search_and_pack() -> object:
+        i = next(picks) % args.repeat
+        destination = f"City {i % args.destinations}"
+        return kb.pack(destination, kb.retrieve(destination, queries[i], args.top_k), args.budget)
+
+    _report("search", _time(search, args.repeat))
+    _report("search + pack", _time(search_and_pack, args.repeat))
+    context = search_and_pack()
+    print(f"{'context tokens':<22} {count_tokens(context)}")
+
+    try:
+        from app.ai.embeddings import encode, load_encoder
+
+        encoder = load_encoder(kb.model_name)
+    except ImportError:
+        print("query embedding        skipped (sentence-transformers not installed)")
+        return
+    encode(encoder, ["warm up"])
+    _report(
+        "query embedding",
+        _time(lambda: encode(encoder, ["Kyoto: temples, vegetarian food"]), 50),
+    )
+
+
+if __name__ == "__main__":
+    main()
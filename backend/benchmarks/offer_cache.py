@@ -0,0 +1,126 @@
+"""
+Lookup latency distribution of the offer cache: cold (every lookup goes to
+the provider), warm (fresh entries) and stale (expired entries served while
+refreshing in the background).
+
+The provider is simulated with log-normal latency around --provider-ms,
+which is roughly how flight search APIs behave. Run from the backend
+directory:
+
+    python -m benchmarks.offer_cache --lookups 500 --provider-ms 400
+
+Pass --redis to put Redis behind the in-process tier (REDIS_URL must be
+reachable).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import List
+
+from app.ai.schemas import FlightOption
+from app.core.redis import close_redis
+from app.services.offer_cache import OfferCache
+
+_OFFER = FlightOption(
+    airline="AF",
+    departure_time="2025-03-15T10:00",
+    arrival_time="2025-03-16T05:00",
+    duration="13h",
+    price=850.0,
+    stops=1,
+)
+
+
+class SimulatedProvider:
+    def __init__(self, median_ms: float):
+        self.median = median_ms / 1000
+        self.calls = 0
+
+    async def search(self) -> List[FlightOption]:
+        self.calls += 1
+        await asyncio.sleep(self.median * random.lognormvariate(0, 0.5))
+        return [_OFFER]
+
+
+def _params(i: int) -> dict:
+    return {
+        "origin": "Paris",
+        "destination": "Tokyo",
+        "departure": date(2025, 3, 1) + timedelta(days=i),
+        "adults": 2,
+    }
+
+
+async def _measure(cache: OfferCache, provider: SimulatedProvider, keys: int,
+                   lookups: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def lookup(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await cache.get_or_fetch(_params(i % keys), provider.search)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(lookup(i) for i in range(lookups)))
+    return latencies
+
+
+def _report(label: str, latencies: List[float], calls: int) -> None:
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    print(
+        f"{label:<6} p50={pct(0.50):8.2f}ms p95={pct(0.95):8.2f}ms "
+        f"p99={pct(0.99):8.2f}ms mean={statistics.mean(ordered) * 1000:8.2f}ms "
+        f"provider calls={calls}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    provider = SimulatedProvider(args.provider_ms)
+    cache: OfferCache[FlightOption] = OfferCache(
+        f"bench{random.getrandbits(32)}",
+        FlightOption,
+        fresh_ttl=60,
+        stale_ttl=600,
+        use_redis=args.redis,
+    )
+
+    # Cold: distinct keys, nothing cached yet
+    latencies = await _measure(cache, provider, args.lookups, args.lookups, args.concurrency)
+    _report("cold", latencies, provider.calls)
+
+    # Warm: the same keys, all fresh
+    provider.calls = 0
+    latencies = await _measure(cache, provider, args.lookups, args.lookups, args.concurrency)
+    _report("warm", latencies, provider.calls)
+
+    # Stale: entries past freshness are served at once, refreshed behind
+    for entry in cache.local._data.values():
+        entry[1].fresh_until = time.time() - 1
+    provider.calls = 0
+    latencies = await _measure(cache, provider, args.lookups, args.lookups, args.concurrency)
+    await asyncio.sleep(args.provider_ms / 1000 * 4)
+    _report("stale", latencies, provider.calls)
+
+    if args.redis:
+        await close_redis()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--provider-ms", type=float, default=400.0)
+    parser.add_argument("--redis", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
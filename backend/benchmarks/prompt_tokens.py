@@ -0,0 +1,98 @@
+"""
+Prompt sizes of the agents' compiled templates.
+
+For every template, compares the tokens of the source text with the
+compiled one (what normalization saves on each call). For a sample
+itinerary and research request, splits the prompt into the stable prefix
+(system prompt and JSON schema, identical across requests and so eligible
+for provider prefix caching) and the per-request user message, and times
+rendering. Token counts use tiktoken when installed, else an estimate. Run
+from the backend directory:
+
+    python -m benchmarks.prompt_tokens --duration 7
+"""
+import argparse
+import statistics
+import time
+
+from app.ai.agents import itinerary_agent, research_agent
+from app.ai.prompts import PromptTemplate
+from app.ai.schemas import ItineraryOutput, ResearchOutput
+from app.ai.structured import schema_instructions
+from app.ai.tokens import count_tokens
+
+_TEMPLATES = [
+    research_agent.SYSTEM_PROMPT,
+    research_agent.USER_PROMPT,
+    itinerary_agent.SYSTEM_PROMPT,
+    itinerary_agent.USER_PROMPT,
+    itinerary_agent.SKELETON_PROMPT,
+    itinerary_agent.CHUNK_PROMPT,
+]
+
+
+def _render_time(template: PromptTemplate, values: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        template.render(**values)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'template':<22} {'source':>7} {'compiled':>9} {'saved':>6}")
+    for template in _TEMPLATES:
+        print(
+            f"{template.name:<22} {template.tokens + template.saved_tokens:>7} "
+            f"{template.tokens:>9} {template.saved_tokens:>6}"
+        )
+
+    requests = [
+        (
+            "itinerary",
+            itinerary_agent.SYSTEM_PROMPT,
+            ItineraryOutput,
+            itinerary_agent.USER_PROMPT,
+            {
+                "destination": "Kyoto, Japan",
+                "duration": args.duration,
+                "interests": "temples, food, gardens",
+                "pace": "moderate",
+                "special_requirements": "vegetarian",
+            },
+        ),
+        (
+            "research",
+            research_agent.SYSTEM_PROMPT,
+            ResearchOutput,
+            research_agent.USER_PROMPT,
+            {
+                "destination": "Kyoto, Japan",
+                "start_date": "2024-04-01",
+                "end_date": "2024-04-08",
+                "budget": 3000,
+                "travelers": 2,
+                "preferences": "culture, food",
+            },
+        ),
+    ]
+    print()
+    print(f"{'request':<10} {'prefix':>7} {'user':>5} {'cached share':>13} {'render':>9}")
+    for name, system, output_model, user, values in requests:
+        prefix = count_tokens(system.render() + schema_instructions(output_model))
+        message = count_tokens(user.render(**values))
+        render_us = _render_time(user, values, args.repeat)
+        print(
+            f"{name:<10} {prefix:>7} {message:>5} "
+            f"{prefix / (prefix + message):>12.0%} {render_us:>7.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per-request overhead of the rate limiter: the raw bucket check for each
+backend, and a full ASGI round trip with and without the middleware. Run
+from the backend directory:
+
+    python -m benchmarks.rate_limit --iterations 20000
+
+The Redis backend is measured only when REDIS_URL is reachable.
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from app.core.rate_limit import (
+    MemoryRateLimiter,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RedisRateLimiter,
+)
+from app.core.redis import close_redis, get_redis
+
+# Large enough that no check is rejected during the run
+RULE = RateLimitRule("bench", limit=10**9)
+
+
+async def _per_call(fn: Callable[[], Awaitable[None]], iterations: int) -> float:
+    await fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def _endpoint(scope, receive, send) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _request(app) -> Callable[[], Awaitable[None]]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/search/destinations",
+        "headers": [],
+        "client": ("203.0.113.7", 50000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def call() -> None:
+        await app(scope, receive, send)
+
+    return call
+
+
+async def run(iterations: int) -> None:
+    memory = MemoryRateLimiter()
+    print(
+        f"memory bucket check    : "
+        f"{await _per_call(lambda: memory.hit('ip:bench', RULE), iterations):8.2f} us"
+    )
+
+    try:
+        await get_redis().ping()
+    except Exception:
+        print("redis bucket check     :  skipped (Redis unreachable)")
+    else:
+        redis = RedisRateLimiter(prefix="ratelimit:bench")
+        per = await _per_call(lambda: redis.hit("ip:bench", RULE), iterations)
+        print(f"redis bucket check     : {per:8.2f} us")
+        await get_redis().delete("ratelimit:bench:ip:bench")
+    await close_redis()
+
+    bare = await _per_call(_request(_endpoint), iterations)
+    limited = await _per_call(
+        _request(RateLimitMiddleware(_endpoint, backend=memory, rules=[RULE])),
+        iterations,
+    )
+    print(f"ASGI without limiter   : {bare:8.2f} us/request")
+    print(f"ASGI with limiter      : {limited:8.2f} us/request")
+    print(f"added overhead         : {limited - bare:8.2f} us/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Itinerary route optimization on synthetic trips.
+
+Scatters --stops-min to --stops-max stops per day across a city-sized area
+around one hotel, then times the distance matrix, per-day ordering and
+rebalancing, and compares the total walking distance with the original
+(generation) order. Run from the backend directory:
+
+    python -m benchmarks.route_optimizer --days 30 --pace moderate
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+import numpy as np
+
+from app.ai.routing import PACE_WINDOWS, DayRouter, haversine_matrix
+
+# Central Paris, roughly 10 km across
+_CENTER = (48.8566, 2.3522)
+_SPREAD = 0.05
+
+
+def _trip(args: argparse.Namespace):
+    days: List[List[int]] = []
+    coords = []
+    durations = []
+    for _ in range(args.days):
+        day = []
+        for _ in range(random.randint(args.stops_min, args.stops_max)):
+            day.append(len(coords))
+            coords.append((
+                _CENTER[0] + random.uniform(-_SPREAD, _SPREAD),
+                _CENTER[1] + random.uniform(-_SPREAD, _SPREAD) * 1.5,
+            ))
+            durations.append(random.choice([45, 60, 90, 120]))
+        days.append(day)
+    hotel = len(coords)
+    coords.append(_CENTER)
+    durations.append(0)
+    return np.array(coords), np.array(durations, dtype=float), days, hotel
+
+
+def _distance(dist: np.ndarray, hotel: int, routes: List[List[int]]) -> float:
+    total = 0.0
+    for route in routes:
+        path = [hotel, *route, hotel]
+        total += float(dist[path[:-1], path[1:]].sum())
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--stops-min", type=int, default=6)
+    parser.add_argument("--stops-max", type=int, default=8)
+    parser.add_argument("--pace", choices=sorted(PACE_WINDOWS), default="moderate")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    matrix_ms, plan_ms, before, after, moved = [], [], [], [], []
+    for _ in range(args.repeat):
+        coords, durations, days, hotel = _trip(args)
+        start = time.perf_counter()
+        dist = haversine_matrix(coords)
+        matrix_ms.append((time.perf_counter() - start) * 1000)
+
+        router = DayRouter(dist, durations, PACE_WINDOWS[args.pace])
+        start = time.perf_counter()
+        routes = router.plan(days, [hotel] * len(days))
+        plan_ms.append((time.perf_counter() - start) * 1000)
+
+        before.append(_distance(dist, hotel, days))
+        after.append(_distance(dist, hotel, routes))
+        moved.append(sum(
+            len(set(route) - set(day)) for route, day in zip(routes, days)
+        ))
+
+    stops = sum(len(day) for day in days)
+    print(f"{args.days} days, ~{stops} stops, pace={args.pace}")
+    print(f"distance matrix  median={statistics.median(matrix_ms):7.2f}ms")
+    print(f"order+rebalance  median={statistics.median(plan_ms):7.2f}ms "
+          f"max={max(plan_ms):7.2f}ms")
+    print(f"route length     {statistics.mean(before):7.1f}km -> "
+          f"{statistics.mean(after):7.1f}km "
+          f"({statistics.mean(moved):.1f} stops moved between days)")
+
+
+if __name__ == "__main__":
+    main()
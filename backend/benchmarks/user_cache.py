@@ -0,0 +1,61 @@
+"""
+Size and cost of the user cache entry format.
+
+Compares the binary entry written to Redis (schema tag + marshalled field
+values) with the JSON dump of the same travel preferences, then times a
+read served by the worker LRU against decoding an entry fetched from Redis
+(the network round trip is not included). Run from the backend directory:
+
+    python -m benchmarks.user_cache --destinations 10 --repeat 100000
+"""
+import argparse
+import asyncio
+import timeit
+
+from app.api.v1.endpoints.users import TravelPreferences
+from app.services.user_cache import UserCache, decode_model, encode_model
+
+
+async def run(args: argparse.Namespace) -> None:
+    preferences = TravelPreferences(
+        preferred_destinations=[f"Destination {i}" for i in range(args.destinations)],
+        travel_style="moderate",
+        interests=["culture", "food", "history", "hiking"],
+        budget_range="medium",
+        dietary_restrictions=["vegetarian"],
+        accessibility_needs=[],
+    )
+    binary = encode_model(preferences)
+    text = preferences.model_dump_json().encode()
+    print(f"{'format':<8} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    for name, payload, encode, decode in (
+        ("json", text, preferences.model_dump_json,
+         lambda: TravelPreferences.model_validate_json(text)),
+        ("binary", binary, lambda: encode_model(preferences),
+         lambda: decode_model(TravelPreferences, binary)),
+    ):
+        encode_us = timeit.timeit(encode, number=args.repeat) / args.repeat * 1e6
+        decode_us = timeit.timeit(decode, number=args.repeat) / args.repeat * 1e6
+        print(f"{name:<8} {len(payload):>6} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+    async def load(user_id: str) -> TravelPreferences:
+        return preferences
+
+    cache = UserCache("benchmark", TravelPreferences, use_redis=False)
+    await cache.get("user", load)
+    start = asyncio.get_running_loop().time()
+    for _ in range(args.repeat):
+        await cache.get("user", load)
+    local_us = (asyncio.get_running_loop().time() - start) / args.repeat * 1e6
+    print(f"worker LRU hit: {local_us:.2f}us per read")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--destinations", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=100000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+
+# Agents are built at import time and need a key; no request reaches OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from redis.asyncio import Redis  # noqa: E402
+
+
+@pytest.fixture
+def client() -> TestClient:
+    """API client without startup events (no Redis, indexes or monitors)."""
+    from app.main import app
+
+    return TestClient(app, base_url="http://localhost")
+
+
+@pytest.fixture(autouse=True)
+def _forget_revocations():
+    """Tests share one process; revocations must not leak between them."""
+    from app.core.security import revoked_subjects, verified_tokens
+
+    yield
+    revoked_subjects.replace({})
+    verified_tokens.clear()
+
+
+@pytest.fixture
+def auth_headers():
+    from app.core.security import create_access_token
+
+    def make(subject: str = "traveler@example.com"):
+        token = create_access_token({"sub": subject})
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.aioredis.FakeRedis()
+
+
+@pytest.fixture
+def unreachable_redis():
+    """Returns a fresh client for a port nothing listens on."""
+    return lambda: Redis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.1)
+
+
+@pytest.fixture(scope="session")
+def _stub_server():
+    from tests.stub_server import StubServer
+
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def stub_server(_stub_server):
+    _stub_server.reset()
+    return _stub_server
+
+
+@pytest.fixture
+def stub_agent(stub_server):
+    """Builds agents whose OpenAI and Anthropic calls go to the stub server."""
+    import anthropic
+    import openai
+
+    from app.ai.agents.base_agent import BaseAgent
+    from app.ai.registry import SharedLLMClients
+
+    class StubAgent(BaseAgent):
+        def get_system_prompt(self) -> str:
+            return "Answer in JSON."
+
+        async def execute(self, input_data):
+            return {}
+
+    def make(model: str = "gpt-4", agent_class=StubAgent, **kwargs) -> BaseAgent:
+        clients = SharedLLMClients()
+        clients._openai = openai.AsyncOpenAI(
+            api_key="sk-test", base_url=f"{stub_server.url}/v1", max_retries=0
+        )
+        clients._anthropic = anthropic.AsyncAnthropic(
+            api_key="sk-ant-test", base_url=stub_server.url, max_retries=0
+        )
+        return agent_class(model=model, clients=clients, **kwargs)
+
+    return make
@@ -0,0 +1,151 @@
+"""Local HTTP server with scripted answers, for external API client tests."""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+@dataclass
+class Reply:
+    status: int = 200
+    json: Any = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    delay: float = 0.0
+    # Served as a text/event-stream of (event, data) pairs instead of JSON
+    events: Optional[List[Tuple[str, Any]]] = None
+
+
+def chat_completion(text: str, model: str = "gpt-4") -> Reply:
+    """An OpenAI chat completions answer carrying ``text``."""
+    return Reply(json={
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+    })
+
+
+def anthropic_completion(text: str, model: str = "claude-2") -> Reply:
+    """An Anthropic (legacy) completions answer carrying ``text``."""
+    return Reply(json={
+        "id": "compl-1",
+        "type": "completion",
+        "completion": text,
+        "stop_reason": "stop_sequence",
+        "model": model,
+    })
+
+
+def anthropic_stream(*texts: str, model: str = "claude-2", delay: float = 0.0) -> Reply:
+    """An Anthropic completions stream sending ``texts`` in order."""
+    return Reply(delay=delay, events=[
+        ("completion", {
+            "id": "compl-1",
+            "type": "completion",
+            "completion": text,
+            "stop_reason": None,
+            "model": model,
+        })
+        for text in texts
+    ])
+
+
+@dataclass
+class Received:
+    method: str
+    path: str
+    params: Dict[str, str]
+    form: Dict[str, str]
+    headers: Dict[str, str]
+    json: Any = None
+
+
+class StubServer:
+    """
+    Serves scripted replies on 127.0.0.1 from a background thread.
+
+    ``reply(method, path, *replies)`` queues answers for a route; the last
+    one is repeated. Unscripted routes answer 404.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], List[Reply]] = {}
+        self.received: List[Received] = []
+        self.inflight = 0
+        self.max_inflight = 0
+        methods = ["GET", "POST", "PUT", "DELETE"]
+        app = Starlette(routes=[Route("/{path:path}", self._handle, methods=methods)])
+        config = uvicorn.Config(
+            app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"
+        )
+        self._server = uvicorn.Server(config)
+        self._thread: Optional[threading.Thread] = None
+        self.url = ""
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def reset(self) -> None:
+        self._routes.clear()
+        self.received.clear()
+        self.max_inflight = 0
+
+    def reply(self, method: str, path: str, *replies: Reply) -> None:
+        self._routes[(method, path)] = list(replies)
+
+    def calls(self, method: str, path: str) -> List[Received]:
+        return [r for r in self.received if r.method == method and r.path == path]
+
+    async def _handle(self, request: Request) -> Response:
+        form = dict(await request.form()) if request.method == "POST" else {}
+        is_json = request.headers.get("content-type", "").startswith("application/json")
+        self.received.append(Received(
+            request.method,
+            request.url.path,
+            dict(request.query_params),
+            {key: str(value) for key, value in form.items()},
+            dict(request.headers),
+            await request.json() if is_json else None,
+        ))
+        replies = self._routes.get((request.method, request.url.path))
+        if not replies:
+            return JSONResponse({"error": "not scripted"}, status_code=404)
+        reply = replies.pop(0) if len(replies) > 1 else replies[0]
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(reply.delay)
+        finally:
+            self.inflight -= 1
+        if reply.events is not None:
+            body = "".join(
+                f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                for event, data in reply.events
+            )
+            return Response(body, media_type="text/event-stream")
+        return JSONResponse(reply.json, status_code=reply.status, headers=reply.headers)
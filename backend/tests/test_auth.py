@@ -0,0 +1,22 @@
+def test_register_returns_the_new_user(client):
+    response = client.post("/api/v1/auth/register", json={
+        "email": "new@example.com",
+        "password": "correct horse battery",
+        "full_name": "New Traveler",
+    })
+
+    assert response.status_code == 201
+    assert response.json()["email"] == "new@example.com"
+
+
+def test_login_tokens_authenticate(client):
+    response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "new@example.com", "password": "correct horse battery"},
+    )
+    token = response.json()["access_token"]
+
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert me.status_code == 200
+    assert me.json()["email"] == "new@example.com"
@@ -0,0 +1,106 @@
+import pytest
+from langchain.schema import HumanMessage
+
+from app.ai.agents.base_agent import BaseAgent
+from app.core.config import settings
+from tests.stub_server import anthropic_completion, anthropic_stream, chat_completion
+
+COMPLETIONS = "/v1/chat/completions"
+ANTHROPIC_COMPLETIONS = "/v1/complete"
+
+
+@pytest.fixture
+def anthropic_key(monkeypatch):
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "sk-ant-test")
+
+
+@pytest.mark.asyncio
+async def test_json_mode_is_sent_to_models_that_support_it(stub_server, stub_agent):
+    stub_server.reply("POST", COMPLETIONS, chat_completion('{"ok": true}'))
+    agent = stub_agent("gpt-4-turbo")
+
+    text = await agent._generate_response("Hi", json_mode=True)
+
+    assert text == '{"ok": true}'
+    (call,) = stub_server.calls("POST", COMPLETIONS)
+    assert call.json["model"] == "gpt-4-turbo"
+    assert call.json["response_format"] == {"type": "json_object"}
+    assert [m["role"] for m in call.json["messages"]] == ["system", "user"]
+
+
+@pytest.mark.asyncio
+async def test_json_mode_is_not_sent_to_models_without_it(stub_server, stub_agent):
+    stub_server.reply("POST", COMPLETIONS, chat_completion('{"ok": true}'))
+    agent = stub_agent("gpt-4")
+
+    await agent._generate_response("Hi", json_mode=True)
+
+    (call,) = stub_server.calls("POST", COMPLETIONS)
+    assert "response_format" not in call.json
+
+
+def test_instruct_models_use_the_completions_api(stub_agent):
+    agent: BaseAgent = stub_agent("gpt-3.5-turbo-instruct")
+
+    assert agent.llm._llm_type == "openai"
+    assert not agent._supports_json_mode()
+
+
+@pytest.mark.asyncio
+async def test_claude_requests_carry_only_api_parameters(
+    stub_server, stub_agent, anthropic_key
+):
+    stub_server.reply("POST", ANTHROPIC_COMPLETIONS, anthropic_completion("Hello"))
+    agent = stub_agent("claude-2")
+
+    result = await agent.llm.agenerate([[HumanMessage(content="Hi")]])
+
+    assert result.generations[0][0].text == "Hello"
+    (call,) = stub_server.calls("POST", ANTHROPIC_COMPLETIONS)
+    assert call.json["model"] == "claude-2"
+    assert call.json["max_tokens_to_sample"] == agent.max_tokens
+    assert "api_key" not in call.json
+    assert call.headers["x-api-key"] == "sk-ant-test"
+
+
+@pytest.mark.asyncio
+async def test_claude_output_limit_is_max_tokens_to_sample(
+    stub_server, stub_agent, anthropic_key
+):
+    stub_server.reply("POST", ANTHROPIC_COMPLETIONS, anthropic_completion("Hello"))
+    agent = stub_agent("claude-2")
+
+    text = await agent._generate_response("Hi", max_tokens=300, json_mode=True)
+
+    assert text == "Hello"
+    (call,) = stub_server.calls("POST", ANTHROPIC_COMPLETIONS)
+    assert call.json["max_tokens_to_sample"] == 300
+    assert "max_tokens" not in call.json
+    assert "response_format" not in call.json
+
+
+@pytest.mark.asyncio
+async def test_claude_streams_with_max_tokens_to_sample(
+    stub_server, stub_agent, anthropic_key
+):
+    stub_server.reply("POST", ANTHROPIC_COMPLETIONS, anthropic_stream("Hel", "lo"))
+    agent = stub_agent("claude-2")
+
+    chunks = [chunk async for chunk in agent._stream_response("Hi", max_tokens=300)]
+
+    assert "".join(chunks) == "Hello"
+    (call,) = stub_server.calls("POST", ANTHROPIC_COMPLETIONS)
+    assert call.json["stream"] is True
+    assert call.json["max_tokens_to_sample"] == 300
+    assert "max_tokens" not in call.json
+
+
+@pytest.mark.asyncio
+async def test_openai_output_limit_is_max_tokens(stub_server, stub_agent):
+    stub_server.reply("POST", COMPLETIONS, chat_completion("Hello"))
+    agent = stub_agent("gpt-4")
+
+    await agent._generate_response("Hi", max_tokens=300)
+
+    (call,) = stub_server.calls("POST", COMPLETIONS)
+    assert call.json["max_tokens"] == 300
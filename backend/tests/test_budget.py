@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+
+from app.ai.budget import _Knapsack, optimize_budget
+from app.ai.schemas import ActivityOption, FlightOption, HotelOption
+
+
+def flight(price: float, stops: int = 0) -> FlightOption:
+    return FlightOption(
+        airline="AF", departure_time="08:00", arrival_time="10:00",
+        duration="2h", price=price, stops=stops,
+    )
+
+
+def hotel(price: float, rating: float = 4.0) -> HotelOption:
+    return HotelOption(
+        name=f"Hotel {price}", rating=rating, price_per_night=price,
+        location="Centre", amenities=[],
+    )
+
+
+def test_no_bundle_when_cheapest_pair_is_over_budget_without_activities():
+    assert optimize_budget([flight(3000)], [hotel(100)], [], budget=100,
+                           travelers=1, nights=1) == []
+
+
+def test_no_bundle_when_cheapest_pair_is_over_budget_with_activities():
+    activities = [ActivityOption(name="Museum", price=10)]
+    assert optimize_budget([flight(3000)], [hotel(100)], activities, budget=100,
+                           travelers=1, nights=1) == []
+
+
+def test_bundles_fit_budget_and_are_best_first():
+    flights = [flight(200), flight(400), flight(150, stops=2)]
+    hotels = [hotel(80, 3.0), hotel(150, 4.8), hotel(300, 5.0)]
+    bundles = optimize_budget(flights, hotels, [], budget=1000, travelers=2, nights=3)
+
+    assert bundles
+    assert all(bundle.total <= 1000 for bundle in bundles)
+    scores = [bundle.score for bundle in bundles]
+    assert scores == sorted(scores, reverse=True)
+    breakdown = bundles[0].breakdown
+    assert bundles[0].total == breakdown.flights + breakdown.accommodation
+
+
+def test_activities_respect_remaining_budget_and_preferences():
+    activities = [
+        ActivityOption(name="Food tour", price=60, category="food"),
+        ActivityOption(name="Museum", price=20, category="culture"),
+        ActivityOption(name="Cooking class", price=90, category="food"),
+    ]
+    bundle = optimize_budget([flight(100)], [hotel(100)], activities, budget=360,
+                             travelers=1, nights=1, preferences=["food"])[0]
+
+    assert bundle.total <= 360
+    assert {a.name for a in bundle.activities} == {"Food tour", "Cooking class"}
+
+
+def test_knapsack_matches_brute_force():
+    rng = np.random.default_rng(7)
+    values = rng.uniform(0.5, 1.0, 10)
+    costs = rng.uniform(5, 50, 10).round()
+    capacity = 120.0
+
+    best = max(
+        sum(values[list(combo)])
+        for r in range(len(values) + 1)
+        for combo in itertools.combinations(range(len(values)), r)
+        if costs[list(combo)].sum() <= capacity
+    )
+    value, picked = _Knapsack(values, costs).solve(capacity)
+
+    assert np.isclose(value, best)
+    assert costs[picked].sum() <= capacity
+
+
+def test_upper_bounds_exclude_negative_capacities():
+    empty = _Knapsack(np.array([]), np.array([]))
+    assert list(empty.upper_bounds(np.array([-1.0, 0.0, 5.0]))) == [-np.inf, 0.0, 0.0]
@@ -0,0 +1,148 @@
+import asyncio
+import itertools
+
+import pytest
+from langchain.schema import HumanMessage
+from prometheus_client import REGISTRY
+
+from app.ai.hedging import provider_health
+from app.ai.tokens import count_tokens
+from app.core.config import settings
+from tests.stub_server import Reply, anthropic_stream
+
+_names = itertools.count()
+
+
+class FakeLLM:
+    """Streams ``text`` after ``first_token`` seconds, or raises ``error``."""
+
+    def __init__(self, text="", first_token=0.0, error=None, per_chunk=0.0):
+        self.text = text
+        self.first_token = first_token
+        self.error = error
+        self.per_chunk = per_chunk
+        self.started = 0
+        self.cancelled = False
+
+    async def astream(self, messages, **kwargs):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.first_token)
+            if self.error is not None:
+                raise self.error
+            for word in self.text.split(" "):
+                yield word + " "
+                await asyncio.sleep(self.per_chunk)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def _models(count: int):
+    """Fresh model names, so health state does not leak between tests."""
+    names = [f"gpt-4-hedge-{next(_names)}" for _ in range(count)]
+    for name in names:
+        provider_health(name).default_delay = 0.05
+    return names
+
+
+def _agent(stub_agent, *llms, hedging=True):
+    names = _models(len(llms))
+    agent = stub_agent(names[0], fallback_models=names[1:], hedging=hedging)
+    agent.llms = list(zip(names, llms))
+    return agent
+
+
+def _tokens(model: str, kind: str) -> float:
+    labels = {"agent": "StubAgent", "model": model, "kind": kind}
+    return REGISTRY.get_sample_value("vacanceia_llm_tokens_total", labels) or 0.0
+
+
+async def _generate(agent) -> str:
+    text = await agent._generate_hedged([], None, False)
+    return text.strip()
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(stub_agent):
+    primary, backup = FakeLLM("primary answer"), FakeLLM("backup answer")
+    agent = _agent(stub_agent, primary, backup)
+
+    assert await _generate(agent) == "primary answer"
+    assert backup.started == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled(stub_agent):
+    primary = FakeLLM("primary answer", first_token=1.0)
+    backup = FakeLLM("backup answer")
+    agent = _agent(stub_agent, primary, backup)
+
+    assert await _generate(agent) == "backup answer"
+    await asyncio.sleep(0)
+    assert primary.cancelled
+
+
+@pytest.mark.asyncio
+async def test_first_token_wins_over_a_later_backup(stub_agent):
+    # The primary starts streaming after the hedge fired, before the backup
+    primary = FakeLLM("primary answer", first_token=0.08, per_chunk=0.05)
+    backup = FakeLLM("backup answer", first_token=0.5)
+    agent = _agent(stub_agent, primary, backup)
+
+    assert await _generate(agent) == "primary answer"
+    assert backup.started == 1
+    assert backup.cancelled
+
+
+@pytest.mark.asyncio
+async def test_errors_fail_over_to_the_next_model(stub_agent):
+    primary = FakeLLM(error=RuntimeError("primary down"))
+    backup = FakeLLM("backup answer")
+    agent = _agent(stub_agent, primary, backup, hedging=False)
+
+    assert await _generate(agent) == "backup answer"
+
+
+@pytest.mark.asyncio
+async def test_last_error_is_raised_when_every_model_fails(stub_agent):
+    agent = _agent(
+        stub_agent,
+        FakeLLM(error=RuntimeError("primary down")),
+        FakeLLM(error=ValueError("backup down")),
+    )
+
+    with pytest.raises(ValueError, match="backup down"):
+        await _generate(agent)
+
+
+@pytest.mark.asyncio
+async def test_tokens_of_the_winning_attempt_are_counted(stub_agent):
+    agent = _agent(stub_agent, FakeLLM("primary answer"), FakeLLM("backup answer"))
+    primary, backup = (model for model, _ in agent.llms)
+
+    await _generate(agent)
+
+    assert _tokens(primary, "completion") == count_tokens("primary answer ", primary)
+    assert _tokens(primary, "prompt") > 0
+    assert _tokens(backup, "completion") == 0
+
+
+@pytest.mark.asyncio
+async def test_openai_errors_fail_over_to_claude(stub_server, stub_agent, monkeypatch):
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "sk-ant-test")
+    primary = f"gpt-4-hedge-{next(_names)}"
+    backup = f"claude-2-hedge-{next(_names)}"
+    down = Reply(status=500, json={"error": {"message": "primary down"}})
+    stub_server.reply("POST", "/v1/chat/completions", down)
+    stub_server.reply("POST", "/v1/complete", anthropic_stream("backup ", "answer"))
+    agent = stub_agent(primary, fallback_models=[backup], hedging=False)
+    assert [model for model, _ in agent.llms] == [primary, backup]
+
+    text = await agent._generate_hedged([HumanMessage(content="Hi")], 300, False)
+
+    assert text == "backup answer"
+    (call,) = stub_server.calls("POST", "/v1/complete")
+    assert call.json["model"] == backup
+    assert call.json["max_tokens_to_sample"] == 300
+    assert _tokens(backup, "completion") == count_tokens("backup answer", backup)
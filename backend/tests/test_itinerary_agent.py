@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from app.ai.agents.itinerary_agent import ItineraryAgent
+from tests.stub_server import chat_completion
+
+COMPLETIONS = "/v1/chat/completions"
+
+
+def _day(number: int, cost: float = 100.0) -> dict:
+    return {
+        "day": number,
+        "morning": "Museum",
+        "lunch": "Bistro",
+        "afternoon": "Park",
+        "evening": "Walk",
+        "dinner": "Brasserie",
+        "accommodation": "Hotel",
+        "estimated_cost": cost,
+        "tips": "Book ahead",
+    }
+
+
+def _cut_after_last_day(days: int) -> str:
+    plans = json.dumps([_day(n, 100.0 * n) for n in range(1, days + 1)])
+    return '{"daily_plans": ' + plans + ', "overview": "A relaxed wee'
+
+
+def _input(duration: int) -> dict:
+    return {"destination": "Lyon, France", "duration": duration, "pace": "relaxed"}
+
+
+@pytest.fixture
+def agent(stub_agent) -> ItineraryAgent:
+    agent = stub_agent(agent_class=ItineraryAgent)
+    agent.use_knowledge = False
+    agent.route_optimization = False
+    agent.chunked_generation = False
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_answer_cut_off_after_the_last_day_is_not_continued(stub_server, agent):
+    stub_server.reply("POST", COMPLETIONS, chat_completion(_cut_after_last_day(3)))
+
+    result = await agent.execute(_input(3))
+
+    assert len(stub_server.calls("POST", COMPLETIONS)) == 1
+    assert [day["day"] for day in result["daily_plans"]] == [1, 2, 3]
+    assert result["total_estimated_cost"] == 600.0
+
+
+@pytest.mark.asyncio
+async def test_answer_cut_off_mid_trip_is_continued(stub_server, agent):
+    first = '{"daily_plans": ' + json.dumps([_day(1)])[:-1] + ', {"day": 2, "mor'
+    rest = json.dumps({"daily_plans": [_day(2), _day(3)], "total_estimated_cost": 200})
+    stub_server.reply(
+        "POST", COMPLETIONS, chat_completion(first), chat_completion(rest)
+    )
+
+    result = await agent.execute(_input(3))
+
+    calls = stub_server.calls("POST", COMPLETIONS)
+    assert len(calls) == 2
+    assert "Write only days\n2 to 3" in calls[1].json["messages"][1]["content"]
+    assert [day["day"] for day in result["daily_plans"]] == [1, 2, 3]
+    # The continuation's total only covers days 2-3, so it is summed
+    assert result["total_estimated_cost"] == 300.0
+
+
+@pytest.mark.asyncio
+async def test_stream_cut_off_after_the_last_day_is_not_continued(agent):
+    calls = []
+
+    async def stream_response(message, **kwargs):
+        calls.append(message)
+        text = _cut_after_last_day(2)
+        for start in range(0, len(text), 40):
+            yield text[start:start + 40]
+
+    agent._stream_response = stream_response
+
+    events = [event async for event in agent.stream(_input(2))]
+
+    assert len(calls) == 1
+    assert [kind for kind, _ in events] == ["day", "day", "summary"]
+    assert events[-1][1]["total_estimated_cost"] == 300.0
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.ai.json_stream import IncrementalArrayParser, document_closed
+
+DOCUMENT = json.dumps({
+    "overview": "Braces { and [ in a string, and an \"escaped\" quote",
+    "hotels": [{"name": "not a day"}],
+    "daily_plans": [
+        {"day": 1, "stops": [{"name": "Louvre"}], "tips": "Bring {cash}"},
+        {"day": 2, "stops": [], "tips": "Back\\slash \" and }"},
+    ],
+    "total_estimated_cost": 420.0,
+})
+
+
+def _feed_in_chunks(text: str, size: int):
+    parser = IncrementalArrayParser("daily_plans")
+    items = []
+    for start in range(0, len(text), size):
+        items += parser.feed(text[start:start + size])
+    return parser, items
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(DOCUMENT)])
+def test_items_are_the_same_for_any_chunking(size):
+    parser, items = _feed_in_chunks(DOCUMENT, size)
+
+    assert items == json.loads(DOCUMENT)["daily_plans"]
+    assert parser.closed
+    assert parser.result() == json.loads(DOCUMENT)
+
+
+def test_item_is_returned_by_the_chunk_that_closes_it():
+    parser = IncrementalArrayParser("daily_plans")
+    head, tail = '{"daily_plans": [{"day": 1, "tips": "x"', '}, {"day": 2'
+
+    assert parser.feed(head) == []
+    assert parser.feed(tail) == [{"day": 1, "tips": "x"}]
+    assert parser.text[parser.item_end:] == ', {"day": 2'
+    assert not parser.closed
+
+
+def test_prose_and_code_fences_are_ignored():
+    text = 'Here you go:\n```json\n{"daily_plans": [{"day": 1}]}\n```\nEnjoy "it"!'
+
+    parser, items = _feed_in_chunks(text, 5)
+
+    assert items == [{"day": 1}]
+    assert parser.closed
+
+
+def test_arrays_under_other_keys_are_ignored():
+    text = '{"days": [{"day": 1}], "nested": {"daily_plans": [{"day": 2}]}}'
+
+    _, items = _feed_in_chunks(text, 4)
+
+    assert items == [{"day": 2}]
+
+
+def test_malformed_item_is_skipped():
+    text = '{"daily_plans": [{"day": 1,}, {"day": 2}]}'
+
+    _, items = _feed_in_chunks(text, 8)
+
+    assert items == [{"day": 2}]
+
+
+def test_document_closed():
+    assert document_closed(DOCUMENT)
+    assert document_closed("```json\n[1, 2]\n```")
+    assert not document_closed(DOCUMENT[:-1])
+    assert not document_closed('{"overview": "ends in a brace }')
+    assert not document_closed("no JSON at all")
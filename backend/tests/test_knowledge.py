@@ -0,0 +1,83 @@
+import pytest
+
+from app.ai.knowledge import (
+    KnowledgeBase,
+    chunk_document,
+    count_tokens,
+    destination_key,
+    match_destination,
+)
+
+DOCUMENT = """# Lisbon, Portugal
+
+Seven hills above the Tagus.
+
+## Getting around
+Tram 28 climbs through Alfama.
+It is crowded by mid-morning.
+
+The Viva Viagem card works on metro, trams and ferries.
+
+## Food
+Pastel de nata is best warm.
+"""
+
+KEYS = {"paris, france", "kyoto, japan", "portland, oregon", "portland, maine"}
+
+
+def test_destination_key_keeps_every_part():
+    assert destination_key("  Paris ,France ") == "paris, france"
+    assert destination_key("New  York, NY, USA") == "new york, ny, usa"
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Paris, France", "paris, france"),
+    ("paris", "paris, france"),
+    ("Paris, Texas", None),
+    ("Cambridge, MA", None),
+    ("Portland", None),
+    ("Portland, Maine", "portland, maine"),
+])
+def test_match_destination(name, expected):
+    assert match_destination(name, KEYS) == expected
+
+
+def test_qualified_name_matches_a_bare_key():
+    assert match_destination("Kyoto, Japan", {"kyoto"}) == "kyoto"
+    both = {"kyoto", "kyoto, japan"}
+    assert match_destination("Kyoto, Japan", both) == "kyoto, japan"
+
+
+def test_notes_of_a_namesake_are_not_used():
+    knowledge = KnowledgeBase()
+    knowledge._ranges = {"paris, france": (0, 4), "kyoto, japan": (4, 9)}
+
+    assert knowledge.covers("Paris")
+    assert knowledge.covers("Paris, France")
+    assert not knowledge.covers("Paris, Texas")
+
+
+def test_chunk_document_keeps_sections_apart():
+    chunks = chunk_document(DOCUMENT, max_tokens=200)
+
+    assert {chunk.destination for chunk in chunks} == {"Lisbon, Portugal"}
+    assert [(chunk.section, chunk.text) for chunk in chunks] == [
+        ("Overview", "Seven hills above the Tagus."),
+        ("Getting around", "Tram 28 climbs through Alfama. It is crowded by "
+         "mid-morning.\nThe Viva Viagem card works on metro, trams and ferries."),
+        ("Food", "Pastel de nata is best warm."),
+    ]
+
+
+def test_chunk_document_packs_paragraphs_under_the_limit():
+    chunks = chunk_document(DOCUMENT, max_tokens=16)
+
+    sections = [chunk.section for chunk in chunks]
+    assert sections.count("Getting around") > 1
+    assert all(chunk.tokens == count_tokens(chunk.text) for chunk in chunks)
+    assert all(chunk.tokens <= 16 for chunk in chunks)
+
+
+def test_chunk_document_requires_a_title():
+    with pytest.raises(ValueError):
+        chunk_document("## Food\nPastel de nata.")
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.passwords import PasswordHasher
+
+
+@pytest.fixture
+def make_hasher():
+    hashers = []
+
+    def make(**kwargs) -> PasswordHasher:
+        hasher = PasswordHasher(**{"max_workers": 1, "rounds": 4, **kwargs})
+        hashers.append(hasher)
+        return hasher
+
+    yield make
+    for hasher in hashers:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_runs_in_another_process(make_hasher):
+    hasher = make_hasher()
+
+    assert await hasher._run(os.getpid) != os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_while_hashing(make_hasher):
+    hasher = make_hasher(rounds=12)
+    await hasher._run(os.getpid)  # worker started
+    gaps = []
+
+    async def tick():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    start = time.perf_counter()
+    await hasher.hash("correct horse battery")
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+
+    assert elapsed > 0.1
+    assert gaps and max(gaps) < elapsed / 2
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after(make_hasher):
+    hasher = make_hasher(max_pending=1)
+    first = asyncio.create_task(hasher.hash("first"))
+    await asyncio.sleep(0)
+    assert hasher.pending == 1
+
+    with pytest.raises(HTTPException) as rejected:
+        await hasher.hash("second")
+
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {"Retry-After": "1"}
+    assert (await first).startswith("$2b$04$")
+    assert hasher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_hashes_below_the_configured_cost_are_updated(make_hasher):
+    old_hash = await make_hasher(rounds=4).hash("correct horse battery")
+    hasher = make_hasher(rounds=5)
+
+    valid, new_hash = await hasher.verify_and_update("correct horse battery", old_hash)
+
+    assert valid
+    assert new_hash.startswith("$2b$05$")
+    assert await hasher.verify_and_update("correct horse battery", new_hash) == (
+        True,
+        None,
+    )
+    assert await hasher.verify_and_update("wrong", old_hash) == (False, None)
@@ -0,0 +1,303 @@
+import asyncio
+import time
+from datetime import datetime, time as day_time, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import http
+from app.services.amadeus import AmadeusClient
+from app.services.clients import ProviderClients, fetch_travel_data
+from app.services.http import ProviderClient, ProviderError, RetryBudget
+from app.services.maps import GoogleMapsClient
+from app.services.weather import OpenWeatherClient
+from tests.stub_server import Reply
+
+TOKEN = "/v1/security/oauth2/token"
+LOCATIONS = "/v1/reference-data/locations"
+FLIGHTS = "/v2/shopping/flight-offers"
+HOTEL_LIST = "/v1/reference-data/locations/hotels/by-city"
+HOTEL_OFFERS = "/v3/shopping/hotel-offers"
+FORECAST = "/data/2.5/forecast"
+
+
+def _token(value: str, expires_in: int = 1800) -> Reply:
+    return Reply(json={"access_token": value, "expires_in": expires_in})
+
+
+def _amadeus(server, **kwargs) -> AmadeusClient:
+    return AmadeusClient(
+        api_key="key", api_secret="secret", base_url=server.url, http2=False, **kwargs
+    )
+
+
+def _client(server, **kwargs) -> ProviderClient:
+    kwargs.setdefault("budget", RetryBudget(ratio=1.0))
+    kwargs.setdefault("backoff", 0.0)
+    return ProviderClient(server.url, kwargs.pop("timeout", 1.0), http2=False, **kwargs)
+
+
+# Token refresh
+
+@pytest.mark.asyncio
+async def test_token_is_fetched_once_and_refreshed_ahead_of_expiry(stub_server):
+    stub_server.reply("POST", TOKEN, _token("t1", expires_in=1800))
+    stub_server.reply("GET", LOCATIONS, Reply(json={"data": []}))
+    client = _amadeus(stub_server, refresh_margin=60)
+    before = time.monotonic()
+
+    await asyncio.gather(*(client.get(LOCATIONS) for _ in range(5)))
+
+    token_calls = stub_server.calls("POST", TOKEN)
+    assert len(token_calls) == 1
+    assert token_calls[0].form["grant_type"] == "client_credentials"
+    sent = {r.headers["authorization"] for r in stub_server.calls("GET", LOCATIONS)}
+    assert sent == {"Bearer t1"}
+    # Refreshed 60s before the 1800s lifetime ends
+    assert before + 1740 <= client._refresh_at <= time.monotonic() + 1740
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_within_refresh_margin_is_replaced_before_use(stub_server):
+    stub_server.reply("POST", TOKEN, _token("t1", expires_in=60), _token("t2"))
+    stub_server.reply("GET", LOCATIONS, Reply(json={"data": []}))
+    client = _amadeus(stub_server, refresh_margin=60)
+
+    await client.get(LOCATIONS)
+    await client.get(LOCATIONS)
+
+    sent = [r.headers["authorization"] for r in stub_server.calls("GET", LOCATIONS)]
+    assert sent == ["Bearer t1", "Bearer t2"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_refreshed_once(stub_server):
+    stub_server.reply("POST", TOKEN, _token("t1"), _token("t2"))
+    stub_server.reply("GET", LOCATIONS, Reply(status=401), Reply(json={"data": []}))
+    client = _amadeus(stub_server)
+
+    assert await client.get(LOCATIONS) == {"data": []}
+    assert len(stub_server.calls("POST", TOKEN)) == 2
+    await client.aclose()
+
+
+# Retries
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_with_full_jitter(monkeypatch, stub_server):
+    stub_server.reply(
+        "GET", "/offers", Reply(503), Reply(502), Reply(json={"ok": True})
+    )
+    ceilings = []
+
+    def uniform(low: float, high: float) -> float:
+        ceilings.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(http.random, "uniform", uniform)
+    client = _client(stub_server, max_retries=2, backoff=0.1)
+
+    assert await client.get("/offers") == {"ok": True}
+    assert len(stub_server.calls("GET", "/offers")) == 3
+    assert ceilings == [(0, 0.1), (0, 0.2)]
+    await client.aclose()
+
+
+def test_retry_after_is_honoured_up_to_a_cap():
+    client = ProviderClient("http://127.0.0.1", 1.0, backoff=0.1, http2=False)
+    assert client._delay(0, httpx.Response(429, headers={"retry-after": "2"})) == 2.0
+    assert client._delay(0, httpx.Response(429, headers={"retry-after": "600"})) == 5.0
+    assert 0 <= client._delay(3, httpx.Response(503)) <= 0.8
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(stub_server):
+    stub_server.reply("GET", "/offers", Reply(400))
+    client = _client(stub_server, max_retries=2)
+
+    with pytest.raises(ProviderError) as error:
+        await client.get("/offers")
+    assert error.value.status_code == 400
+    assert len(stub_server.calls("GET", "/offers")) == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_fails_fast(stub_server):
+    stub_server.reply("GET", "/offers", Reply(503))
+    client = _client(stub_server, max_retries=2, budget=RetryBudget(0.0, 0.0))
+
+    with pytest.raises(ProviderError) as error:
+        await client.get("/offers")
+    assert error.value.status_code == 503
+    assert len(stub_server.calls("GET", "/offers")) == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_retries_stay_within_budget_ratio(stub_server):
+    stub_server.reply("GET", "/offers", Reply(503))
+    client = _client(stub_server, max_retries=3, budget=RetryBudget(0.1, 0.0))
+
+    for _ in range(20):
+        with pytest.raises(ProviderError):
+            await client.get("/offers")
+
+    # 20 requests earn 2 retries at a 10% ratio
+    assert len(stub_server.calls("GET", "/offers")) <= 22
+    await client.aclose()
+
+
+# Timeouts
+
+@pytest.mark.asyncio
+async def test_timeouts_are_retried_then_reported(stub_server):
+    stub_server.reply("GET", "/slow", Reply(delay=0.5))
+    client = _client(stub_server, timeout=0.1, max_retries=1)
+    start = time.perf_counter()
+
+    with pytest.raises(ProviderError) as error:
+        await client.get("/slow")
+
+    assert error.value.status_code is None
+    assert "Timeout" in str(error.value)
+    assert time.perf_counter() - start < 0.45
+    assert len(stub_server.calls("GET", "/slow")) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_maps_error_status_raises(stub_server):
+    stub_server.reply("GET", "/maps/api/geocode/json", Reply(json={"status": "DENIED"}))
+    client = GoogleMapsClient(api_key="key", base_url=stub_server.url, http2=False)
+
+    with pytest.raises(ProviderError):
+        await client.geocode("Lisbon")
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_geocodes_are_cached_within_bounds(stub_server):
+    found = {"lat": 38.7, "lng": -9.1}
+    stub_server.reply("GET", "/maps/api/geocode/json", Reply(json={
+        "status": "OK",
+        "results": [{"geometry": {"location": found}}],
+    }))
+    client = GoogleMapsClient(
+        api_key="key",
+        base_url=stub_server.url,
+        http2=False,
+        geocode_cache_entries=2,
+        geocode_cache_ttl=60,
+    )
+
+    for place in ("Lisbon", " lisbon", "Porto", "Faro", "Lisbon"):
+        assert await client.geocode(place) == (38.7, -9.1)
+
+    # Lisbon was evicted by Porto and Faro, so it is looked up again
+    assert len(stub_server.calls("GET", "/maps/api/geocode/json")) == 4
+    assert len(client._geocodes) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unknown_places_are_cached_until_they_expire(stub_server):
+    stub_server.reply(
+        "GET", "/maps/api/geocode/json", Reply(json={"status": "ZERO_RESULTS"})
+    )
+    client = GoogleMapsClient(
+        api_key="key", base_url=stub_server.url, http2=False, geocode_cache_ttl=0.05
+    )
+
+    assert await client.geocode("Atlantis") is None
+    assert await client.geocode("Atlantis") is None
+    await asyncio.sleep(0.1)
+    assert await client.geocode("Atlantis") is None
+
+    assert len(stub_server.calls("GET", "/maps/api/geocode/json")) == 2
+    await client.aclose()
+
+
+# Fan-out
+
+def _forecast_slot(day) -> dict:
+    moment = datetime.combine(day, day_time(12), tzinfo=timezone.utc)
+    return {
+        "dt": int(moment.timestamp()),
+        "main": {"temp_min": 12.0, "temp_max": 21.0},
+        "weather": [{"description": "clear sky"}],
+        "pop": 0.1,
+    }
+
+
+def _script_trip(server, delay: float, weather: Reply) -> None:
+    server.reply("POST", TOKEN, _token("t1"))
+    server.reply("GET", LOCATIONS, Reply(json={"data": [{"iataCode": "PAR"}]}))
+    segment = {
+        "carrierCode": "AF",
+        "departure": {"at": "2030-05-01T08:00"},
+        "arrival": {"at": "2030-05-01T10:05"},
+    }
+    server.reply("GET", FLIGHTS, Reply(delay=delay, json={"data": [{
+        "itineraries": [{"duration": "PT2H5M", "segments": [segment]}],
+        "price": {"grandTotal": "400.00"},
+        "validatingAirlineCodes": ["AF"],
+    }]}))
+    hotels = {"data": [{"hotelId": "H1"}]}
+    server.reply("GET", HOTEL_LIST, Reply(delay=delay, json=hotels))
+    server.reply("GET", HOTEL_OFFERS, Reply(delay=delay, json={"data": [{
+        "hotel": {"name": "Hotel Lumiere", "rating": "4", "cityCode": "PAR"},
+        "offers": [{"price": {"total": "300.00"}}],
+    }]}))
+    server.reply("GET", FORECAST, weather)
+
+
+def _clients(server) -> ProviderClients:
+    clients = ProviderClients()
+    clients._amadeus = _amadeus(server)
+    clients._weather = OpenWeatherClient(
+        api_key="key", base_url=server.url, http2=False, max_retries=0
+    )
+    return clients
+
+
+@pytest.mark.asyncio
+async def test_providers_are_called_in_parallel(monkeypatch, stub_server):
+    monkeypatch.setattr(settings, "OFFER_CACHE_ENABLED", False)
+    today = datetime.now(timezone.utc).date()
+    end = today + timedelta(days=2)
+    slots = [_forecast_slot(today + timedelta(days=n)) for n in range(3)]
+    _script_trip(stub_server, 0.3, Reply(delay=0.3, json={"list": slots}))
+    clients = _clients(stub_server)
+    start = time.perf_counter()
+
+    data = await fetch_travel_data(
+        "Paris", today, end, 2, origin="London", clients=clients
+    )
+
+    # Flights, the two hotel calls and the forecast would take 1.2s in sequence
+    assert time.perf_counter() - start < 1.0
+    assert stub_server.max_inflight >= 3
+    assert data.flights[0].price == 200.0
+    assert data.hotels[0].price_per_night == 150.0
+    assert len(data.weather) == 3
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failing_provider_leaves_a_partial_answer(monkeypatch, stub_server):
+    monkeypatch.setattr(settings, "OFFER_CACHE_ENABLED", False)
+    today = datetime.now(timezone.utc).date()
+    _script_trip(stub_server, 0.0, Reply(500))
+    clients = _clients(stub_server)
+
+    data = await fetch_travel_data(
+        "Paris", today, today + timedelta(days=2), 2, origin="London", clients=clients
+    )
+
+    assert data.weather == []
+    assert data.flights and data.hotels
+    await clients.aclose()
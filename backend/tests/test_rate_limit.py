@@ -0,0 +1,233 @@
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import (
+    MemoryRateLimiter,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RedisRateLimiter,
+    client_buckets,
+)
+from app.core.security import create_access_token
+
+RULES = [
+    RateLimitRule("llm", 2, prefixes=["/api/v1/search/travel"]),
+    RateLimitRule("default", 5),
+]
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _scope(path: str, ip: str = "10.0.0.1", subject: Optional[str] = None) -> Dict:
+    headers: List[Tuple[bytes, bytes]] = []
+    if subject is not None:
+        token = create_access_token({"sub": subject})
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "path": path, "headers": headers, "client": (ip, 5000)}
+
+
+async def _call(middleware, path: str, **kwargs) -> Tuple[int, Dict[str, str]]:
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(_scope(path, **kwargs), None, send)
+    start = sent[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers
+
+
+def _middleware(backend=None, shared_ip_factor=1) -> RateLimitMiddleware:
+    return RateLimitMiddleware(
+        _ok,
+        backend=backend or MemoryRateLimiter(),
+        rules=RULES,
+        shared_ip_factor=shared_ip_factor,
+    )
+
+
+def _limits(buckets) -> List[Tuple[str, int]]:
+    return [(key, rule.limit) for key, rule in buckets]
+
+
+def test_authenticated_requests_share_a_larger_ip_bucket():
+    rule = RULES[0]
+
+    assert _limits(client_buckets(_scope("/", subject="ana"), rule, 10)) == [
+        ("llm:user:ana", 2),
+        ("llm:users-ip:10.0.0.1", 20),
+    ]
+    assert _limits(client_buckets(_scope("/"), rule, 10)) == [("llm:ip:10.0.0.1", 2)]
+    bad = {**_scope("/"), "headers": [(b"authorization", b"Bearer nope")]}
+    assert _limits(client_buckets(bad, rule, 10)) == [("llm:ip:10.0.0.1", 2)]
+
+
+@pytest.mark.asyncio
+async def test_bucket_is_exhausted_then_429_with_retry_after():
+    middleware = _middleware()
+
+    statuses = [(await _call(middleware, "/api/v1/users/profile"))[0] for _ in range(5)]
+    status, headers = await _call(middleware, "/api/v1/users/profile")
+
+    assert statuses == [200] * 5
+    assert status == 429
+    assert headers["x-ratelimit-remaining"] == "0"
+    assert int(headers["retry-after"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_llm_routes_have_their_own_bucket():
+    middleware = _middleware()
+
+    for _ in range(2):
+        assert (await _call(middleware, "/api/v1/search/travel"))[0] == 200
+    assert (await _call(middleware, "/api/v1/search/travel"))[0] == 429
+    assert (await _call(middleware, "/api/v1/users/profile"))[0] == 200
+
+
+@pytest.mark.asyncio
+async def test_users_behind_one_ip_each_get_their_own_limit():
+    middleware = _middleware(shared_ip_factor=3)
+
+    statuses = [
+        (await _call(middleware, "/api/v1/search/travel", subject=f"user{n}"))[0]
+        for n in range(3)
+        for _ in range(2)
+    ]
+
+    assert statuses == [200] * 6
+
+
+@pytest.mark.asyncio
+async def test_fresh_subjects_do_not_escape_the_shared_ip_limit():
+    middleware = _middleware(shared_ip_factor=3)
+
+    statuses = [
+        (await _call(middleware, "/api/v1/search/travel", subject=f"user{n}"))[0]
+        for n in range(8)
+    ]
+
+    assert statuses == [200] * 6 + [429] * 2
+
+
+@pytest.mark.asyncio
+async def test_anonymous_requests_keep_the_plain_ip_limit():
+    middleware = _middleware(shared_ip_factor=3)
+
+    statuses = [(await _call(middleware, "/api/v1/search/travel"))[0] for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_user_limit_applies_across_ips():
+    middleware = _middleware()
+
+    statuses = [
+        (await _call(middleware, "/api/v1/search/travel", ip=f"10.0.0.{n}",
+                     subject="ana"))[0]
+        for n in range(3)
+    ]
+
+    assert statuses == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_refused_requests_do_not_drain_the_ip_bucket():
+    middleware = _middleware()
+    for _ in range(5):
+        await _call(middleware, "/api/v1/users/profile", ip="10.0.0.1", subject="ana")
+    # Refused by ana's own bucket before the second IP's is charged
+    for _ in range(4):
+        status, _ = await _call(
+            middleware, "/api/v1/users/profile", ip="10.0.0.2", subject="ana"
+        )
+        assert status == 429
+
+    statuses = [
+        (await _call(middleware, "/api/v1/users/profile", ip="10.0.0.2",
+                     subject="bob"))[0]
+        for _ in range(5)
+    ]
+
+    assert statuses == [200] * 5
+
+
+@pytest.mark.asyncio
+async def test_refused_requests_do_not_drain_the_user_bucket():
+    middleware = _middleware()
+    for _ in range(5):
+        await _call(middleware, "/api/v1/users/profile", ip="10.0.0.1", subject="bob")
+    # Refused by the shared IP bucket: ana's own bucket is left untouched
+    for _ in range(3):
+        status, headers = await _call(
+            middleware, "/api/v1/users/profile", ip="10.0.0.1", subject="ana"
+        )
+        assert status == 429
+        assert int(headers["retry-after"]) >= 1
+
+    statuses = [
+        (await _call(middleware, "/api/v1/users/profile", ip="10.0.0.2",
+                     subject="ana"))[0]
+        for _ in range(6)
+    ]
+
+    assert statuses == [200] * 5 + [429]
+
+
+@pytest.mark.asyncio
+async def test_headers_report_the_tightest_bucket():
+    middleware = _middleware()
+    for _ in range(3):
+        await _call(middleware, "/api/v1/users/profile", subject="ana")
+
+    _, headers = await _call(middleware, "/api/v1/users/profile", subject="bob")
+
+    # bob's bucket has 4 left, the shared IP bucket 1
+    assert headers["x-ratelimit-remaining"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_redis_buckets_are_shared_between_workers(monkeypatch, fake_redis):
+    monkeypatch.setattr(rate_limit, "get_redis", lambda: fake_redis)
+    workers = [_middleware(RedisRateLimiter()) for _ in range(2)]
+
+    statuses = [(await _call(w, "/api/v1/search/travel"))[0] for w in workers * 2]
+
+    assert statuses == [200, 200, 429, 429]
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_buckets(monkeypatch, unreachable_redis):
+    monkeypatch.setattr(rate_limit, "get_redis", unreachable_redis)
+    middleware = _middleware(RedisRateLimiter())
+
+    statuses = [(await _call(middleware, "/api/v1/search/travel"))[0] for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_redis_charges_every_bucket_or_none(monkeypatch, fake_redis):
+    monkeypatch.setattr(rate_limit, "get_redis", lambda: fake_redis)
+    middleware = _middleware(RedisRateLimiter())
+    for _ in range(2):
+        await _call(middleware, "/api/v1/search/travel", ip="10.0.0.1", subject="bob")
+
+    refused, _ = await _call(
+        middleware, "/api/v1/search/travel", ip="10.0.0.1", subject="ana"
+    )
+    statuses = [
+        (await _call(middleware, "/api/v1/search/travel", ip="10.0.0.2",
+                     subject="ana"))[0]
+        for _ in range(3)
+    ]
+
+    assert refused == 429
+    assert statuses == [200, 200, 429]
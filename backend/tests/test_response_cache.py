@@ -0,0 +1,130 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from app.ai import cache as cache_module
+from app.ai.cache import ResponseCache, SemanticCache
+from tests.stub_server import chat_completion
+
+pytest.importorskip("faiss")
+
+COMPLETIONS = "/v1/chat/completions"
+
+SYSTEM = "You are a travel researcher."
+
+
+class WordEncoder:
+    """Bag-of-words embeddings: texts sharing words are similar."""
+
+    dim = 256
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(",", " ").split():
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+def _cache() -> ResponseCache:
+    semantic = SemanticCache(threshold=0.8)
+    semantic._encoder = WordEncoder()
+    return ResponseCache(use_redis=False, semantic=semantic)
+
+
+def _message(destination: str, budget: int) -> str:
+    return f"Research {destination} for 2 travelers, budget {budget}."
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_needs_the_same_facts():
+    cache = _cache()
+    key = ("2024-06-01|2024-06-07|2000|2", "Lisbon, Portugal\nfood, museums")
+    await cache.set(
+        "ResearchAgent", SYSTEM, _message("Lisbon", 2000), "gpt-4", 0.7, "A", key
+    )
+
+    similar = ("2024-06-01|2024-06-07|2000|2", "Lisbon Portugal\nmuseums, food")
+    message = _message("Lisbon, Portugal", 2000)
+    assert await cache.get(
+        "ResearchAgent", SYSTEM, message, "gpt-4", 0.7, similar
+    ) == "A"
+
+    other_budget = ("2024-06-01|2024-06-07|9000|2", key[1])
+    assert await cache.get(
+        "ResearchAgent", SYSTEM, _message("Lisbon", 9000), "gpt-4", 0.7, other_budget
+    ) is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_is_skipped_without_a_key():
+    cache = _cache()
+    key = ("7|moderate", "Rome\nhistory")
+    await cache.set("ItineraryAgent", SYSTEM, "Plan Rome", "gpt-4", 0.7, "A", key)
+
+    assert await cache.get(
+        "ItineraryAgent", SYSTEM, "Plan Rome, please", "gpt-4", 0.7
+    ) is None
+    assert await cache.get(
+        "ItineraryAgent", SYSTEM, "Plan Rome, please", "gpt-4", 0.7, key
+    ) == "A"
+
+
+@pytest.mark.asyncio
+async def test_cut_off_answers_are_not_cached(stub_server, stub_agent):
+    agent = stub_agent()
+    agent.cache = ResponseCache(use_redis=False)
+    agent.cache_responses = True
+    stub_server.reply(
+        "POST",
+        COMPLETIONS,
+        chat_completion('{"daily_plans": [{"day": 1}, {"da'),
+        chat_completion('{"daily_plans": [{"day": 1}]}'),
+    )
+
+    cut_off = await agent._generate_response("Plan", json_mode=True)
+    complete = await agent._generate_response("Plan", json_mode=True)
+    cached = await agent._generate_response("Plan", json_mode=True)
+
+    assert cut_off.endswith('{"da')
+    assert complete == cached == '{"daily_plans": [{"day": 1}]}'
+    assert len(stub_server.calls("POST", COMPLETIONS)) == 2
+
+
+@pytest.mark.asyncio
+async def test_uncached_calls_bypass_the_cache(stub_server, stub_agent):
+    agent = stub_agent()
+    agent.cache = ResponseCache(use_redis=False)
+    agent.cache_responses = True
+    stub_server.reply("POST", COMPLETIONS, chat_completion('{"ok": true}'))
+
+    await agent._generate_response("Continue", cache=False)
+    await agent._generate_response("Continue", cache=False)
+
+    assert len(stub_server.calls("POST", COMPLETIONS)) == 2
+    assert len(agent.cache.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_load_failure_does_not_fail_the_call(
+    monkeypatch, stub_server, stub_agent
+):
+    def unreachable_hub(model_name):
+        raise OSError(f"cannot download {model_name}")
+
+    monkeypatch.setattr(cache_module, "load_encoder", unreachable_hub)
+    agent = stub_agent()
+    agent.cache = ResponseCache(use_redis=False, semantic=SemanticCache())
+    agent.cache_responses = True
+    stub_server.reply("POST", COMPLETIONS, chat_completion('{"ok": true}'))
+    key = ("7|moderate", "Rome\nhistory")
+
+    text = await agent._generate_response("Plan Rome", semantic_key=key)
+
+    assert text == '{"ok": true}'
+    assert agent.cache.semantic.available is False
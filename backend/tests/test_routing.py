@@ -0,0 +1,128 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.ai.routing import (
+    PACE_WINDOWS,
+    DayRouter,
+    haversine_matrix,
+    optimize_itinerary_routes,
+    solve_tour,
+)
+
+HOTEL = (48.8566, 2.3522)
+
+
+class PlacesStub:
+    """Maps client answering geocodes from a fixed table."""
+
+    configured = True
+
+    def __init__(self, places):
+        self.places = places
+
+    async def geocode(self, address):
+        return self.places.get(address.split(",")[0])
+
+
+def _tour_length(dist, order):
+    path = [0, *order, 0]
+    return sum(dist[a, b] for a, b in zip(path, path[1:]))
+
+
+def _day(number, stops, hotel="Hotel"):
+    return {
+        "day": number,
+        "accommodation": hotel,
+        "morning": "...",
+        "estimated_cost": 100.0,
+        "stops": [{"name": name, "duration_minutes": 60} for name in stops],
+    }
+
+
+def test_haversine_matrix_matches_known_distances():
+    paris, london = (48.8566, 2.3522), (51.5074, -0.1278)
+
+    dist = haversine_matrix(np.array([paris, london, paris]))
+
+    assert dist[0, 1] == pytest.approx(343.5, abs=1.0)
+    assert dist[1, 0] == dist[0, 1]
+    assert dist[0, 2] == 0.0
+
+
+def test_solve_tour_untangles_points_on_a_circle():
+    angles = [2 * math.pi * k / 9 for k in range(9)]
+    points = np.array([(math.cos(a), math.sin(a)) for a in angles])
+    shuffled = [0, *random.Random(3).sample(range(1, 9), 8)]
+    coords = points[shuffled]
+    dist = np.linalg.norm(coords[:, None] - coords[None, :], axis=-1)
+
+    order = solve_tour(dist)
+
+    assert sorted(order) == list(range(1, 9))
+    best = min(
+        _tour_length(dist, perm) for perm in itertools.permutations(range(1, 9))
+    )
+    assert _tour_length(dist, order) == pytest.approx(best)
+
+
+def test_plan_moves_stops_off_overloaded_days_only_when_there_is_room():
+    window = PACE_WINDOWS["relaxed"]  # at most 4 stops
+    coords = np.array([HOTEL] * 8) + np.linspace(0, 0.01, 8)[:, None]
+    router = DayRouter(haversine_matrix(coords), np.full(8, 30.0), window)
+
+    routes = router.plan([[0, 1, 2, 3, 4, 5], [6]], [7, 7])
+
+    assert [len(route) for route in routes] == [4, 3]
+    assert sorted(routes[0] + routes[1]) == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_plan_keeps_overloaded_day_when_no_day_has_room():
+    coords = np.array([HOTEL] * 10) + np.linspace(0, 0.01, 10)[:, None]
+    router = DayRouter(
+        haversine_matrix(coords), np.full(10, 30.0), PACE_WINDOWS["relaxed"]
+    )
+
+    routes = router.plan([[0, 1, 2, 3, 4], [5, 6, 7, 8]], [9, 9])
+
+    assert [len(route) for route in routes] == [5, 4]
+
+
+@pytest.mark.asyncio
+async def test_moved_stops_are_marked_with_their_planned_day():
+    names = [f"Sight {k}" for k in range(7)]
+    places = {name: (HOTEL[0] + 0.002 * k, HOTEL[1]) for k, name in enumerate(names)}
+    places["Hotel"] = HOTEL
+    plans = [_day(1, names[:6]), _day(2, names[6:])]
+
+    optimized = await optimize_itinerary_routes(
+        plans, "Paris, France", "relaxed", PlacesStub(places)
+    )
+
+    first, second = optimized
+    assert len(first["stops"]) == 4
+    assert all("moved_from_day" not in stop for stop in first["stops"])
+    moved = [s for s in second["stops"] if s.get("moved_from_day") == 1]
+    assert len(moved) == 2
+    assert {s["name"] for s in second["stops"]} - {s["name"] for s in moved} == {
+        "Sight 6"
+    }
+    assert all(stop["start_time"] for day in optimized for stop in day["stops"])
+    assert first["morning"] == "..."
+
+
+@pytest.mark.asyncio
+async def test_unlocated_stops_stay_on_their_day_without_a_time():
+    places = {"Hotel": HOTEL, "Louvre": (48.8606, 2.3376)}
+    plans = [_day(1, ["Louvre", "Unknown place"])]
+
+    (day,) = await optimize_itinerary_routes(
+        plans, "Paris, France", "moderate", PlacesStub(places)
+    )
+
+    assert [stop["name"] for stop in day["stops"]] == ["Louvre", "Unknown place"]
+    assert day["stops"][0]["start_time"] is not None
+    assert day["stops"][1]["start_time"] is None
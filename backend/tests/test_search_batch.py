@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_research_agent
+from app.api.v1.endpoints import search
+from app.api.v1.endpoints.search import SearchResponse
+from app.core.rate_limit import MemoryRateLimiter, RateLimitMiddleware, RateLimitRule
+
+
+def _search(destination: str) -> dict:
+    return {
+        "destination": destination,
+        "start_date": "2030-05-01",
+        "end_date": "2030-05-05",
+        "budget": 2000,
+    }
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    destinations = []
+
+    async def run_search(request, agent):
+        destinations.append(request.destination)
+        await asyncio.sleep(0)
+        if request.destination == "Atlantis":
+            raise RuntimeError("no such place")
+        return SearchResponse(
+            destination=request.destination, flights=[], hotels=[],
+            estimated_total=0.0, recommendations="",
+        )
+
+    monkeypatch.setattr(search, "run_search", run_search)
+    return destinations
+
+
+@pytest.fixture
+def batch_client(searched) -> TestClient:
+    app = FastAPI()
+    app.include_router(search.router, prefix="/api/v1/search")
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=MemoryRateLimiter(),
+        rules=[
+            RateLimitRule("llm", 5, prefixes=["/api/v1/search/travel"]),
+            RateLimitRule("default", 100),
+        ],
+    )
+    app.dependency_overrides[get_research_agent] = lambda: object()
+    return TestClient(app)
+
+
+def _lines(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_stream_with_a_summary(batch_client):
+    response = batch_client.post("/api/v1/search/travel/batch", json={
+        "searches": [_search("Lisbon"), _search("Atlantis"), _search("Lisbon")],
+    })
+
+    lines = _lines(response)
+    results = {line["index"]: line["type"] for line in lines[:-1]}
+    assert results == {0: "result", 1: "error", 2: "result"}
+    assert lines[-1]["type"] == "summary"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (2, 1)
+
+
+def test_each_distinct_search_is_charged(batch_client, searched):
+    body = {"searches": [_search(city) for city in ("Lisbon", "Porto", "Faro")]}
+
+    first = batch_client.post("/api/v1/search/travel/batch", json=body)
+    second = batch_client.post("/api/v1/search/travel/batch", json=body)
+
+    assert first.status_code == 200
+    assert first.headers["x-ratelimit-remaining"] == "2"
+    assert second.status_code == 429
+    assert "retry-after" in second.headers
+    assert len(searched) == 3
+
+
+def test_repeated_searches_are_charged_once(batch_client, searched):
+    body = {"searches": [_search("Lisbon")] * 4}
+
+    response = batch_client.post("/api/v1/search/travel/batch", json=body)
+
+    assert response.status_code == 200
+    assert response.headers["x-ratelimit-remaining"] == "4"
+    assert searched == ["Lisbon"]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.core import singleflight
+from app.core.singleflight import SingleFlight
+
+
+def _counting(calls, result="done", delay=0.05):
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return fn
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight("test", use_redis=False)
+    calls = []
+
+    results = await asyncio.gather(
+        *(flight.do("k", _counting(calls)) for _ in range(10))
+    )
+
+    assert results == ["done"] * 10
+    assert len(calls) == 1
+    assert flight.inflight() == 0
+
+
+@pytest.mark.asyncio
+async def test_call_survives_starter_leaving_while_others_wait():
+    flight = SingleFlight("test", use_redis=False)
+    calls = []
+    starter = asyncio.create_task(flight.do("k", _counting(calls)))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", _counting(calls)))
+    await asyncio.sleep(0)
+
+    starter.cancel()
+
+    assert await follower == "done"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight("test", use_redis=False)
+    started, finished = asyncio.Event(), []
+
+    async def fn():
+        started.set()
+        await asyncio.sleep(1)
+        finished.append(1)
+
+    caller = asyncio.create_task(flight.do("k", fn))
+    await started.wait()
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.sleep(0.01)
+
+    assert finished == []
+    assert flight.inflight() == 0
+
+
+@pytest.mark.asyncio
+async def test_caller_arriving_after_cancel_starts_a_new_call():
+    flight = SingleFlight("test", use_redis=False)
+    calls = []
+    first = asyncio.create_task(flight.do("k", _counting(calls, "stale", delay=1)))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    assert await flight.do("k", _counting(calls, "fresh")) == "fresh"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_workers_coalesce_through_redis(monkeypatch, fake_redis):
+    monkeypatch.setattr(singleflight, "get_redis", lambda: fake_redis)
+    calls = []
+    workers = [SingleFlight("test", use_redis=True, wait_timeout=2) for _ in range(3)]
+
+    results = await asyncio.gather(
+        *(worker.do("k", _counting(calls, {"offers": [1]})) for worker in workers)
+    )
+
+    assert results == [{"offers": [1]}] * 3
+    assert len(calls) == 1
@@ -0,0 +1,89 @@
+import json
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.ai.structured import (
+    StructuredOutputError,
+    compact_schema,
+    parse_output,
+    repair_json,
+)
+
+
+class Item(BaseModel):
+    name: str
+    price: float = 0.0
+
+
+class Answer(BaseModel):
+    items: List[Item]
+    note: str = ""
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('```\n[1, 2]\n```', [1, 2]),
+    ('Sure! Here it is: {"a": [1, 2]} Hope that helps.', {"a": [1, 2]}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ('{"a": "braces } and ] in a string", "b": 1}',
+     {"a": "braces } and ] in a string", "b": 1}),
+    ('{"a": "escaped \\" quote", "b": [1]}', {"a": 'escaped " quote', "b": [1]}),
+])
+def test_complete_documents(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": "unterminated', {"a": "unterminated"}),
+    ('{"a": "ends on an escape \\', {"a": "ends on an escape "}),
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "dangling', {"a": 1}),
+    ('{"a": {"b": [{"c": 1},', {"a": {"b": [{"c": 1}]}}),
+])
+def test_truncated_documents_are_closed(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_drop_incomplete_cuts_back_to_the_last_closed_element():
+    text = '{"items": [{"name": "a"}, {"name": "b", "pri'
+
+    assert json.loads(repair_json(text)) == {
+        "items": [{"name": "a"}, {"name": "b"}]
+    }
+    assert json.loads(repair_json(text, drop_incomplete=True)) == {
+        "items": [{"name": "a"}]
+    }
+
+
+def test_text_without_json_is_returned_stripped():
+    assert repair_json("  no JSON here \n") == "no JSON here"
+
+
+def test_parse_output_repairs_before_failing():
+    answer = parse_output('```json\n{"items": [{"name": "a", "price": 2},]}', Answer)
+
+    assert answer.items == [Item(name="a", price=2)]
+
+
+def test_parse_output_drops_a_half_written_item():
+    # The partial item would fail validation (name is required)
+    answer = parse_output('{"items": [{"name": "a"}, {"pri', Answer)
+
+    assert answer.items == [Item(name="a")]
+
+
+def test_parse_output_raises_when_nothing_validates():
+    with pytest.raises(StructuredOutputError):
+        parse_output("I cannot help with that.", Answer)
+
+
+def test_compact_schema_inlines_refs_and_drops_titles():
+    schema = compact_schema(Answer)
+
+    assert "$defs" not in schema
+    assert "title" not in json.dumps(schema)
+    assert schema["properties"]["items"]["items"]["required"] == ["name"]
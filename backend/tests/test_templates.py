@@ -0,0 +1,68 @@
+import pytest
+
+from app.ai.index_store import new_generation, publish
+from app.ai.templates import ItineraryTemplate, TemplateStore, template_id
+
+DAY = {
+    "morning": "Old town walk", "lunch": "Market", "afternoon": "Museum",
+    "evening": "River", "dinner": "Bistro", "accommodation": "Hotel",
+    "estimated_cost": 100.0, "tips": "Buy a day pass",
+}
+
+
+def _template(destination: str, duration: int, pace: str = "moderate"):
+    return ItineraryTemplate(
+        id=template_id(destination, duration, pace),
+        destination=destination,
+        duration=duration,
+        pace=pace,
+        daily_plans=[{**DAY, "day": n} for n in range(1, duration + 1)],
+        total_estimated_cost=100.0 * duration,
+        generated_at="2024-01-01T00:00:00+00:00",
+    )
+
+
+def _store(tmp_path, *templates: ItineraryTemplate) -> TemplateStore:
+    generation = new_generation(tmp_path)
+    with open(generation / "templates.jsonl", "w", encoding="utf-8") as f:
+        for template in templates:
+            f.write(template.model_dump_json() + "\n")
+    publish(tmp_path, generation)
+    store = TemplateStore(path=str(tmp_path), backend="disk")
+    assert store.load()
+    return store
+
+
+def test_template_id_keeps_the_country():
+    assert template_id("Paris, France", 5, "moderate") == "paris-france-5d-moderate"
+    assert template_id("Paris, Texas", 5, "moderate") == "paris-texas-5d-moderate"
+
+
+@pytest.mark.asyncio
+async def test_nearest_is_the_shortest_template_long_enough(tmp_path):
+    store = _store(tmp_path, *(_template("Kyoto, Japan", d) for d in (3, 5, 7)))
+
+    assert (await store.nearest("Kyoto, Japan", 4, "moderate")).duration == 5
+    assert (await store.nearest("kyoto", 7, "moderate")).duration == 7
+    assert await store.nearest("Kyoto, Japan", 8, "moderate") is None
+    assert await store.nearest("Kyoto, Japan", 3, "packed") is None
+
+
+@pytest.mark.asyncio
+async def test_namesake_destination_is_not_served(tmp_path):
+    store = _store(tmp_path, _template("Paris, France", 5))
+
+    assert (await store.nearest("Paris", 5, "moderate")).destination == "Paris, France"
+    assert await store.nearest("Paris, Texas", 5, "moderate") is None
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_city_falls_back_to_generation(tmp_path):
+    store = _store(
+        tmp_path, _template("Paris, France", 5), _template("Paris, Texas", 5)
+    )
+
+    assert await store.nearest("Paris", 5, "moderate") is None
+    assert (await store.nearest("Paris, Texas", 5, "moderate")).id == (
+        "paris-texas-5d-moderate"
+    )
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import create_access_token, decode_token, verified_tokens
+from app.services import token_revocation, user_cache
+from app.services.token_revocation import REVOKED_SUBJECTS_KEY, revoke_user_tokens
+from app.services.user_cache import INVALIDATION_CHANNEL, InvalidationListener
+
+SUBJECT = "leaver@example.com"
+
+
+def _rejected(token: str) -> bool:
+    try:
+        decode_token(token)
+    except HTTPException as e:
+        return e.status_code == 401
+    return False
+
+
+@pytest.fixture
+def shared_redis(monkeypatch, fake_redis):
+    monkeypatch.setattr(token_revocation, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(user_cache, "get_redis", lambda: fake_redis)
+    return fake_redis
+
+
+def _forget_locally() -> None:
+    """Make this process look like a worker that saw no revocation."""
+    security.revoked_subjects.replace({})
+    verified_tokens.clear()
+
+
+@pytest.mark.asyncio
+async def test_tokens_issued_before_revocation_are_rejected(shared_redis):
+    old = create_access_token({"sub": SUBJECT})
+    decode_token(old)
+    assert len(verified_tokens) == 1
+
+    await revoke_user_tokens(SUBJECT)
+    new = create_access_token({"sub": SUBJECT})
+
+    assert _rejected(old)
+    assert not _rejected(new)
+    assert not _rejected(create_access_token({"sub": "other@example.com"}))
+
+
+@pytest.mark.asyncio
+async def test_worker_resyncing_from_redis_rejects_revoked_tokens(shared_redis):
+    token = create_access_token({"sub": SUBJECT})
+    await revoke_user_tokens(SUBJECT)
+    assert await shared_redis.zscore(REVOKED_SUBJECTS_KEY, SUBJECT) is not None
+    _forget_locally()
+    verified_tokens.put(token, decode_token(token))
+
+    await token_revocation.token_revocations.resync()
+
+    assert _rejected(token)
+
+
+@pytest.mark.asyncio
+async def test_revocation_published_by_another_worker_is_applied(shared_redis):
+    token = create_access_token({"sub": SUBJECT})
+    decode_token(token)
+    listener = InvalidationListener()
+    listener.start()
+    try:
+        # Let the listener subscribe before the message is published
+        for _ in range(50):
+            if (await shared_redis.pubsub_numsub(INVALIDATION_CHANNEL))[0][1]:
+                break
+            await asyncio.sleep(0.02)
+        decode_token(token)
+        await shared_redis.publish(
+            INVALIDATION_CHANNEL, f"tokens:{time.time()!r}:{SUBJECT}"
+        )
+        for _ in range(50):
+            if _rejected(token):
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await listener.stop()
+
+    assert _rejected(token)
+
+
+@pytest.mark.asyncio
+async def test_revocation_applies_locally_with_redis_down(
+    monkeypatch, unreachable_redis
+):
+    monkeypatch.setattr(token_revocation, "get_redis", unreachable_redis)
+    token = create_access_token({"sub": SUBJECT})
+
+    await revoke_user_tokens(SUBJECT)
+
+    assert _rejected(token)
+
+
+def test_tokens_without_issue_time_are_rejected_after_revocation():
+    security.revoke_user_tokens(SUBJECT)
+    payload = {"sub": SUBJECT, "exp": time.time() + 60}
+
+    assert security.revoked_subjects.is_revoked(payload)
+
+
+def test_expired_revocations_are_dropped():
+    long_ago = time.time() - security.TOKEN_MAX_LIFETIME_SECONDS - 1
+    security.revoke_user_tokens(SUBJECT, long_ago)
+
+    assert len(security.revoked_subjects) == 0
@@ -0,0 +1,41 @@
+import pytest
+
+from app.ai import tokens
+from app.ai.tokens import count_tokens
+
+
+@pytest.fixture(autouse=True)
+def _fresh_encodings():
+    tokens._encoding.cache_clear()
+    yield
+    tokens._encoding.cache_clear()
+
+
+def test_unavailable_encoding_falls_back_to_an_estimate(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+
+    def offline(name):
+        raise ConnectionError("encodings cannot be downloaded")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+
+    assert count_tokens("a" * 40, "gpt-4") == 10
+
+
+def test_tiktoken_encoding_is_used_when_available(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+
+    class Encoding:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+
+    names = []
+
+    def get_encoding(name):
+        names.append(name)
+        return Encoding()
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+
+    assert count_tokens("three short words", "claude-2") == 3
+    assert names == ["cl100k_base"]
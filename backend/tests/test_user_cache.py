@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.endpoints import users
+from app.api.v1.endpoints.users import TravelPreferences, UserProfile
+from app.services import token_revocation, user_cache
+from app.services.user_cache import UserCache, decode_model, encode_model
+
+PREFERENCES = TravelPreferences(
+    preferred_destinations=["Lisbon", "Kyoto"],
+    interests=["food"],
+    dietary_restrictions=["vegetarian"],
+)
+
+
+def _loader(calls):
+    async def load(user_id: str):
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        return PREFERENCES.model_copy(update={"travel_style": f"v{len(calls)}"})
+
+    return load
+
+
+def test_encoding_round_trip_is_smaller_than_json():
+    payload = encode_model(PREFERENCES)
+    assert decode_model(TravelPreferences, payload) == PREFERENCES
+    assert len(payload) < len(PREFERENCES.model_dump_json())
+
+
+def test_payload_is_json_behind_the_schema_tag():
+    payload = encode_model(PREFERENCES)
+
+    assert json.loads(payload[4:]) == list(PREFERENCES.model_dump().values())
+    assert decode_model(TravelPreferences, payload[:4] + b"\x80") is None
+
+
+def test_entry_of_another_schema_reads_as_miss():
+    assert decode_model(UserProfile, encode_model(PREFERENCES)) is None
+
+
+@pytest.mark.asyncio
+async def test_read_through_fills_redis_and_local(monkeypatch, fake_redis):
+    monkeypatch.setattr(user_cache, "get_redis", lambda: fake_redis)
+    calls = []
+    cache = UserCache("test_fill", TravelPreferences)
+
+    results = await asyncio.gather(*(cache.get("u1", _loader(calls)) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert {result.travel_style for result in results} == {"v1"}
+    assert await fake_redis.get("users:v1:test_fill:u1") is not None
+
+    other_worker = UserCache("test_fill", TravelPreferences)
+    assert (await other_worker.get("u1", _loader(calls))).travel_style == "v1"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_written_back(monkeypatch, fake_redis):
+    monkeypatch.setattr(user_cache, "get_redis", lambda: fake_redis)
+    cache = UserCache("test_race", TravelPreferences)
+    loading, release = asyncio.Event(), asyncio.Event()
+
+    async def load(user_id: str):
+        loading.set()
+        await release.wait()
+        return PREFERENCES
+
+    pending = asyncio.create_task(cache.get("u1", load))
+    await loading.wait()
+    await cache.invalidate("u1")
+    release.set()
+    await pending
+
+    assert await fake_redis.get("users:v1:test_race:u1") is None
+    assert cache.local.get("u1") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_down_reads_fall_back_to_loader(monkeypatch, unreachable_redis):
+    monkeypatch.setattr(user_cache, "get_redis", unreachable_redis)
+    calls = []
+    cache = UserCache("test_down", TravelPreferences)
+
+    assert (await cache.get("u1", _loader(calls))).travel_style == "v1"
+    await cache.invalidate("u1")
+    assert cache.local.get("u1") is None
+    assert (await cache.get("u1", _loader(calls))).travel_style == "v2"
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("put", "/api/v1/users/profile", {"full_name": "New Name"}),
+    ("put", "/api/v1/users/preferences", {"travel_style": "packed"}),
+    ("delete", "/api/v1/users/account", None),
+])
+def test_writes_succeed_with_redis_down(
+    monkeypatch, client, auth_headers, unreachable_redis, method, path, body
+):
+    monkeypatch.setattr(user_cache, "get_redis", unreachable_redis)
+    monkeypatch.setattr(token_revocation, "get_redis", unreachable_redis)
+    users.preferences_cache.local.set("traveler@example.com", PREFERENCES)
+    kwargs = {"json": body} if body is not None else {}
+
+    response = client.request(method, path, headers=auth_headers(), **kwargs)
+
+    assert response.status_code == 200
+    if path != "/api/v1/users/profile":
+        assert users.preferences_cache.local.get("traveler@example.com") is None